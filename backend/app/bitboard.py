@@ -0,0 +1,397 @@
+from array import array
+from itertools import chain
+from typing import Dict, List, Tuple
+from .board import (
+    Board, coords, square, NUM_SQUARES, BOARD_WIDTH, BOARD_HEIGHT, EMPTY, BLACK_FLAG,
+    GENERAL, ADVISOR, ELEPHANT, HORSE, CHARIOT, CANNON, SOLDIER, RED, BLACK,
+)
+from .movegen import (
+    MoveGenerator, register_generator, GENERAL_STEPS, ADVISOR_STEPS, SOLDIER_STEPS, SOLDIER_ATTACKS,
+    RAY_INDEX, HORSE_BY_LEG, _NO_RAYS, _on_board, _HORSE_DELTAS,
+)
+from .snapshot import join_wide, load_tables, split_wide
+
+# Bitboards are Python ints with bit `sq` set for an occupied square (sq = y * 9 + x).
+# A second, transposed occupancy (bit x * 10 + y) keeps each file contiguous so
+# file lookups are a shift and a mask, like rank lookups on the normal layout.
+RANK_MASK = (1 << BOARD_WIDTH) - 1
+FILE_MASK = (1 << BOARD_HEIGHT) - 1
+TRANSPOSED_BIT = tuple(1 << (x * BOARD_HEIGHT + y) for y in range(BOARD_HEIGHT) for x in range(BOARD_WIDTH))
+
+
+def _slides(length: int):
+    """For each slider position and line occupancy: (chariot, cannon move, cannon capture) target masks"""
+    table = []
+    for pos in range(length):
+        by_occupancy = []
+        for occ in range(1 << length):
+            chariot = quiet = capture = 0
+            for step in (1, -1):
+                i = pos + step
+                screened = False
+                while 0 <= i < length:
+                    bit = 1 << i
+                    if not screened:
+                        chariot |= bit
+                        if occ & bit:
+                            screened = True
+                        else:
+                            quiet |= bit
+                    elif occ & bit:
+                        capture |= bit
+                        break
+                    i += step
+            by_occupancy.append((chariot, quiet, capture))
+        table.append(tuple(by_occupancy))
+    return tuple(table)
+
+
+def _spread_file(mask: int) -> int:
+    """A FILE_MASK-style mask of ranks as a bitboard on file 0"""
+    bb = 0
+    for y in range(BOARD_HEIGHT):
+        if mask >> y & 1:
+            bb |= 1 << (y * BOARD_WIDTH)
+    return bb
+
+
+_ORTHOGONAL = ((0, -1), (0, 1), (-1, 0), (1, 0))
+_DIAGONAL = ((-1, -1), (1, -1), (-1, 1), (1, 1))
+
+
+def _neighbour_bits(sq: int, directions) -> Tuple[int, ...]:
+    x, y = coords(sq)
+    return tuple(1 << square(x + dx, y + dy) if _on_board(x + dx, y + dy) else 0 for dx, dy in directions)
+
+
+HORSE_LEGS = tuple(_neighbour_bits(sq, _ORTHOGONAL) for sq in range(NUM_SQUARES))
+ELEPHANT_EYES = tuple(_neighbour_bits(sq, _DIAGONAL) for sq in range(NUM_SQUARES))
+
+
+def _build_leg_tables():
+    """Horse and elephant targets indexed by which of their four leg/eye squares are blocked"""
+    horse_moves, horse_attackers = [], []
+    elephant_moves = ([], [])
+    for sq in range(NUM_SQUARES):
+        x, y = coords(sq)
+        moves, attackers = [], []
+        for blocked in range(16):
+            targets = 0
+            for dx, dy, leg_dx, leg_dy in _HORSE_DELTAS:
+                if _on_board(x + dx, y + dy) and not blocked >> _ORTHOGONAL.index((leg_dx, leg_dy)) & 1:
+                    targets |= 1 << square(x + dx, y + dy)
+            moves.append(targets)
+            # A horse attacking sq has its leg on one of sq's diagonal neighbours
+            sources = 0
+            for dx, dy, leg_dx, leg_dy in _HORSE_DELTAS:
+                fx, fy = x - dx, y - dy
+                if _on_board(fx, fy):
+                    leg_dir = (fx + leg_dx - x, fy + leg_dy - y)
+                    if not blocked >> _DIAGONAL.index(leg_dir) & 1:
+                        sources |= 1 << square(fx, fy)
+            attackers.append(sources)
+        horse_moves.append(tuple(moves))
+        horse_attackers.append(tuple(attackers))
+        for side in (RED, BLACK):
+            own_half = (lambda row: row >= 5) if side == RED else (lambda row: row <= 4)
+            by_eyes = []
+            for blocked in range(16):
+                targets = 0
+                if own_half(y):
+                    for i, (dx, dy) in enumerate(_DIAGONAL):
+                        tx, ty = x + 2 * dx, y + 2 * dy
+                        if _on_board(tx, ty) and own_half(ty) and not blocked >> i & 1:
+                            targets |= 1 << square(tx, ty)
+                by_eyes.append(targets)
+            elephant_moves[side].append(tuple(by_eyes))
+    return tuple(horse_moves), tuple(horse_attackers), tuple(map(tuple, elephant_moves))
+
+
+def _build_tables():
+    rank_slides = _slides(BOARD_WIDTH)
+    file_slides = tuple(tuple(tuple(_spread_file(m) for m in masks) for masks in row)
+                        for row in _slides(BOARD_HEIGHT))
+    return (rank_slides, file_slides) + _build_leg_tables()
+
+
+# Layout version of the tables below in engine table snapshots (see
+# app.snapshot and tools.build_tables); bump it when their shape changes.
+TABLES_VERSION = 1
+_TABLE_NAMES = tuple(f"bitboard/{TABLES_VERSION}/{name}" for name in
+                     ("rank_slides", "file_slides", "horse_moves", "horse_attackers", "elephant_moves"))
+
+
+def _chunks(values, *sizes):
+    """A flat sequence as nested tuples, innermost chunk size last"""
+    for size in reversed(sizes):
+        values = tuple(zip(*[iter(values)] * size))
+    return values
+
+
+def _load_tables():
+    """The tables from the configured snapshot, or None to build them.
+
+    The mapped arrays are unpacked into the nested tuples the move generator
+    indexes: tuple lookups of Python ints beat memoryview lookups (and the
+    bitboards are wider than 64 bits), and unpacking costs far less than
+    building.
+    """
+    stored = load_tables(_TABLE_NAMES)
+    if stored is None:
+        return None
+    rank, file, horse_moves, horse_attackers, elephant_moves = (stored[name] for name in _TABLE_NAMES)
+    return (_chunks(rank.tolist(), 1 << BOARD_WIDTH, 3), _chunks(join_wide(file), 1 << BOARD_HEIGHT, 3),
+            _chunks(join_wide(horse_moves), 16), _chunks(join_wide(horse_attackers), 16),
+            _chunks(join_wide(elephant_moves), NUM_SQUARES, 16))
+
+
+def _flatten(table, depth: int):
+    return chain.from_iterable(_flatten(row, depth - 1) for row in table) if depth else table
+
+
+def snapshot_tables() -> Dict[str, array]:
+    """The precomputed tables as flat arrays, for writing a snapshot"""
+    flat = _flatten
+    return dict(zip(_TABLE_NAMES, (
+        array("H", flat(RANK_SLIDES, 2)), split_wide(flat(FILE_SLIDES, 2)),
+        split_wide(flat(HORSE_MOVES, 1)), split_wide(flat(HORSE_ATTACKERS, 1)),
+        split_wide(flat(ELEPHANT_MOVES, 2)),
+    )))
+
+
+# RANK_SLIDES[x][rank occupancy] -> masks within the rank; shift by y * 9 to place.
+# FILE_SLIDES[y][file occupancy] -> bitboards on file 0; shift by x to place.
+# HORSE_MOVES[sq][blocked legs], HORSE_ATTACKERS[sq][blocked legs] and
+# ELEPHANT_MOVES[side][sq][blocked eyes] -> target (or source) bitboards.
+RANK_SLIDES, FILE_SLIDES, HORSE_MOVES, HORSE_ATTACKERS, ELEPHANT_MOVES = _load_tables() or _build_tables()
+
+
+def _to_bitboards(table) -> Tuple[int, ...]:
+    return tuple(sum(1 << to for to in targets) for targets in table)
+
+GENERAL_TARGETS = tuple(_to_bitboards(GENERAL_STEPS[side]) for side in (RED, BLACK))
+ADVISOR_TARGETS = tuple(_to_bitboards(ADVISOR_STEPS[side]) for side in (RED, BLACK))
+SOLDIER_TARGETS = tuple(_to_bitboards(SOLDIER_STEPS[side]) for side in (RED, BLACK))
+SOLDIER_ATTACKERS = tuple(_to_bitboards(SOLDIER_ATTACKS[side]) for side in (RED, BLACK))
+
+
+def _blocked(occ: int, bits: Tuple[int, int, int, int]) -> int:
+    a, b, c, d = bits
+    return (1 if occ & a else 0) | (2 if occ & b else 0) | (4 if occ & c else 0) | (8 if occ & d else 0)
+
+
+class BitBoard(Board):
+    """Board that also keeps one bitboard per piece code plus occupancy sets.
+
+    The mailbox fields of Board are maintained as well, so everything that
+    reads `squares` or `ids` keeps working; move generation and attack
+    tests for this class use the bitboards (see BITBOARD_GENERATOR).
+    """
+
+    __slots__ = ("bb", "occ", "occ_t", "side_occ")
+
+    def __init__(self):
+        super().__init__()
+        self.bb: List[int] = [0] * 16
+        self.occ = 0
+        self.occ_t = 0
+        self.side_occ: List[int] = [0, 0]
+
+    @classmethod
+    def from_state(cls, game_state) -> "BitBoard":
+        board = super().from_state(game_state)
+        for sq, code in enumerate(board.squares):
+            if code:
+                bit = 1 << sq
+                board.bb[code] |= bit
+                board.side_occ[BLACK if code & BLACK_FLAG else RED] |= bit
+                board.occ |= bit
+                board.occ_t |= TRANSPOSED_BIT[sq]
+        return board
+
+    def copy(self) -> "BitBoard":
+        board = super().copy()
+        board.bb = self.bb[:]
+        board.occ = self.occ
+        board.occ_t = self.occ_t
+        board.side_occ = self.side_occ[:]
+        return board
+
+    def do_move(self, move: int) -> None:
+        Board.do_move(self, move)
+        self._move_bits(move, self.squares[move & 127], self.undo_stack[-1][2])
+
+    def undo_move(self) -> None:
+        move, _, captured_code, _, _ = self.undo_stack[-1]
+        self._move_bits(move, self.squares[move & 127], captured_code)
+        Board.undo_move(self)
+
+    def _move_bits(self, move: int, code: int, captured_code: int) -> None:
+        # XOR updates, so the same call both plays and takes back a move
+        from_sq, to_sq = move >> 7, move & 127
+        from_bit, to_bit = 1 << from_sq, 1 << to_sq
+        bb = self.bb
+        side = 1 if code & BLACK_FLAG else 0
+        bb[code] ^= from_bit | to_bit
+        self.side_occ[side] ^= from_bit | to_bit
+        if captured_code:
+            bb[captured_code] ^= to_bit
+            self.side_occ[side ^ 1] ^= to_bit
+            self.occ ^= from_bit
+            self.occ_t ^= TRANSPOSED_BIT[from_sq]
+        else:
+            self.occ ^= from_bit | to_bit
+            self.occ_t ^= TRANSPOSED_BIT[from_sq] | TRANSPOSED_BIT[to_sq]
+
+
+def pseudo_moves(board: BitBoard, side: int) -> List[int]:
+    """Generate packed moves for one side from the bitboards"""
+    moves: List[int] = []
+    append = moves.append
+    bb = board.bb
+    occ, occ_t = board.occ, board.occ_t
+    not_own = ~board.side_occ[side]
+    enemy = board.side_occ[side ^ 1]
+    flag = BLACK_FLAG if side == BLACK else 0
+
+    # Sliders: rank and file lookups by line occupancy
+    for code in (CHARIOT | flag, CANNON | flag):
+        chariot = code & 7 == CHARIOT
+        pieces = bb[code]
+        while pieces:
+            low = pieces & -pieces
+            pieces ^= low
+            frm = low.bit_length() - 1
+            x, y = frm % BOARD_WIDTH, frm // BOARD_WIDTH
+            shift = y * BOARD_WIDTH
+            rank = RANK_SLIDES[x][(occ >> shift) & RANK_MASK]
+            file = FILE_SLIDES[y][(occ_t >> (x * BOARD_HEIGHT)) & FILE_MASK]
+            if chariot:
+                targets = ((rank[0] << shift) | (file[0] << x)) & not_own
+            else:
+                targets = (rank[1] << shift) | (file[1] << x) | (((rank[2] << shift) | (file[2] << x)) & enemy)
+            base = frm << 7
+            while targets:
+                bit = targets & -targets
+                append(base | (bit.bit_length() - 1))
+                targets ^= bit
+
+    # Leapers: targets by which leg or eye squares are blocked
+    for pieces, table, legs in ((bb[HORSE | flag], HORSE_MOVES, HORSE_LEGS),
+                                (bb[ELEPHANT | flag], ELEPHANT_MOVES[side], ELEPHANT_EYES)):
+        while pieces:
+            low = pieces & -pieces
+            pieces ^= low
+            frm = low.bit_length() - 1
+            a, b, c, d = legs[frm]
+            targets = table[frm][(1 if occ & a else 0) | (2 if occ & b else 0)
+                                 | (4 if occ & c else 0) | (8 if occ & d else 0)] & not_own
+            base = frm << 7
+            while targets:
+                bit = targets & -targets
+                append(base | (bit.bit_length() - 1))
+                targets ^= bit
+
+    # Steppers: fixed targets per square
+    for pieces, table in ((bb[SOLDIER | flag], SOLDIER_TARGETS[side]), (bb[ADVISOR | flag], ADVISOR_TARGETS[side]),
+                          (bb[GENERAL | flag], GENERAL_TARGETS[side])):
+        while pieces:
+            low = pieces & -pieces
+            pieces ^= low
+            frm = low.bit_length() - 1
+            targets = table[frm] & not_own
+            base = frm << 7
+            while targets:
+                bit = targets & -targets
+                append(base | (bit.bit_length() - 1))
+                targets ^= bit
+    return moves
+
+
+def _attacked(bb: List[int], sq: int, by_side: int, occ: int, occ_t: int, keep: int) -> bool:
+    # Attack test against a hypothetical occupancy; attacking pieces are masked with `keep`
+    flag = BLACK_FLAG if by_side == BLACK else 0
+    x, y = sq % BOARD_WIDTH, sq // BOARD_WIDTH
+    shift = y * BOARD_WIDTH
+    rank = RANK_SLIDES[x][(occ >> shift) & RANK_MASK]
+    file = FILE_SLIDES[y][(occ_t >> (x * BOARD_HEIGHT)) & FILE_MASK]
+    if ((rank[0] << shift) | (file[0] << x)) & (bb[CHARIOT | flag] | bb[GENERAL | flag]) & keep:
+        return True
+    if ((rank[2] << shift) | (file[2] << x)) & bb[CANNON | flag] & keep:
+        return True
+    if HORSE_ATTACKERS[sq][_blocked(occ, ELEPHANT_EYES[sq])] & bb[HORSE | flag] & keep:
+        return True
+    return bool(SOLDIER_ATTACKERS[by_side][sq] & bb[SOLDIER | flag] & keep)
+
+
+def is_attacked(board: BitBoard, sq: int, by_side: int) -> bool:
+    """Whether a piece of `by_side` could capture on `sq` (generals count along open files)"""
+    return _attacked(board.bb, sq, by_side, board.occ, board.occ_t, -1)
+
+
+def in_check(board: BitBoard, side: int) -> bool:
+    """Whether `side`'s general is attacked (or faces the other general)"""
+    general = board.bb[GENERAL | (BLACK_FLAG if side == BLACK else 0)]
+    return general != 0 and _attacked(board.bb, general.bit_length() - 1, side ^ 1, board.occ, board.occ_t, -1)
+
+
+def check_context(board: BitBoard, side: int):
+    """Same contract as movegen.check_context, with the check test done on bitboards"""
+    general = board.bb[GENERAL | (BLACK_FLAG if side == BLACK else 0)]
+    if not general:
+        return -1, False, _NO_RAYS, {}
+    general_sq = general.bit_length() - 1
+    checked = _attacked(board.bb, general_sq, side ^ 1, board.occ, board.occ_t, -1)
+    return general_sq, checked, RAY_INDEX[general_sq], HORSE_BY_LEG[general_sq]
+
+
+def legal_moves(board: BitBoard, side: int) -> List[int]:
+    """Pseudo moves of `side` that do not leave its own general in check"""
+    pseudo = pseudo_moves(board, side)
+    general_sq, checked, ray_index, horse_by_leg = check_context(board, side)
+    if general_sq == -1:
+        return pseudo
+    bb, occ, occ_t = board.bb, board.occ, board.occ_t
+    enemy = side ^ 1
+    flag = BLACK_FLAG if enemy == BLACK else 0
+    sliders = bb[CHARIOT | flag] | bb[GENERAL | flag]
+    cannons, horses = bb[CANNON | flag], bb[HORSE | flag]
+    gx, gy = general_sq % BOARD_WIDTH, general_sq // BOARD_WIDTH
+    rank_shift, file_shift = gy * BOARD_WIDTH, gx * BOARD_HEIGHT
+    rank_slides, file_slides = RANK_SLIDES[gx], FILE_SLIDES[gy]
+
+    # Moves are tried on the occupancy sets alone; a captured piece stops attacking
+    moves = []
+    for move in pseudo:
+        frm, to = move >> 7, move & 127
+        from_ray, to_ray = ray_index[frm], ray_index[to]
+        if checked or frm == general_sq:
+            to_bit = 1 << to
+            after = (occ & ~(1 << frm)) | to_bit
+            after_t = (occ_t & ~TRANSPOSED_BIT[frm]) | TRANSPOSED_BIT[to]
+            if not _attacked(bb, to if frm == general_sq else general_sq, enemy, after, after_t, ~to_bit):
+                moves.append(move)
+            continue
+        if from_ray < 0 and to_ray < 0 and frm not in horse_by_leg:
+            moves.append(move)
+            continue
+        # Only the general's rank or file (RAYS 0-1 and 2-3) or a freed horse leg can open up
+        keep = ~(1 << to)
+        exposed = False
+        if 0 <= from_ray < 2 or 0 <= to_ray < 2:
+            after = (occ & ~(1 << frm)) | (1 << to)
+            rank = rank_slides[(after >> rank_shift) & RANK_MASK]
+            exposed = bool(((rank[0] << rank_shift) & sliders | (rank[2] << rank_shift) & cannons) & keep)
+        if not exposed and (from_ray >= 2 or to_ray >= 2):
+            after_t = (occ_t & ~TRANSPOSED_BIT[frm]) | TRANSPOSED_BIT[to]
+            file = file_slides[(after_t >> file_shift) & FILE_MASK]
+            exposed = bool(((file[0] << gx) & sliders | (file[2] << gx) & cannons) & keep)
+        if not exposed and frm in horse_by_leg:
+            exposed = any((horses & keep) >> h & 1 for h in horse_by_leg[frm])
+        if not exposed:
+            moves.append(move)
+    return moves
+
+
+BITBOARD_GENERATOR = MoveGenerator(pseudo_moves, legal_moves, in_check, check_context)
+register_generator(BitBoard, BITBOARD_GENERATOR)
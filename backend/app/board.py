@@ -0,0 +1,233 @@
+from typing import List, Tuple
+from .models import GameState, PieceType, Side
+from .zobrist import PIECE_KEYS, SIDE_KEY, compute_hash
+from .evaluation import PIECE_SQUARE, score_squares
+
+# Board geometry: squares are numbered row-major, sq = y * 9 + x
+BOARD_WIDTH = 9
+BOARD_HEIGHT = 10
+NUM_SQUARES = BOARD_WIDTH * BOARD_HEIGHT
+
+# Piece codes stored in the mailbox. Black pieces carry BLACK_FLAG.
+EMPTY = 0
+GENERAL, ADVISOR, ELEPHANT, HORSE, CHARIOT, CANNON, SOLDIER = range(1, 8)
+BLACK_FLAG = 8
+TYPE_MASK = 7
+
+RED, BLACK = 0, 1
+NO_PIECE = -1
+
+TYPE_CODES = {
+    PieceType.GENERAL: GENERAL,
+    PieceType.ADVISOR: ADVISOR,
+    PieceType.ELEPHANT: ELEPHANT,
+    PieceType.HORSE: HORSE,
+    PieceType.CHARIOT: CHARIOT,
+    PieceType.CANNON: CANNON,
+    PieceType.SOLDIER: SOLDIER,
+}
+CODE_TYPES = {code: piece_type for piece_type, code in TYPE_CODES.items()}
+SIDE_INDEX = {Side.RED: RED, Side.BLACK: BLACK}
+SIDES = (Side.RED, Side.BLACK)
+
+
+def square(x: int, y: int) -> int:
+    """Convert board coordinates to a square index"""
+    return y * BOARD_WIDTH + x
+
+
+def coords(sq: int) -> Tuple[int, int]:
+    """Convert a square index back to (x, y) coordinates"""
+    return sq % BOARD_WIDTH, sq // BOARD_WIDTH
+
+
+def piece_code(piece_type: PieceType, side: Side) -> int:
+    """Encode a piece type and side as a single mailbox code"""
+    return TYPE_CODES[piece_type] | (BLACK_FLAG if side == Side.BLACK else 0)
+
+
+def code_side(code: int) -> int:
+    """Side index (RED or BLACK) of a non-empty piece code"""
+    return BLACK if code & BLACK_FLAG else RED
+
+
+class Board:
+    """Mailbox view of a GameState for constant-time square lookups.
+
+    `squares` holds a piece code per square, `ids` the index of that piece
+    in `GameState.pieces` (or NO_PIECE), and `side_pieces` the piece ids
+    belonging to each side. `hash` is the Zobrist key of the position and
+    `score` its material + piece-square score from red's point of view.
+
+    Search plays moves in place with do_move/undo_move; each move pushes a
+    small (move, captured id, captured code, previous hash, previous score)
+    undo entry.
+    """
+
+    __slots__ = ("squares", "ids", "locs", "side_pieces", "turn", "hash", "score", "undo_stack", "piece_square")
+
+    def __init__(self):
+        self.squares = bytearray(NUM_SQUARES)
+        self.ids: List[int] = [NO_PIECE] * NUM_SQUARES
+        self.locs: List[int] = []
+        self.side_pieces: Tuple[List[int], List[int]] = ([], [])
+        self.turn = RED
+        self.hash = 0
+        self.score = 0
+        self.undo_stack: List[Tuple[int, int, int, int, int]] = []
+        self.piece_square = PIECE_SQUARE  # scoring table, see set_weights
+
+    @classmethod
+    def from_state(cls, game_state: GameState) -> "Board":
+        """Build a board from the pieces list of a game state"""
+        board = cls()
+        for i, p in enumerate(game_state.pieces):
+            sq = square(p.x, p.y)
+            code = piece_code(p.type, p.side)
+            board.squares[sq] = code
+            board.ids[sq] = i
+            board.locs.append(sq)
+            board.side_pieces[code_side(code)].append(i)
+        board.turn = SIDE_INDEX[game_state.current_turn]
+        board.hash = compute_hash(board.squares, board.turn)
+        board.score = score_squares(board.squares)
+        return board
+
+    def copy(self) -> "Board":
+        """Independent copy that can be moved on without touching this board"""
+        board = self.__class__.__new__(self.__class__)
+        board.squares = self.squares[:]
+        board.ids = self.ids[:]
+        board.locs = self.locs[:]
+        board.side_pieces = self.side_pieces  # piece ids never change sides
+        board.turn = self.turn
+        board.hash = self.hash
+        board.score = self.score
+        board.undo_stack = []
+        board.piece_square = self.piece_square
+        return board
+
+    def set_weights(self, piece_square: List[List[int]]) -> None:
+        """Score this board with another table (see evaluation.make_weights) from now on.
+
+        Taking back moves played before the switch restores their old scores.
+        """
+        self.piece_square = piece_square
+        self.score = score_squares(self.squares, piece_square)
+
+    def do_move(self, move: int) -> None:
+        """Play a packed (from << 7 | to) move in place and pass the turn"""
+        from_sq, to_sq = move >> 7, move & 127
+        squares = self.squares
+        ids = self.ids
+        code = squares[from_sq]
+        captured_code = squares[to_sq]
+        captured = ids[to_sq]
+        prev_hash = self.hash
+        prev_score = self.score
+        key = prev_hash ^ PIECE_KEYS[code][from_sq] ^ PIECE_KEYS[code][to_sq] ^ SIDE_KEY
+        piece_square = self.piece_square
+        values = piece_square[code]
+        score = prev_score + values[to_sq] - values[from_sq]
+        if captured != NO_PIECE:
+            key ^= PIECE_KEYS[captured_code][to_sq]
+            score -= piece_square[captured_code][to_sq]
+            self.locs[captured] = NO_PIECE
+        pid = ids[from_sq]
+        squares[to_sq] = code
+        squares[from_sq] = EMPTY
+        ids[to_sq] = pid
+        ids[from_sq] = NO_PIECE
+        self.locs[pid] = to_sq
+        self.turn ^= 1
+        self.hash = key
+        self.score = score
+        self.undo_stack.append((move, captured, captured_code, prev_hash, prev_score))
+
+    def undo_move(self) -> None:
+        """Take back the last move played with do_move"""
+        move, captured, captured_code, prev_hash, prev_score = self.undo_stack.pop()
+        from_sq, to_sq = move >> 7, move & 127
+        squares = self.squares
+        ids = self.ids
+        pid = ids[to_sq]
+        squares[from_sq] = squares[to_sq]
+        squares[to_sq] = captured_code
+        ids[from_sq] = pid
+        ids[to_sq] = captured
+        self.locs[pid] = from_sq
+        if captured != NO_PIECE:
+            self.locs[captured] = to_sq
+        self.turn ^= 1
+        self.hash = prev_hash
+        self.score = prev_score
+
+    def renumber(self) -> List[int]:
+        """Renumber pieces in square (FEN reading) order; returns the old id of each new id"""
+        order = []
+        ids = [NO_PIECE] * NUM_SQUARES
+        old_ids = self.ids
+        side_pieces: Tuple[List[int], List[int]] = ([], [])
+        for sq, code in enumerate(self.squares):
+            if code:
+                ids[sq] = len(order)
+                side_pieces[BLACK if code & BLACK_FLAG else RED].append(len(order))
+                order.append(old_ids[sq])
+        self.ids = ids
+        self.locs = [sq for sq, code in enumerate(self.squares) if code]
+        self.side_pieces = side_pieces
+        return order
+
+    def code_at(self, x: int, y: int) -> int:
+        """Piece code at (x, y), or EMPTY"""
+        return self.squares[y * BOARD_WIDTH + x]
+
+    def piece_id_at(self, x: int, y: int) -> int:
+        """Index into GameState.pieces of the piece at (x, y), or NO_PIECE"""
+        return self.ids[y * BOARD_WIDTH + x]
+
+    def find(self, side: int, code_type: int) -> int:
+        """Square of the first piece of the given side and type, or NO_PIECE"""
+        squares = self.squares
+        for i in self.side_pieces[side]:
+            sq = self.locs[i]
+            if sq != NO_PIECE and squares[sq] & TYPE_MASK == code_type:
+                return sq
+        return NO_PIECE
+
+    def count_between(self, from_sq: int, to_sq: int) -> int:
+        """Number of pieces strictly between two squares on the same rank or file"""
+        if from_sq > to_sq:
+            from_sq, to_sq = to_sq, from_sq
+        step = 1 if from_sq // BOARD_WIDTH == to_sq // BOARD_WIDTH else BOARD_WIDTH
+        squares = self.squares
+        count = 0
+        for sq in range(from_sq + step, to_sq, step):
+            if squares[sq]:
+                count += 1
+        return count
+
+
+_board_class = None
+
+
+def board_class() -> type:
+    """Board implementation selected by the BOARD_BACKEND setting ("mailbox" or "bitboard")"""
+    global _board_class
+    if _board_class is None:
+        from . import config
+        if config.BOARD_BACKEND == "bitboard":
+            from .bitboard import BitBoard  # imports this module, so it is loaded on demand
+            _board_class = BitBoard
+        else:
+            _board_class = Board
+    return _board_class
+
+
+def board_of(game_state: GameState) -> Board:
+    """Return the board for a game state, building and caching it on first use"""
+    board = game_state._board
+    if board is None:
+        board = board_class().from_state(game_state)
+        game_state._board = board
+    return board
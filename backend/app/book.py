@@ -0,0 +1,187 @@
+import logging
+import mmap
+import random
+import re
+import struct
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from .board import Board, BOARD_HEIGHT, square, coords
+from .fen import START_FEN, from_fen
+from .movegen import encode_move, generator_for
+
+logger = logging.getLogger(__name__)
+
+# Book file layout: a 16-byte header, then fixed-size entries sorted by
+# (hash, move). Big-endian, so the file is portable between machines.
+BOOK_MAGIC = b"XQBK"
+BOOK_VERSION = 1
+_HEADER = struct.Struct(">4sII4x")  # magic, version, entry count
+_ENTRY = struct.Struct(">QHH")  # Zobrist hash, packed move, weight
+MAX_WEIGHT = 0xFFFF
+
+
+def write_book(path: str, entries: Iterable[Tuple[int, int, int]]) -> int:
+    """Write (hash, move, weight) entries as a sorted book file; returns the entry count.
+
+    Weights of duplicate (hash, move) pairs are added up and capped at MAX_WEIGHT.
+    """
+    weights: Dict[Tuple[int, int], int] = Counter()
+    for key, move, weight in entries:
+        weights[(key, move)] += weight
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(BOOK_MAGIC, BOOK_VERSION, len(weights)))
+        for (key, move), weight in sorted(weights.items()):
+            f.write(_ENTRY.pack(key, move, min(weight, MAX_WEIGHT)))
+    return len(weights)
+
+
+class OpeningBook:
+    """Read-only view of a book file through mmap.
+
+    Lookups binary-search the mapped file directly, so nothing is loaded up
+    front and every process that opens the same book shares its pages.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = _HEADER.unpack_from(self._map, 0)
+        if magic != BOOK_MAGIC or version != BOOK_VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {BOOK_VERSION} opening book")
+        if _HEADER.size + count * _ENTRY.size > len(self._map):
+            self._map.close()
+            raise ValueError(f"{path} is truncated")
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        self._map.close()
+
+    def _key_at(self, index: int) -> int:
+        return struct.unpack_from(">Q", self._map, _HEADER.size + index * _ENTRY.size)[0]
+
+    def moves(self, key: int) -> List[Tuple[int, int]]:
+        """(move, weight) pairs recorded for a position hash"""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        found = []
+        offset = _HEADER.size + lo * _ENTRY.size
+        while lo < self.count:
+            entry_key, move, weight = _ENTRY.unpack_from(self._map, offset)
+            if entry_key != key:
+                break
+            found.append((move, weight))
+            lo += 1
+            offset += _ENTRY.size
+        return found
+
+    def pick(self, board: Board, rng: Optional[random.Random] = None) -> Optional[int]:
+        """A book move for the position, chosen at random in proportion to its weight.
+
+        Entries that are not playable in the position (a hash collision or a
+        damaged book) are ignored. Returns None when the book has no move.
+        """
+        legal = set(generator_for(board).legal_moves(board, board.turn))
+        candidates = [(move, weight) for move, weight in self.moves(board.hash) if move in legal and weight > 0]
+        if not candidates:
+            return None
+        moves, weights = zip(*candidates)
+        return (rng or random).choices(moves, weights=weights)[0]
+
+
+# Building a book from game records
+#
+# Records are PGN-like: optional [Tag "value"] headers (a [FEN "..."] tag
+# sets the start position), then moves in ICCS coordinates such as "h2e2"
+# or "h2-e2" (files a-i from red's left, ranks 0-9 from red's side), with
+# optional move numbers, {comments} and a closing result token.
+
+_TAG = re.compile(r'\[(\w+)\s+"([^"]*)"\]')
+_ICCS = re.compile(r"^([a-i])([0-9])-?([a-i])([0-9])$")
+_RESULTS = {"1-0", "0-1", "1/2-1/2", "*"}
+
+
+def parse_iccs(text: str) -> int:
+    """Packed move for an ICCS coordinate move like "h2e2"; raises ValueError if malformed"""
+    match = _ICCS.match(text.lower())
+    if match is None:
+        raise ValueError(f"Not an ICCS move: {text!r}")
+    from_file, from_rank, to_file, to_rank = match.groups()
+    from_sq = square(ord(from_file) - ord("a"), BOARD_HEIGHT - 1 - int(from_rank))
+    to_sq = square(ord(to_file) - ord("a"), BOARD_HEIGHT - 1 - int(to_rank))
+    return encode_move(from_sq, to_sq)
+
+
+def format_iccs(move: int) -> str:
+    """ICCS coordinate text of a packed move"""
+    (fx, fy), (tx, ty) = coords(move >> 7), coords(move & 127)
+    return f"{chr(ord('a') + fx)}{BOARD_HEIGHT - 1 - fy}{chr(ord('a') + tx)}{BOARD_HEIGHT - 1 - ty}"
+
+
+def read_games(text: str) -> Iterator[Tuple[Dict[str, str], List[str]]]:
+    """Split a PGN-like file into (tags, move tokens) per game"""
+    tags: Dict[str, str] = {}
+    tokens: List[str] = []
+    for line in re.sub(r"\{[^}]*\}", " ", text).splitlines():
+        line = line.strip()
+        if line.startswith("["):
+            if tokens:
+                yield tags, tokens
+                tags, tokens = {}, []
+            tags.update(_TAG.findall(line))
+            continue
+        for token in line.split():
+            token = re.sub(r"^\d+\.+", "", token)
+            if not token:
+                continue
+            tokens.append(token)
+            if token in _RESULTS:
+                yield tags, tokens
+                tags, tokens = {}, []
+    if tokens:
+        yield tags, tokens
+
+
+def book_entries(text: str, max_plies: int = 20) -> Iterator[Tuple[int, int, int]]:
+    """(hash, move, weight) for the first max_plies moves of every game in the records.
+
+    Each occurrence weighs 1, or 2 when played by the side that went on to
+    win. A game is cut short at the first move that is malformed or not
+    playable in its position.
+    """
+    for game_number, (tags, tokens) in enumerate(read_games(text), 1):
+        board = Board.from_state(from_fen(tags.get("FEN", START_FEN)))
+        result = next((t for t in tokens if t in _RESULTS), tags.get("Result", "*"))
+        winner = {"1-0": 0, "0-1": 1}.get(result)
+        moves = [t for t in tokens if t not in _RESULTS]
+        for ply, token in enumerate(moves[:max_plies]):
+            try:
+                move = parse_iccs(token)
+            except ValueError:
+                logger.warning("Game %d: skipping the rest after malformed move %r", game_number, token)
+                break
+            if move not in generator_for(board).legal_moves(board, board.turn):
+                logger.warning("Game %d: skipping the rest after illegal move %r at ply %d", game_number, token, ply)
+                break
+            yield board.hash, move, 2 if board.turn == winner else 1
+            board.do_move(move)
+
+
+def open_book(path: Optional[str]) -> Optional[OpeningBook]:
+    """Open the configured book, or None if no path is set or the file cannot be used"""
+    if not path:
+        return None
+    try:
+        return OpeningBook(path)
+    except (OSError, ValueError) as e:
+        logger.warning("Opening book disabled: %s", e)
+        return None
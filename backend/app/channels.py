@@ -0,0 +1,34 @@
+import logging
+from typing import Any, Dict, Set
+from fastapi import WebSocket
+
+logger = logging.getLogger(__name__)
+
+
+class GameChannels:
+    """WebSocket subscribers per game, for pushing updates as they happen"""
+
+    def __init__(self):
+        self._sockets: Dict[str, Set[WebSocket]] = {}
+
+    def subscribe(self, game_id: str, websocket: WebSocket) -> None:
+        self._sockets.setdefault(game_id, set()).add(websocket)
+
+    def unsubscribe(self, game_id: str, websocket: WebSocket) -> None:
+        sockets = self._sockets.get(game_id)
+        if sockets is not None:
+            sockets.discard(websocket)
+            if not sockets:
+                del self._sockets[game_id]
+
+    def has_subscribers(self, game_id: str) -> bool:
+        return game_id in self._sockets
+
+    async def publish(self, game_id: str, message: Dict[str, Any]) -> None:
+        """Send a JSON message to every socket of a game, dropping the ones that fail"""
+        for websocket in list(self._sockets.get(game_id, ())):
+            try:
+                await websocket.send_json(message)
+            except Exception as e:  # closed socket or broken connection
+                logger.debug("Dropping WebSocket of game %s: %s", game_id, e)
+                self.unsubscribe(game_id, websocket)
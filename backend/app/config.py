@@ -0,0 +1,74 @@
+import os
+from typing import Optional
+
+
+def _env_int(name: str, default: Optional[int]) -> Optional[int]:
+    """Read an integer setting from the environment; 0 or empty disables optional limits"""
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return int(value)
+
+
+# AI search budget for /api/move. Lower the time or node limit for faster
+# replies, raise them (and the depth) for a stronger opponent.
+AI_MAX_DEPTH = _env_int("AI_MAX_DEPTH", 6)
+AI_TIME_LIMIT_MS = _env_int("AI_TIME_LIMIT_MS", 1000)
+AI_NODE_LIMIT = _env_int("AI_NODE_LIMIT", None)
+
+# Transposition table memory cap for the AI, in megabytes, per engine worker.
+# Each worker keeps its table for its lifetime, across searches and games;
+# entries from earlier searches are not cleared but become replaceable.
+TT_SIZE_MB = _env_int("TT_SIZE_MB", 16)
+
+# Game sessions: how many games stay in memory and how long an idle game is kept
+SESSION_MAX_GAMES = _env_int("SESSION_MAX_GAMES", 1000)
+SESSION_TTL_SECONDS = _env_int("SESSION_TTL_SECONDS", 3600)
+
+# SQLite file for write-behind game persistence and how often it is flushed
+GAME_DB_PATH = os.environ.get("GAME_DB_PATH", "games.sqlite3")
+PERSIST_FLUSH_MS = _env_int("PERSIST_FLUSH_MS", 500)
+
+# AI engine worker processes (0 = one background thread) and how many searches
+# may be queued or running before /api/move answers 503
+ENGINE_WORKERS = _env_int("ENGINE_WORKERS", min(4, os.cpu_count() or 1))
+ENGINE_MAX_PENDING = _env_int("ENGINE_MAX_PENDING", 64)
+
+# Processes per search (Lazy SMP, see app.smp); each engine worker runs this many
+SEARCH_THREADS = _env_int("SEARCH_THREADS", 1)
+
+# Engine workers that may search the expected player reply between turns
+# (pondering) at once, across all games; 0 disables pondering
+PONDER_BUDGET = _env_int("PONDER_BUDGET", 0)
+
+# /api/analyze budget: searches without a time or node limit get
+# ANALYSIS_TIME_LIMIT_MS, client limits are clamped to the maxima, and at most
+# ANALYSIS_BUDGET workers analyze at once (never all of them, so games can move)
+ANALYSIS_MAX_DEPTH = _env_int("ANALYSIS_MAX_DEPTH", 32)
+ANALYSIS_TIME_LIMIT_MS = _env_int("ANALYSIS_TIME_LIMIT_MS", 2000)
+ANALYSIS_MAX_TIME_MS = _env_int("ANALYSIS_MAX_TIME_MS", 10000)
+ANALYSIS_MAX_NODES = _env_int("ANALYSIS_MAX_NODES", 5_000_000)
+ANALYSIS_BUDGET = _env_int("ANALYSIS_BUDGET", max(1, ENGINE_WORKERS - 1))
+
+# Opening book compiled with `python -m tools.build_book`; empty disables it
+BOOK_PATH = os.environ.get("BOOK_PATH", "")
+
+# Endgame tables built with `python -m tools.build_tablebase`; empty disables them
+TABLEBASE_DIR = os.environ.get("TABLEBASE_DIR", "")
+
+# Precomputed engine tables written by `python -m tools.build_tables`, mapped
+# at startup when present; without it the tables are built on import
+TABLE_SNAPSHOT = os.environ.get("TABLE_SNAPSHOT", "engine_tables.bin")
+
+# Sampling profiler: cProfile every N-th HTTP request into PROFILE_DIR (0 = off);
+# can be changed at runtime through /debug/profiler
+PROFILE_EVERY = _env_int("PROFILE_EVERY", 0)
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+# Profiles kept in PROFILE_DIR; older ones are deleted as new ones are written
+PROFILE_KEEP = _env_int("PROFILE_KEEP", 50)
+
+# Token the /debug routes require in an X-Admin-Token header; empty disables them
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+# Board representation used by move generation and search: "mailbox" or "bitboard"
+BOARD_BACKEND = os.environ.get("BOARD_BACKEND", "mailbox")
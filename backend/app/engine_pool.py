@@ -0,0 +1,367 @@
+import asyncio
+import multiprocessing
+import multiprocessing.util
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+from .models import GameState, Move
+from .board import board_class, board_of, coords, square
+from .fen import board_fen, from_fen, to_fen
+from .search import SearchLimits, SearchResult, analyze
+from .tt import TranspositionTable
+from .book import OpeningBook, open_book
+from .tablebase import Tablebase, open_tablebase
+from .smp import LazySMP
+from .logging_config import configure_logging
+from . import metrics
+
+
+class EngineBusy(Exception):
+    """Raised when the engine queue is full and a search cannot be accepted"""
+
+
+class SearchProgress(NamedTuple):
+    """Latest completed depth of an in-flight search; score is from the searching side's view"""
+    depth: int
+    score: int
+    nodes: int
+    move: Optional[Move]
+
+
+# Per-slot progress words written by the workers: depth, score, nodes, packed move
+_PROGRESS_FIELDS = 4
+# How often a search with a progress callback is checked for news (seconds)
+PROGRESS_INTERVAL = 0.1
+
+
+class _Ponder(NamedTuple):
+    """A background search of the position expected after the player's reply"""
+    fen: str
+    slot: int
+    future: "asyncio.Future"
+
+# Per-worker state, set up once by _init_worker in each engine process
+_cancel_flags = None
+_progress = None
+_worker_tt: Optional[TranspositionTable] = None
+_worker_book: Optional[OpeningBook] = None
+_worker_tablebase: Optional[Tablebase] = None
+_worker_smp: Optional[LazySMP] = None
+
+
+def _init_worker(cancel_flags, progress, tt_size_mb: int, book_path: Optional[str],
+                 search_threads: int = 1, tablebase_dir: Optional[str] = None) -> None:
+    global _cancel_flags, _progress, _worker_tt, _worker_book, _worker_smp, _worker_tablebase
+    configure_logging()
+    _cancel_flags = cancel_flags
+    _progress = progress
+    if search_threads > 1:
+        _worker_smp = LazySMP(search_threads, tt_size_mb)
+        _worker_tt = _worker_smp.tt
+        multiprocessing.util.Finalize(_worker_smp, _worker_smp.close, exitpriority=10)  # frees the shared table
+    else:
+        _worker_tt = TranspositionTable(tt_size_mb)
+    _worker_book = open_book(book_path)  # mmapped, so workers share one copy
+    _worker_tablebase = open_tablebase(tablebase_dir)  # mmapped as well
+
+
+def _run_search(slot: int, fen: str, limits: SearchLimits) -> Optional[Tuple]:
+    """Engine-side job: search a FEN position, aborting when the slot is cancelled.
+
+    Returns the (from, to) squares of the best move; squares rather than a
+    piece id, so the caller does not depend on how pieces are numbered.
+    The third value is the expected reply (the second move of the principal
+    variation, packed) or -1 if there is none, the fourth the (nodes, TT
+    hits, TT misses, move generation calls) of the search, or None if the
+    move came from the book or tablebase.
+    """
+    from .game_logic import get_ai_move
+    pv: List[int] = []
+    stats = []
+
+    def finished(result: SearchResult) -> None:
+        pv[:] = result.pv
+        stats[:] = (result.nodes, result.tt_hits, result.tt_misses, result.movegen_calls)
+
+    def report(result: SearchResult) -> None:
+        base = slot * _PROGRESS_FIELDS
+        _progress[base + 1] = result.score
+        _progress[base + 2] = result.nodes
+        _progress[base + 3] = result.move if result.move is not None else -1
+        _progress[base] = result.depth  # written last: readers key on a new depth
+
+    state = from_fen(fen)
+    move = get_ai_move(state, limits, _worker_tt, stop=lambda: _cancel_flags[slot] != 0, book=_worker_book,
+                       smp=_worker_smp, on_depth=report, tablebase=_worker_tablebase, on_result=finished)
+    if move is None or _cancel_flags[slot]:
+        return None
+    piece = state.pieces[move.piece_id]
+    from_sq, to_sq = square(piece.x, piece.y), square(move.to_x, move.to_y)
+    reply = pv[1] if len(pv) > 1 and pv[0] == from_sq << 7 | to_sq else -1
+    return from_sq, to_sq, reply, tuple(stats) or None
+
+
+def _run_analysis(slot: int, fen: str, limits: SearchLimits, multipv: int) -> List[Tuple[int, int, int, List[int]]]:
+    """Engine-side job: the best `multipv` lines of a FEN position as (score, depth, nodes, pv)"""
+    board = board_class().from_state(from_fen(fen))
+    lines = analyze(board, limits, multipv, _worker_tt, stop=lambda: _cancel_flags[slot] != 0)
+    return [(line.score, line.depth, line.nodes, line.pv) for line in lines]
+
+
+class EnginePool:
+    """Runs AI searches in worker processes, off the event loop.
+
+    At most `max_pending` searches may be queued or running; each one holds a
+    slot whose shared cancel flag the search polls, so a game's in-flight
+    search can be aborted with `cancel(game_id)`. With `workers=0` searches
+    run in a single background thread instead of separate processes. With
+    `search_threads` > 1 each worker searches with that many Lazy SMP processes.
+    Endings covered by the tables in `tablebase_dir` are played without searching.
+
+    With `ponder_budget` > 0, each search is followed by a search of the
+    position after the reply it expects (pondering), so a correct guess is
+    answered at once. At most `ponder_budget` workers ponder at a time, only
+    while a worker is idle, and a new search cancels the oldest ponder when
+    every worker is busy. A cancelled ponder's table entries stay in the
+    transposition table of the worker that ran it. Each worker has its own
+    table, so only a later search that lands on the same worker reuses them.
+
+    Analyses (`analyze`) run on at most `analysis_budget` workers at a time,
+    and never on all of them, so a game search always has a worker free of
+    analyses; further analyses hold their slot and wait their turn here
+    instead of queueing in the executor ahead of game searches.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 64, tt_size_mb: int = 16,
+                 book_path: Optional[str] = None, search_threads: int = 1,
+                 tablebase_dir: Optional[str] = None, ponder_budget: int = 0, analysis_budget: int = 1):
+        self.workers = workers
+        self.search_threads = search_threads
+        self.max_pending = max_pending
+        self.tt_size_mb = tt_size_mb
+        self.book_path = book_path
+        self.tablebase_dir = tablebase_dir
+        self.ponder_budget = ponder_budget
+        self.ponder_hits = 0
+        self.ponder_misses = 0
+        self.analysis_budget = max(1, min(analysis_budget, workers - 1))
+        self._analyses = 0  # analyses handed to the executor and not yet finished
+        self._analysis_waiters: "deque[asyncio.Future]" = deque()
+        self._cancel_flags = multiprocessing.Array("b", max_pending, lock=False)
+        self._progress = multiprocessing.Array("q", max_pending * _PROGRESS_FIELDS, lock=False)
+        self._free_slots: List[int] = list(range(max_pending))
+        self._jobs: Dict[int, Optional[str]] = {}  # slot -> game id, None for analysis
+        self._ponders: Dict[str, _Ponder] = {}  # game id -> its ponder, oldest first
+        self._executor: Optional[Executor] = None
+
+    @property
+    def pending(self) -> int:
+        """Searches currently queued or running"""
+        return self.max_pending - len(self._free_slots)
+
+    def start(self) -> None:
+        """Spawn the workers; search() calls this, so the first AI request starts the pool"""
+        if self._executor is not None:
+            return
+        initargs = (self._cancel_flags, self._progress, self.tt_size_mb, self.book_path, self.search_threads,
+                    self.tablebase_dir)
+        if self.workers > 0:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=initargs,
+            )
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=1, initializer=_init_worker, initargs=initargs)
+
+    def shutdown(self) -> None:
+        """Cancel every running search and stop the workers"""
+        for slot in self._jobs:
+            self._cancel_flags[slot] = 1
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def is_searching(self, game_id: str) -> bool:
+        return game_id in self._jobs.values()
+
+    def cancel(self, game_id: str) -> bool:
+        """Abort the in-flight searches (and ponder) for a game; returns False if there were none"""
+        self._ponders.pop(game_id, None)
+        cancelled = False
+        for slot, job_game_id in self._jobs.items():
+            if job_game_id == game_id:
+                self._cancel_flags[slot] = 1
+                cancelled = True
+        return cancelled
+
+    def _release(self, slot: int) -> None:
+        del self._jobs[slot]
+        self._free_slots.append(slot)
+
+    async def search(self, game_id: str, state: GameState, limits: SearchLimits,
+                     on_progress: Optional[Callable[[SearchProgress], Awaitable[None]]] = None) -> Optional[Move]:
+        """Search a game's position in the pool; None if cancelled or no move exists.
+
+        `on_progress` is awaited with a SearchProgress whenever the search
+        completes a new depth (checked every PROGRESS_INTERVAL seconds).
+        A ponder of the same position is taken over instead of starting anew.
+        """
+        fen = to_fen(state)
+        ponder = self._ponders.pop(game_id, None)
+        if ponder is not None:
+            if ponder.fen == fen and not ponder.future.cancelled():
+                self.ponder_hits += 1
+                metrics.PONDERS.inc(1, "hit")
+                result = await asyncio.shield(ponder.future)
+                return self._finish(game_id, state, result, limits, "ponder")
+            self.ponder_misses += 1
+            metrics.PONDERS.inc(1, "miss")
+            self._stop_ponder(ponder)
+        if not self._free_slots:
+            raise EngineBusy("Engine is busy, try again later")
+        if self._ponders and len(self._jobs) >= max(1, self.workers):
+            # Every worker is busy: the oldest ponder gives its worker up
+            self._stop_ponder(self._ponders.pop(next(iter(self._ponders))))
+        self.start()
+        slot = self._free_slots.pop()
+        self._cancel_flags[slot] = 0
+        base = slot * _PROGRESS_FIELDS
+        self._progress[base:base + _PROGRESS_FIELDS] = [0] * _PROGRESS_FIELDS
+        self._jobs[slot] = game_id
+        future = asyncio.get_running_loop().run_in_executor(
+            self._executor, _run_search, slot, fen, limits
+        )
+        try:
+            if on_progress is None:
+                result = await asyncio.shield(future)
+            else:
+                result = await self._watch(slot, future, state, on_progress)
+        except asyncio.CancelledError:
+            # The caller went away: stop the worker, but keep the slot until it has
+            self._cancel_flags[slot] = 1
+            future.add_done_callback(lambda _: self._release(slot))
+            raise
+        except BaseException:
+            self._release(slot)
+            raise
+        self._release(slot)
+        return self._finish(game_id, state, result, limits)
+
+    def _finish(self, game_id: str, state: GameState, result, limits: SearchLimits,
+                source: str = "search") -> Optional[Move]:
+        """Turn a worker result into a Move, pondering on the reply it expects"""
+        if result is None:
+            return None
+        from_sq, to_sq, reply, stats = result
+        if stats is None:
+            source = "lookup"
+        else:
+            metrics.record_search(*stats)
+        metrics.AI_MOVES.inc(1, source)
+        if reply >= 0:
+            self._ponder(game_id, state, from_sq << 7 | to_sq, reply, limits)
+        return _to_move(state, from_sq, to_sq)
+
+    def _ponder(self, game_id: str, state: GameState, move: int, reply: int, limits: SearchLimits) -> None:
+        """Start searching the position after `move` and `reply`, if the budget allows"""
+        if (len(self._ponders) >= self.ponder_budget or len(self._jobs) >= max(1, self.workers)
+                or not self._free_slots):
+            return
+        board = board_of(state).copy()
+        board.do_move(move)
+        board.do_move(reply)
+        fen = board_fen(board)
+        slot = self._free_slots.pop()
+        self._cancel_flags[slot] = 0
+        self._jobs[slot] = game_id
+        future = asyncio.get_running_loop().run_in_executor(self._executor, _run_search, slot, fen, limits)
+        future.add_done_callback(lambda _: self._release(slot))
+        self._ponders[game_id] = _Ponder(fen, slot, future)
+
+    async def analyze(self, fen: str, limits: SearchLimits, multipv: int = 1) -> List[Tuple[int, int, int, List[int]]]:
+        """The best `multipv` lines of a FEN position as (score, depth, nodes, packed pv), best first.
+
+        Scores are from the view of the side to move. The position takes a
+        slot like a game search, so EngineBusy is raised when none is free,
+        then waits until fewer than `analysis_budget` analyses are running.
+        """
+        if not self._free_slots:
+            raise EngineBusy("Engine is busy, try again later")
+        slot = self._free_slots.pop()
+        try:
+            await self._analysis_turn()
+        except BaseException:
+            self._free_slots.append(slot)
+            raise
+        self.start()
+        self._cancel_flags[slot] = 0
+        self._jobs[slot] = None
+        future = asyncio.get_running_loop().run_in_executor(
+            self._executor, _run_analysis, slot, fen, limits, multipv
+        )
+        future.add_done_callback(lambda _: self._end_analysis())  # the worker is free only once it is done
+        try:
+            lines = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            self._cancel_flags[slot] = 1
+            future.add_done_callback(lambda _: self._release(slot))
+            raise
+        except BaseException:
+            self._release(slot)
+            raise
+        self._release(slot)
+        return lines
+
+    async def _analysis_turn(self) -> None:
+        """Wait until an analysis may be handed to the executor, then count it as running"""
+        while self._analyses >= self.analysis_budget:
+            waiter = asyncio.get_running_loop().create_future()
+            self._analysis_waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._analysis_waiters:
+                    self._analysis_waiters.remove(waiter)
+                elif waiter.done() and not waiter.cancelled():
+                    self._wake_analysis()  # woken and cancelled at once: pass the turn on
+                raise
+        self._analyses += 1
+
+    def _end_analysis(self) -> None:
+        self._analyses -= 1
+        self._wake_analysis()
+
+    def _wake_analysis(self) -> None:
+        while self._analysis_waiters:
+            waiter = self._analysis_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    def _stop_ponder(self, ponder: _Ponder) -> None:
+        """Drop a ponder; what it stored stays in its worker's own transposition table only"""
+        if not ponder.future.done():
+            self._cancel_flags[ponder.slot] = 1
+
+    async def _watch(self, slot: int, future, state: GameState,
+                     on_progress: Callable[[SearchProgress], Awaitable[None]]):
+        """Wait for a search like asyncio.shield would, reporting each new depth on the way"""
+        base = slot * _PROGRESS_FIELDS
+        reported = 0
+        while True:
+            done, _ = await asyncio.wait({future}, timeout=PROGRESS_INTERVAL)
+            depth = self._progress[base]
+            if depth > reported:
+                reported = depth
+                score, nodes, move = self._progress[base + 1:base + _PROGRESS_FIELDS]
+                await on_progress(SearchProgress(depth, score, nodes,
+                                                 _to_move(state, move >> 7, move & 127) if move >= 0 else None))
+            if done:
+                return future.result()
+
+
+def _to_move(state: GameState, from_sq: int, to_sq: int) -> Move:
+    to_x, to_y = coords(to_sq)
+    return Move(piece_id=board_of(state).ids[from_sq], to_x=to_x, to_y=to_y)
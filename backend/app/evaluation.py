@@ -0,0 +1,183 @@
+from typing import TYPE_CHECKING, List, NamedTuple, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+    from .board import Board
+
+# Material values indexed by piece type code (see app.board: GENERAL=1 ... SOLDIER=7)
+DEFAULT_MATERIAL = (0, 1000, 20, 20, 40, 90, 45, 10)
+
+# Piece-square bonuses for red, one row per rank from black's back rank (y=0)
+# down to red's (y=9). Black uses the same tables mirrored top to bottom.
+_RED_TABLES = {
+    1: [  # GENERAL: stay on the back rank, prefer the central file
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, -8, -8, -8, 0, 0, 0],
+        [0, 0, 0, -4, -4, -4, 0, 0, 0],
+        [0, 0, 0, 1, 5, 1, 0, 0, 0],
+    ],
+    2: [  # ADVISOR: the palace centre guards best
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, -1, 0, -1, 0, 0, 0],
+        [0, 0, 0, 0, 3, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+    ],
+    3: [  # ELEPHANT: the central squares in front of the palace
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, -1, 0, 0, 0, -1, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [-2, 0, 0, 0, 3, 0, 0, 0, -2],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+    ],
+    4: [  # HORSE: centralised and advanced, never stuck on the edge
+        [2, 4, 6, 6, 4, 6, 6, 4, 2],
+        [2, 6, 10, 8, 4, 8, 10, 6, 2],
+        [4, 8, 10, 12, 10, 12, 10, 8, 4],
+        [4, 12, 10, 14, 12, 14, 10, 12, 4],
+        [2, 8, 10, 12, 12, 12, 10, 8, 2],
+        [2, 6, 8, 10, 10, 10, 8, 6, 2],
+        [0, 4, 6, 6, 8, 6, 6, 4, 0],
+        [0, 2, 4, 4, 2, 4, 4, 2, 0],
+        [-4, 0, 2, 2, -2, 2, 2, 0, -4],
+        [-4, -4, 0, 0, 0, 0, 0, -4, -4],
+    ],
+    5: [  # CHARIOT: open, advanced files; the enemy's second rank is strongest
+        [6, 8, 7, 10, 12, 10, 7, 8, 6],
+        [6, 10, 8, 14, 16, 14, 8, 10, 6],
+        [6, 8, 7, 10, 12, 10, 7, 8, 6],
+        [6, 10, 10, 12, 12, 12, 10, 10, 6],
+        [8, 10, 10, 12, 12, 12, 10, 10, 8],
+        [8, 10, 10, 12, 12, 12, 10, 10, 8],
+        [4, 8, 4, 10, 10, 10, 4, 8, 4],
+        [2, 6, 4, 8, 6, 8, 4, 6, 2],
+        [4, 6, 4, 8, 0, 8, 4, 6, 4],
+        [-2, 6, 4, 8, 0, 8, 4, 6, -2],
+    ],
+    6: [  # CANNON: the central file and the enemy's back ranks
+        [4, 4, 0, -4, -6, -4, 0, 4, 4],
+        [2, 2, 0, -2, -4, -2, 0, 2, 2],
+        [1, 1, 0, -2, 4, -2, 0, 1, 1],
+        [0, 0, 0, 0, 4, 0, 0, 0, 0],
+        [0, 0, 0, 0, 4, 0, 0, 0, 0],
+        [-1, 0, 2, 0, 4, 0, 2, 0, -1],
+        [0, 0, 0, 0, 2, 0, 0, 0, 0],
+        [1, 0, 2, 2, 4, 2, 2, 0, 1],
+        [0, 1, 1, 0, 0, 0, 1, 1, 0],
+        [0, 0, 1, 2, 2, 2, 1, 0, 0],
+    ],
+    7: [  # SOLDIER: worth more once across the river, most near the palace
+        [0, 0, 0, 2, 4, 2, 0, 0, 0],
+        [10, 14, 18, 22, 24, 22, 18, 14, 10],
+        [10, 14, 16, 20, 22, 20, 16, 14, 10],
+        [10, 12, 14, 16, 18, 16, 14, 12, 10],
+        [8, 10, 12, 14, 14, 14, 12, 10, 8],
+        [0, 0, 2, 0, 4, 0, 2, 0, 0],
+        [0, 0, 0, 0, 2, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0],
+    ],
+}
+
+
+def _piece_square(material: Sequence[int]) -> List[List[int]]:
+    """Material plus placement bonus of each piece code on each square, signed from red's point of view"""
+    table = [[0] * 90 for _ in range(16)]
+    for kind, rows in _RED_TABLES.items():
+        table[kind] = [material[kind] + value for row in rows for value in row]
+        table[kind | 8] = [-(material[kind] + value) for row in reversed(rows) for value in row]
+    return table
+
+
+# PIECE_SQUARE[code][sq]: black codes are negative and row 0 is empty. Plain
+# lists: scalar lookups on them are far cheaper than on NumPy arrays, which
+# matters in Board.do_move, and building them needs no NumPy at startup.
+PIECE_SQUARE: List[List[int]] = _piece_square(DEFAULT_MATERIAL)
+
+
+def __getattr__(name: str):
+    """MATERIAL and PST, the NumPy forms of the default tables, are built on first use"""
+    if name in ("MATERIAL", "PST"):
+        _numpy_tables()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _numpy_tables():
+    """(numpy, PST, square indices) for the vectorized helpers; imports NumPy on the first call"""
+    global MATERIAL, PST, _SQUARES
+    import numpy as np
+    if "PST" not in globals():
+        MATERIAL = np.array(DEFAULT_MATERIAL, dtype=np.int32)
+        PST = np.array(PIECE_SQUARE, dtype=np.int32)  # PST[code, sq]
+        _SQUARES = np.arange(90)
+    return np, PST, _SQUARES
+
+
+class Weights(NamedTuple):
+    """Evaluation weights: material values by type code and the PIECE_SQUARE-style table built from them"""
+    material: Tuple[int, ...]
+    piece_square: List[List[int]]
+
+
+DEFAULT_WEIGHTS = Weights(DEFAULT_MATERIAL, PIECE_SQUARE)
+
+
+def make_weights(material: Sequence[int]) -> Weights:
+    """Weights with other material values (indexed by type code) and the default placement bonuses.
+
+    The module tables are left alone; pass the result to a Searcher (or
+    Board.set_weights) to evaluate with it. Used by tools.arena to play
+    evaluation weights against each other.
+    """
+    material = tuple(int(value) for value in material)
+    return Weights(material, _piece_square(material))
+
+
+def score_squares(squares, piece_square: Optional[List[List[int]]] = None) -> int:
+    """Full material + PST score of a mailbox, from red's point of view (default weights unless given)"""
+    table = PIECE_SQUARE if piece_square is None else piece_square
+    return sum(table[code][sq] for sq, code in enumerate(squares) if code)
+
+
+def evaluate_batch(boards: Sequence["Board"]) -> "np.ndarray":
+    """Score many positions at once, each from the point of view of its side to move"""
+    np, PST, _SQUARES = _numpy_tables()
+    if not boards:
+        return np.zeros(0, dtype=np.int32)
+    codes = np.frombuffer(b"".join(bytes(b.squares) for b in boards), dtype=np.uint8).reshape(len(boards), 90)
+    scores = PST[codes, _SQUARES].sum(axis=1)
+    turns = np.fromiter((b.turn for b in boards), dtype=np.int32, count=len(boards))
+    return np.where(turns == 1, -scores, scores)
+
+
+def evaluate_moves(board: "Board", moves: Sequence[int]) -> "np.ndarray":
+    """Static score after each packed move, from the point of view of the side playing it.
+
+    Only the moving and captured pieces change, so each score is the board's
+    running score plus a delta computed for all moves in one vectorized pass.
+    """
+    np, PST, _ = _numpy_tables()
+    packed = np.asarray(moves, dtype=np.int32)
+    from_sq, to_sq = packed >> 7, packed & 127
+    squares = np.frombuffer(bytes(board.squares), dtype=np.uint8)
+    movers, captured = squares[from_sq], squares[to_sq]
+    scores = board.score + PST[movers, to_sq] - PST[movers, from_sq] - PST[captured, to_sq]
+    return -scores if board.turn else scores
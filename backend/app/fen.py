@@ -0,0 +1,139 @@
+from typing import Dict, List, Tuple
+from .models import GameState, Piece, PieceType, Side
+from .board import Board, CODE_TYPES, BLACK_FLAG, RED, board_of
+
+# Standard Xiangqi FEN letters; red is upper case. Ranks are listed from
+# black's back rank (y=0) down to red's (y=9), files from x=0 to x=8.
+FEN_LETTERS = {
+    PieceType.GENERAL: "k",
+    PieceType.ADVISOR: "a",
+    PieceType.ELEPHANT: "b",
+    PieceType.HORSE: "n",
+    PieceType.CHARIOT: "r",
+    PieceType.CANNON: "c",
+    PieceType.SOLDIER: "p",
+}
+LETTER_TYPES = {letter: piece_type for piece_type, letter in FEN_LETTERS.items()}
+LETTER_TYPES.update({"g": PieceType.GENERAL, "e": PieceType.ELEPHANT, "h": PieceType.HORSE})  # common aliases
+
+START_FEN = "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w"
+
+# Mailbox code -> FEN letter, and FEN letter -> (type, side)
+_CODE_LETTERS = [""] * 16
+for _code, _type in CODE_TYPES.items():
+    _CODE_LETTERS[_code] = FEN_LETTERS[_type].upper()
+    _CODE_LETTERS[_code | BLACK_FLAG] = FEN_LETTERS[_type]
+_LETTER_PIECES: Dict[str, Tuple[PieceType, Side]] = {}
+for _letter, _type in LETTER_TYPES.items():
+    _LETTER_PIECES[_letter.upper()] = (_type, Side.RED)
+    _LETTER_PIECES[_letter] = (_type, Side.BLACK)
+
+# Game result field of the storage record (PGN notation)
+_RESULTS = {None: "*", Side.RED: "1-0", Side.BLACK: "0-1"}
+_DRAW = "1/2-1/2"
+
+
+def to_fen(game_state: GameState) -> str:
+    """Board placement and side to move of a game state in FEN notation"""
+    return board_fen(board_of(game_state))
+
+
+def board_fen(board: Board) -> str:
+    """FEN of a board's current position (after any moves played on it)"""
+    squares = board.squares
+    ranks = []
+    for start in range(0, 90, 9):
+        rank = ""
+        empty = 0
+        for code in squares[start:start + 9]:
+            if code:
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                rank += _CODE_LETTERS[code]
+            else:
+                empty += 1
+        if empty:
+            rank += str(empty)
+        ranks.append(rank)
+    return "/".join(ranks) + (" w" if board.turn == RED else " b")
+
+
+def from_fen(fen: str) -> GameState:
+    """Parse a FEN string into a game state; raises ValueError if it is malformed.
+
+    Only the placement and side-to-move fields are used; red may be written
+    as "w" or "r". Each side needs exactly one general, inside its palace.
+    Pieces are numbered in reading order, which is the order make_move
+    keeps them in, so ids match those of the state that was encoded.
+    """
+    fields = fen.split()
+    if not fields:
+        raise ValueError("Empty FEN")
+    ranks = fields[0].split("/")
+    if len(ranks) != 10:
+        raise ValueError(f"FEN must have 10 ranks, got {len(ranks)}")
+    pieces: List[Piece] = []
+    generals: List[Tuple[Side, int, int]] = []
+    for y, rank in enumerate(ranks):
+        x = 0
+        for char in rank:
+            if char.isdigit():
+                x += int(char)
+                continue
+            if x > 8:
+                raise ValueError(f"FEN rank {y} is too long")
+            entry = _LETTER_PIECES.get(char)
+            if entry is None:
+                raise ValueError(f"Unknown FEN piece letter {char!r}")
+            # Fields come from the tables above, so skip validation
+            pieces.append(Piece.model_construct(type=entry[0], side=entry[1], x=x, y=y))
+            if entry[0] == PieceType.GENERAL:
+                generals.append((entry[1], x, y))
+            x += 1
+        if x != 9:
+            raise ValueError(f"FEN rank {y} covers {x} files instead of 9")
+    for side in (Side.RED, Side.BLACK):
+        placed = [(x, y) for general_side, x, y in generals if general_side == side]
+        if len(placed) != 1:
+            raise ValueError(f"FEN must have one {side.value} general, got {len(placed)}")
+        x, y = placed[0]
+        if not (3 <= x <= 5 and (y >= 7 if side == Side.RED else y <= 2)):
+            raise ValueError(f"The {side.value} general is outside its palace")
+    turn = fields[1].lower() if len(fields) > 1 else "w"
+    if turn not in ("w", "r", "b"):
+        raise ValueError(f"Unknown side to move {fields[1]!r}")
+    return GameState.model_construct(pieces=pieces, current_turn=Side.BLACK if turn == "b" else Side.RED,
+                                     game_over=False, winner=None)
+
+
+def dump_state(game_state: GameState) -> str:
+    """Compact storage record: FEN followed by the game result ("*" while in progress).
+
+    Games with moves played also carry their move log after a "|" (see
+    app.history.MoveHistory.dump).
+    """
+    if game_state.game_over and game_state.winner is None:
+        result = _DRAW
+    else:
+        result = _RESULTS[game_state.winner if game_state.game_over else None]
+    record = f"{to_fen(game_state)} {result}"
+    if game_state._history is not None and len(game_state._history):
+        record += "|" + game_state._history.dump()
+    return record
+
+
+def load_state(record: str) -> GameState:
+    """Parse a record written by dump_state (or a legacy full JSON payload)"""
+    if record.startswith("{"):
+        return GameState.model_validate_json(record)
+    record, _, history = record.partition("|")
+    fen, _, result = record.rpartition(" ")
+    state = from_fen(fen)
+    if result != "*":
+        state.game_over = True
+        state.winner = Side.RED if result == "1-0" else Side.BLACK if result == "0-1" else None
+    if history:
+        from .history import load_history
+        state._history = load_history(history)
+    return state
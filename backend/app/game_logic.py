@@ -1,39 +1,89 @@
-from typing import List, Tuple, Optional
+import logging
+from typing import Callable, List, Tuple, Optional
 from .models import GameState, Move, Piece, PieceType, Side
+from .movegen import encode_move, generator_for, to_api_move
+from .search import SearchLimits, SearchResult, evaluate, search
+from . import evaluation
+from .tt import TranspositionTable
+from .book import OpeningBook
+from .tablebase import Tablebase
+from .smp import LazySMP
+from .board import board_of, code_side, square, CODE_TYPES, SIDES, SIDE_INDEX, NO_PIECE, TYPE_MASK
+from .fen import board_fen, from_fen, to_fen
+from .history import REPETITION_LIMIT, adjudicate, history_of, move_flags, replay
+
+logger = logging.getLogger(__name__)
 
 def is_valid_move(game_state: GameState, move: Move) -> bool:
     """Validate if a move is legal according to Chinese Chess rules"""
-    print(f"\n=== Validating move ===")
-    print(f"Piece ID: {move.piece_id}, Destination: ({move.to_x}, {move.to_y})")
+    if not _follows_piece_rules(game_state, move):
+        return False
+    # The move must not leave the mover's general in check or facing the other general
+    board = board_of(game_state)
+    piece = game_state.pieces[move.piece_id]
+    side = SIDE_INDEX[piece.side]
+    board.do_move(encode_move(square(piece.x, piece.y), square(move.to_x, move.to_y)))
+    exposed = generator_for(board).in_check(board, side)
+    board.undo_move()
+    if exposed:
+        logger.debug("Invalid move - leaves the general in check")
+        return False
+    return True
+
+def check_position(game_state: GameState) -> str:
+    """FEN of a position that can arise in play; raises ValueError if it cannot.
+
+    Besides what from_fen checks (one general per side, in its palace), no
+    two pieces may share a square and the side that just moved must not have
+    left its general in check or facing the other general.
+    """
+    if len({(p.x, p.y) for p in game_state.pieces}) != len(game_state.pieces):
+        raise ValueError("Two pieces are on the same square")
+    fen = to_fen(from_fen(to_fen(game_state)))
+    board = board_of(game_state)
+    if generator_for(board).in_check(board, board.turn ^ 1):
+        raise ValueError("The side not to move is in check")
+    return fen
+
+def _follows_piece_rules(game_state: GameState, move: Move) -> bool:
+    """Check a move against the movement rules of the piece, ignoring checks"""
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug("Validating move: piece ID: %s, Destination: (%s, %s)", move.piece_id, move.to_x, move.to_y)
     
-    if move.piece_id >= len(game_state.pieces):
-        print(f"Invalid move: piece_id {move.piece_id} out of range")
+    if move.piece_id < 0 or move.piece_id >= len(game_state.pieces):
+        logger.debug("Invalid move: piece_id %s out of range", move.piece_id)
         return False
         
+    board = board_of(game_state)
     piece = game_state.pieces[move.piece_id]
-    print(f"Selected piece: {piece.type} ({piece.side}) at ({piece.x}, {piece.y})")
-    print(f"Current turn: {game_state.current_turn}")
+    if debug:
+        logger.debug("Selected piece: %s (%s) at (%s, %s), current turn: %s",
+                     piece.type, piece.side, piece.x, piece.y, game_state.current_turn)
     
     # Basic boundary checks
     if not (0 <= move.to_x <= 8 and 0 <= move.to_y <= 9):
-        print(f"Invalid move: destination ({move.to_x}, {move.to_y}) out of bounds")
+        logger.debug("Invalid move: destination (%s, %s) out of bounds", move.to_x, move.to_y)
         return False
         
     # Check if it's the correct player's turn
     if piece.side != game_state.current_turn:
-        print(f"Invalid move: wrong turn (piece side: {piece.side}, current turn: {game_state.current_turn})")
+        logger.debug("Invalid move: wrong turn (piece side: %s, current turn: %s)", piece.side, game_state.current_turn)
         return False
         
     # Check if trying to move to current position
     if piece.x == move.to_x and piece.y == move.to_y:
-        print("Invalid move: piece cannot stay in the same position")
+        logger.debug("Invalid move: piece cannot stay in the same position")
         return False
         
+    from_sq = square(piece.x, piece.y)
+    to_sq = square(move.to_x, move.to_y)
+    target = board.squares[to_sq]
+
     # Check if destination has a friendly piece
-    for p in game_state.pieces: 
-        if p.x == move.to_x and p.y == move.to_y and p.side == piece.side:
-            print(f"Invalid move: destination occupied by friendly piece at ({move.to_x}, {move.to_y})")
-            return False
+    if target and code_side(target) == SIDE_INDEX[piece.side]:
+        logger.debug("Invalid move: destination occupied by friendly piece at (%s, %s)", move.to_x, move.to_y)
+        return False
             
     # Piece-specific movement rules
     if piece.type == PieceType.GENERAL:
@@ -63,14 +113,17 @@ def is_valid_move(game_state: GameState, move: Move) -> bool:
         if (piece.side == Side.RED and move.to_y < 5) or \
            (piece.side == Side.BLACK and move.to_y > 4):
             return False
+        # Cannot jump over a piece on the elephant's eye
+        if board.code_at((piece.x + move.to_x) // 2, (piece.y + move.to_y) // 2):
+            return False
             
     elif piece.type == PieceType.HORSE:
-        print(f"DEBUG: Validating horse move from ({piece.x}, {piece.y}) to ({move.to_x}, {move.to_y})")
+        logger.debug("Validating horse move from (%s, %s) to (%s, %s)", piece.x, piece.y, move.to_x, move.to_y)
         # Horse moves in L shape (2+1)
         dx = abs(move.to_x - piece.x)
         dy = abs(move.to_y - piece.y)
         if not ((dx == 2 and dy == 1) or (dx == 1 and dy == 2)):
-            print("DEBUG: Invalid horse move pattern")
+            logger.debug("Invalid horse move pattern")
             return False
             
         # Check for blocking pieces
@@ -84,107 +137,65 @@ def is_valid_move(game_state: GameState, move: Move) -> bool:
             blocking_y = piece.y + (1 if move.to_y > piece.y else -1)
             
         # Check if there's a piece blocking the horse's path
-        for p in game_state.pieces:
-            if p.x == blocking_x and p.y == blocking_y:
-                print(f"DEBUG: Horse move blocked at ({blocking_x}, {blocking_y})")
-                return False
+        if board.code_at(blocking_x, blocking_y):
+            logger.debug("Horse move blocked at (%s, %s)", blocking_x, blocking_y)
+            return False
                 
-        print("DEBUG: Valid horse move")
+        logger.debug("Valid horse move")
         return True
             
     elif piece.type == PieceType.CHARIOT:
         # Chariot moves horizontally or vertically
         if piece.x != move.to_x and piece.y != move.to_y:
-            print("DEBUG: Invalid chariot move - must move horizontally or vertically")
+            logger.debug("Invalid chariot move - must move horizontally or vertically")
             return False
             
         # Check for blocking pieces along the path
-        if piece.x == move.to_x:  # Vertical move
-            start_y = min(piece.y, move.to_y)
-            end_y = max(piece.y, move.to_y)
-            for p in game_state.pieces:
-                if p.x == piece.x and start_y < p.y < end_y:
-                    print(f"DEBUG: Chariot path blocked at ({p.x}, {p.y})")
-                    return False
-        else:  # Horizontal move
-            start_x = min(piece.x, move.to_x)
-            end_x = max(piece.x, move.to_x)
-            for p in game_state.pieces:
-                if p.y == piece.y and start_x < p.x < end_x:
-                    print(f"DEBUG: Chariot path blocked at ({p.x}, {p.y})")
-                    return False
-                    
-        print("DEBUG: Valid chariot move")
+        if board.count_between(from_sq, to_sq) > 0:
+            logger.debug("Chariot path blocked")
+            return False
+
+        logger.debug("Valid chariot move")
         return True
     elif piece.type == PieceType.CANNON:
-        print(f"DEBUG: Validating cannon move from ({piece.x}, {piece.y}) to ({move.to_x}, {move.to_y})")
+        logger.debug("Validating cannon move from (%s, %s) to (%s, %s)", piece.x, piece.y, move.to_x, move.to_y)
         
         # Cannon must move horizontally or vertically
         if piece.x != move.to_x and piece.y != move.to_y:
-            print("DEBUG: Invalid cannon move - must move horizontally or vertically")
+            logger.debug("Invalid cannon move - must move horizontally or vertically")
             return False
             
-        # Check if this is a capture move
-        target_piece = None
-        for p in game_state.pieces:
-            if p.x == move.to_x and p.y == move.to_y:
-                target_piece = p
-                break
-                
-        capturing = target_piece is not None and target_piece.side != piece.side
-        print(f"DEBUG: Move is{' ' if capturing else ' not '}a capture move")
-        
-        if piece.x == move.to_x:  # Vertical move
-            print("DEBUG: Vertical move")
-            start_y = min(piece.y, move.to_y)
-            end_y = max(piece.y, move.to_y)
-            # Count pieces between start and end positions
-            pieces_between = [
-                p for p in game_state.pieces
-                if p.x == piece.x 
-                and start_y < p.y < end_y
-            ]
-            print(f"DEBUG: Found {len(pieces_between)} pieces between")
-            
-            if capturing:
-                if len(pieces_between) != 1:
-                    print(f"DEBUG: Invalid cannon capture - need exactly one piece between, found {len(pieces_between)}")
-                    return False
-            else:
-                if len(pieces_between) > 0:
-                    print("DEBUG: Invalid cannon move - path must be clear for non-capture moves")
-                    return False
-        else:  # Horizontal move
-            print("DEBUG: Horizontal move")
-            start_x = min(piece.x, move.to_x)
-            end_x = max(piece.x, move.to_x)
-            # Count pieces between start and end positions
-            pieces_between = [
-                p for p in game_state.pieces
-                if p.y == piece.y 
-                and start_x < p.x < end_x
-            ]
-            print(f"DEBUG: Found {len(pieces_between)} pieces between")
-            
-            if capturing:
-                if len(pieces_between) != 1:
-                    print(f"DEBUG: Invalid cannon capture - need exactly one piece between, found {len(pieces_between)}")
-                    return False
-            else:
-                if len(pieces_between) > 0:
-                    print("DEBUG: Invalid cannon move - path must be clear for non-capture moves")
-                    return False
-                    
-        print("DEBUG: Cannon move validation successful!")
+        # Check if this is a capture move (friendly targets were rejected above)
+        capturing = target != 0
+        logger.debug("Move is%sa capture move", ' ' if capturing else ' not ')
+
+        # Count pieces between start and end positions
+        pieces_between = board.count_between(from_sq, to_sq)
+        logger.debug("Found %s pieces between", pieces_between)
+
+        if capturing:
+            if pieces_between != 1:
+                logger.debug("Invalid cannon capture - need exactly one piece between, found %s", pieces_between)
+                return False
+        else:
+            if pieces_between > 0:
+                logger.debug("Invalid cannon move - path must be clear for non-capture moves")
+                return False
+
+        logger.debug("Cannon move validation successful!")
         return True
             
     elif piece.type == PieceType.SOLDIER:
         # Soldier moves forward one step (or sideways after crossing river)
-        print(f"DEBUG: Validating soldier move for {piece.side} from ({piece.x}, {piece.y}) to ({move.to_x}, {move.to_y})")
+        if debug:
+            logger.debug("Validating soldier move for %s from (%s, %s) to (%s, %s)",
+                         piece.side, piece.x, piece.y, move.to_x, move.to_y)
         
         # Can only move one step at a time
         if abs(move.to_x - piece.x) + abs(move.to_y - piece.y) != 1:
-            print(f"DEBUG: Invalid soldier move - attempted to move {abs(move.to_x - piece.x) + abs(move.to_y - piece.y)} steps")
+            if debug:
+                logger.debug("Invalid soldier move - attempted to move %s steps",
+                             abs(move.to_x - piece.x) + abs(move.to_y - piece.y))
             return False
             
         # Check if the soldier has crossed the river
@@ -197,79 +208,88 @@ def is_valid_move(game_state: GameState, move: Move) -> bool:
         # Movement rules based on position
         if piece.side == Side.RED:
             # Red moves up (decreasing y)
-            if move.to_y >= piece.y:  # Cannot move backwards
-                print("DEBUG: Invalid move - RED soldier cannot move backwards")
+            if move.to_y > piece.y:  # Cannot move backwards
+                logger.debug("Invalid move - RED soldier cannot move backwards")
                 return False
             if not crossed_river and move.to_x != piece.x:  # Can only move forward before crossing
-                print("DEBUG: Invalid move - RED soldier hasn't crossed river, can only move forward")
+                logger.debug("Invalid move - RED soldier hasn't crossed river, can only move forward")
                 return False
         else:  # BLACK
             # Black moves down (increasing y)
-            if move.to_y <= piece.y:  # Cannot move backwards
-                print("DEBUG: Invalid move - BLACK soldier cannot move backwards")
+            if move.to_y < piece.y:  # Cannot move backwards
+                logger.debug("Invalid move - BLACK soldier cannot move backwards")
                 return False
             if not crossed_river and move.to_x != piece.x:  # Can only move forward before crossing
-                print("DEBUG: Invalid move - BLACK soldier hasn't crossed river, can only move forward")
+                logger.debug("Invalid move - BLACK soldier hasn't crossed river, can only move forward")
                 return False
                 
-        print("DEBUG: Valid soldier move")
+        logger.debug("Valid soldier move")
         return True
             
     return True
 
 def make_move(game_state: GameState, move: Move) -> GameState:
-    """Apply a move to the game state and return the new state"""
-    print(f"\nMaking move: piece_id={move.piece_id}, to=({move.to_x}, {move.to_y})")
-    print(f"Current turn before move: {game_state.current_turn}")
+    """Apply a move to the game state and return the new state.
+
+    The move is played with Board.do_move on a copy of the state's board;
+    pieces that did not move are shared with the old state.
+    """
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug("Making move: piece_id=%s, to=(%s, %s), current turn: %s",
+                     move.piece_id, move.to_x, move.to_y, game_state.current_turn)
     
     if not game_state:
         raise ValueError("Game state cannot be None")
     
-    # Create new game state with deep copy of all pieces first
-    new_pieces = [p.copy() for p in game_state.pieces]
-    moved_piece = None
-    captured_piece = None
-    
-    # Find the piece being moved and any piece being captured
-    for i, p in enumerate(new_pieces):
-        if i == move.piece_id:
-            moved_piece = p
-        elif p.x == move.to_x and p.y == move.to_y:
-            captured_piece = p
-    
-    if moved_piece is None:
+    if not 0 <= move.piece_id < len(game_state.pieces):
         raise ValueError("Invalid piece_id")
+    piece = game_state.pieces[move.piece_id]
         
     # Verify it's the correct player's turn
-    if moved_piece.side != game_state.current_turn:
-        raise ValueError(f"Wrong turn: piece side {moved_piece.side} != current turn {game_state.current_turn}")
-        
-    # Store original position for logging
-    orig_x, orig_y = moved_piece.x, moved_piece.y
+    if piece.side != game_state.current_turn:
+        raise ValueError(f"Wrong turn: piece side {piece.side} != current turn {game_state.current_turn}")
+    
+    if not (0 <= move.to_x <= 8 and 0 <= move.to_y <= 9):
+        raise ValueError("Destination out of bounds")
+    from_sq = square(piece.x, piece.y)
+    to_sq = square(move.to_x, move.to_y)
+    if from_sq == to_sq:
+        raise ValueError("Piece cannot stay in the same position")
+    
+    # Play the move on a private copy of the board
+    board = board_of(game_state).copy()
+    captured_id = board.ids[to_sq]
+    board.do_move(encode_move(from_sq, to_sq))
+    board.undo_stack.clear()
+    
+    # Pieces are kept in square order, so a FEN string fully determines the state
+    moved_piece = Piece(type=piece.type, side=piece.side, x=move.to_x, y=move.to_y)
+    pieces = game_state.pieces
+    new_pieces = [moved_piece if i == move.piece_id else pieces[i] for i in board.renumber()]
     
-    # Update moved piece position
-    moved_piece.x = move.to_x
-    moved_piece.y = move.to_y
+    captured_piece = None
+    if captured_id != NO_PIECE:
+        captured_piece = pieces[captured_id]
+        logger.debug("Captured %s at (%s, %s)", captured_piece.type, move.to_x, move.to_y)
     
-    # Remove captured piece if any
-    if captured_piece:
-        new_pieces.remove(captured_piece)
-        print(f"Captured {captured_piece.type} at ({move.to_x}, {move.to_y})")
+    if debug:
+        logger.debug("Moving %s from (%s, %s) to (%s, %s)", moved_piece.type, piece.x, piece.y, move.to_x, move.to_y)
     
-    print(f"Moving {moved_piece.type} from ({orig_x}, {orig_y}) to ({move.to_x}, {move.to_y})")
+    packed = encode_move(from_sq, to_sq)
+    history = history_of(game_state).pushed(packed, board.hash, move_flags(board, packed))
     
-    # Check for game over (general captured)
-    game_over = False
-    winner = None
-    generals = [p for p in new_pieces if p.type == PieceType.GENERAL]
-    if len(generals) < 2:
-        game_over = True
-        winner = generals[0].side if generals else None
-        print(f"Game over! Winner: {winner}")
+    # Check for game over: general captured, the opponent has no legal move
+    # left (checkmate and stalemate both lose in Xiangqi), or a repetition
+    if captured_piece and captured_piece.type == PieceType.GENERAL:
+        game_over, winner = True, moved_piece.side
+    else:
+        game_over, winner = _game_result(board, history)
+    if game_over:
+        logger.info("Game over! Winner: %s", winner)
     
     # Switch turns
     next_turn = Side.BLACK if game_state.current_turn == Side.RED else Side.RED
-    print(f"Switching turn from {game_state.current_turn} to {next_turn}")
     
     # Create new game state with switched turn
     new_state = GameState(
@@ -278,101 +298,115 @@ def make_move(game_state: GameState, move: Move) -> GameState:
         game_over=game_over,
         winner=winner
     )
+    new_state._board = board
+    new_state._last_move = (from_sq, to_sq, captured_piece.type if captured_piece else None)
+    new_state._history = history
     
-    print(f"New game state - pieces: {len(new_state.pieces)}, turn: {new_state.current_turn}")
+    if debug:
+        logger.debug("New game state - pieces: %s, turn: %s", len(new_state.pieces), new_state.current_turn)
     return new_state
 
+def _game_result(board, history) -> Tuple[bool, Optional[Side]]:
+    """(game over, winner) of a position reached by the given history"""
+    if not generator_for(board).legal_moves(board, board.turn):
+        return True, SIDES[board.turn ^ 1]
+    if history.repetitions() >= REPETITION_LIMIT:
+        loser = adjudicate(history.cycle_flags(), board.turn)
+        return True, None if loser is None else SIDES[loser ^ 1]
+    return False, None
+
+def undo_moves(game_state: GameState, plies: int = 1) -> GameState:
+    """Take back the last `plies` moves by replaying the rest of the move log from its start"""
+    history = history_of(game_state)
+    if not 1 <= plies <= len(history):
+        raise ValueError(f"Can undo 1 to {len(history)} moves, not {plies}")
+    board, history = replay(history.start_fen, history.moves[:len(history) - plies])
+    state = from_fen(board_fen(board))
+    state.game_over, state.winner = _game_result(board, history)
+    state._history = history
+    if board.undo_stack:
+        move, _, captured_code, _, _ = board.undo_stack[-1]
+        state._last_move = (move >> 7, move & 127, CODE_TYPES[captured_code & TYPE_MASK] if captured_code else None)
+    return state
+
+def evaluate_moves(game_state: GameState, moves: List[Move]) -> List[int]:
+    """Evaluate a batch of moves for the side to move in one vectorized call.
+
+    Each score is how much the move changes the mover's material and
+    piece-square score; captures count the victim's full value.
+    """
+    board = board_of(game_state)
+    pieces = game_state.pieces
+    packed = [encode_move(square(pieces[m.piece_id].x, pieces[m.piece_id].y), square(m.to_x, m.to_y)) for m in moves]
+    scores = (evaluation.evaluate_moves(board, packed) - evaluate(board)).tolist() if packed else []
+    if logger.isEnabledFor(logging.DEBUG):
+        for move, score in zip(moves, scores):
+            logger.debug("Move evaluation: piece=%s, to=(%s,%s), score=%s",
+                         pieces[move.piece_id].type, move.to_x, move.to_y, score)
+    return scores
+
+
 def evaluate_move(game_state: GameState, move: Move) -> int:
-    """Evaluate a move's strategic value"""
+    """Evaluate a move's strategic value; scalar form of evaluate_moves for single calls"""
+    board = board_of(game_state)
     piece = game_state.pieces[move.piece_id]
-    score = 0
-    
-    # Piece values for capturing and protection
-    piece_values = {
-        PieceType.GENERAL: 1000,
-        PieceType.CHARIOT: 90,
-        PieceType.CANNON: 45,
-        PieceType.HORSE: 40,
-        PieceType.ADVISOR: 20,
-        PieceType.ELEPHANT: 20,
-        PieceType.SOLDIER: 10
-    }
-    
-    # Check if move captures an opponent's piece
-    for p in game_state.pieces:
-        if p.x == move.to_x and p.y == move.to_y and p.side != piece.side:
-            score += piece_values[p.type] * 2  # Double value for captures
-    
-    # Find opponent's general
-    opponent_general = None
-    for p in game_state.pieces:
-        if p.type == PieceType.GENERAL and p.side != piece.side:
-            opponent_general = p
-            break
-    
-    if opponent_general:
-        # Encourage moving toward opponent's general
-        current_dist = abs(piece.x - opponent_general.x) + abs(piece.y - opponent_general.y)
-        new_dist = abs(move.to_x - opponent_general.x) + abs(move.to_y - opponent_general.y)
-        if new_dist < current_dist:
-            score += 15
-        
-        # Extra points for moves that could lead to checkmate
-        if piece.type in [PieceType.CHARIOT, PieceType.CANNON, PieceType.HORSE]:
-            if move.to_x == opponent_general.x or move.to_y == opponent_general.y:
-                score += 25
-    
-    # Protect valuable pieces
-    for p in game_state.pieces:
-        if p.side == piece.side and p.type in [PieceType.GENERAL, PieceType.CHARIOT]:
-            dist_to_friendly = abs(move.to_x - p.x) + abs(move.to_y - p.y)
-            if dist_to_friendly <= 2:  # Stay close to protect valuable pieces
-                score += 10
-    
-    # Control center (middle columns)
-    if 3 <= move.to_x <= 5:
-        score += 5
-    
-    # Advance soldiers across river
-    if piece.type == PieceType.SOLDIER:
-        if (piece.side == Side.RED and move.to_y < 5) or \
-           (piece.side == Side.BLACK and move.to_y > 4):
-            score += 20
-    
-    print(f"Move evaluation: piece={piece.type}, from=({piece.x},{piece.y}), to=({move.to_x},{move.to_y}), score={score}")
-    return score
+    from_sq = square(piece.x, piece.y)
+    to_sq = square(move.to_x, move.to_y)
+    values = evaluation.PIECE_SQUARE[board.squares[from_sq]]
+    delta = values[to_sq] - values[from_sq] - evaluation.PIECE_SQUARE[board.squares[to_sq]][to_sq]
+    return -delta if piece.side == Side.BLACK else delta
 
-def get_ai_move(game_state: GameState) -> Optional[Move]:
-    """Generate a strategic move for the AI player"""
-    import random
-    print("AI is thinking...")
-    
-    move_scores = {}
+def get_ai_move(game_state: GameState, limits: Optional[SearchLimits] = None,
+                tt: Optional[TranspositionTable] = None,
+                stop: Optional[Callable[[], bool]] = None,
+                book: Optional[OpeningBook] = None, smp: Optional[LazySMP] = None,
+                on_depth: Optional[Callable[[SearchResult], None]] = None,
+                tablebase: Optional[Tablebase] = None,
+                on_result: Optional[Callable[[SearchResult], None]] = None) -> Optional[Move]:
+    """Search for the best move for the side to move within the given budget.
+
+    Pass the same transposition table on consecutive turns of a game to reuse
+    earlier results. `stop` is polled during the search to cancel it early.
+    Positions found in the opening `book` are answered from it without searching,
+    and so are endings covered by the `tablebase`.
+    With `smp`, the search runs on all of its threads and uses its shared table.
+    `on_depth` receives the result so far after each completed search depth,
+    and `on_result` the final result when a search was run.
+    """
     
-    # Generate all possible valid moves
-    for i, piece in enumerate(game_state.pieces):
-        if piece.side != game_state.current_turn:
-            continue
-            
-        # Try moves in the entire board
-        for x in range(9):
-            for y in range(10):
-                move = Move(piece_id=i, to_x=x, to_y=y)
-                if is_valid_move(game_state, move):
-                    score = evaluate_move(game_state, move)
-                    # Always use tuple as dictionary key
-                    move_key = (move.piece_id, move.to_x, move.to_y)
-                    move_scores[move_key] = (score, move)
+    board = board_of(game_state)
+    if book is not None:
+        book_move = book.pick(board)
+        if book_move is not None:
+            selected_move = to_api_move(board, book_move)
+            logger.info("AI chose book move: piece_id=%s, to=(%s, %s)",
+                        selected_move.piece_id, selected_move.to_x, selected_move.to_y)
+            return selected_move
+    if tablebase is not None:
+        tablebase_move = tablebase.best_move(board)
+        if tablebase_move is not None:
+            selected_move = to_api_move(board, tablebase_move)
+            logger.info("AI chose tablebase move: piece_id=%s, to=(%s, %s)",
+                        selected_move.piece_id, selected_move.to_x, selected_move.to_y)
+            return selected_move
+    if smp is not None:
+        result = smp.search(board, limits, stop, on_depth)
+        tt = smp.tt
+    else:
+        result = search(board, limits, tt, stop, on_depth)
+    if on_result is not None:
+        on_result(result)
     
-    if not move_scores:
-        print("No valid moves available for AI")
+    if result.move is None:
+        logger.info("No valid moves available for AI")
         return None
     
-    # Select one of the top 3 moves randomly to add variety
-    sorted_moves = sorted(move_scores.items(), key=lambda x: x[1][0], reverse=True)
-    top_moves = sorted_moves[:3]
-    # Get the Move object from the score-move tuple
-    selected_move = random.choice(top_moves)[1][1]
-    
-    print(f"AI chose move: piece_id={selected_move.piece_id}, to=({selected_move.to_x}, {selected_move.to_y})")
+    selected_move = to_api_move(board, result.move)
+    logger.info("AI searched %d nodes to depth %d in %.3fs (%d nps), score=%d",
+                result.nodes, result.depth, result.elapsed, result.nps, result.score,
+                extra={"nodes": result.nodes, "depth": result.depth, "nps": result.nps,
+                       "elapsed": result.elapsed, "score": result.score})
+    if tt is not None:
+        logger.debug("Transposition table: %s hits, %s misses this search", result.tt_hits, result.tt_misses)
+    logger.info("AI chose move: piece_id=%s, to=(%s, %s)", selected_move.piece_id, selected_move.to_x, selected_move.to_y)
     return selected_move
@@ -0,0 +1,199 @@
+from array import array
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+from .models import GameState
+from .board import Board, BOARD_HEIGHT, BOARD_WIDTH, GENERAL, RED, SOLDIER, TYPE_MASK, board_class, board_of
+from .evaluation import DEFAULT_MATERIAL
+from .fen import from_fen, to_fen
+from .movegen import generator_for, is_defended, piece_captures
+
+# Per-move flags kept in MoveHistory.flags
+CHECK = 1  # the move gave check
+CHASE = 2  # the moved piece attacks an enemy piece it could win (see move_flags)
+
+# A position reached this many times ends the game (see adjudicate)
+REPETITION_LIMIT = 3
+
+
+def _own_half(sq: int, side: int) -> bool:
+    """Whether a square is on `side`'s side of the river"""
+    return (sq // BOARD_WIDTH >= BOARD_HEIGHT // 2) == (side == RED)
+
+
+def move_flags(board: Board, move: int) -> int:
+    """CHECK and CHASE flags of a move just played on the board.
+
+    A chase is the moved piece (not a general or soldier) attacking an enemy
+    piece other than the general that is either worth more than the attacker
+    or cannot be recaptured after the capture, the cases in which the threat
+    actually wins material. Soldiers that have not crossed the river are
+    exempt as targets, as the rules allow attacking them indefinitely.
+    """
+    to_sq = move & 127
+    squares = board.squares
+    defender = board.turn
+    flags = CHECK if generator_for(board).in_check(board, defender) else 0
+    chaser = squares[to_sq] & TYPE_MASK
+    if chaser in (GENERAL, SOLDIER):
+        return flags
+    for target_sq in piece_captures(board, to_sq):
+        target = squares[target_sq] & TYPE_MASK
+        if target == GENERAL or (target == SOLDIER and _own_half(target_sq, defender)):
+            continue
+        if DEFAULT_MATERIAL[target] > DEFAULT_MATERIAL[chaser]:
+            return flags | CHASE
+        board.do_move(to_sq << 7 | target_sq)  # defenders hidden behind the chaser count once it has moved
+        defended = is_defended(board, target_sq, defender)
+        board.undo_move()
+        if not defended:
+            return flags | CHASE
+    return flags
+
+
+def adjudicate(flags, turn: int) -> Optional[int]:
+    """Loser of a repetition cycle (RED or BLACK), or None for a draw.
+
+    `flags` are those of the moves in the cycle and `turn` the side to move
+    once it is closed. A side that checked with every one of its moves while
+    the other did not loses (perpetual check). Failing that, a side that
+    checked or chased with every move while the other did not loses
+    (perpetual chase).
+    """
+    checking, forcing = [True, True], [True, True]
+    mover = turn ^ 1  # the cycle's last move was played by the side not to move now
+    for flag in reversed(flags):
+        checking[mover] = checking[mover] and bool(flag & CHECK)
+        forcing[mover] = forcing[mover] and bool(flag)
+        mover ^= 1
+    for perpetual in (checking, forcing):
+        if perpetual[0] != perpetual[1]:
+            return 0 if perpetual[0] else 1
+    return None
+
+
+class _Log:
+    """Append-only move storage shared by the MoveHistory views of one line of play.
+
+    `seen` maps every hash to the plies it occurred at, in increasing order.
+    """
+
+    __slots__ = ("moves", "hashes", "flags", "seen")
+
+    def __init__(self, moves: array, hashes: array, flags: bytearray):
+        self.moves = moves
+        self.hashes = hashes
+        self.flags = flags
+        self.seen: Dict[int, List[int]] = {}
+        for ply, hash_ in enumerate(hashes):
+            self.seen.setdefault(hash_, []).append(ply)
+
+
+class MoveHistory:
+    """Moves of a game since `start_fen`, with the position hash after each.
+
+    A history is a view of the first len(history) moves of a shared log:
+    `moves` holds packed moves, `hashes[i]` the hash after i moves (so
+    hashes[0] is the start position) and `flags` the CHECK/CHASE flags of
+    each move. pushed() appends to the log when this is its newest view, so
+    the states of a game share one log and a push is O(1); pushing from an
+    older state (after an undo, say) forks a copy of its moves first.
+    Repetition counts and the start of a repetition cycle are lookups in the
+    log's per-hash ply lists.
+    """
+
+    __slots__ = ("start_fen", "_log", "_length")
+
+    def __init__(self, start_fen: str, start_hash: int):
+        self.start_fen = start_fen
+        self._log = _Log(array("H"), array("Q", [start_hash]), bytearray())
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def moves(self) -> array:
+        """Copy of the packed moves"""
+        return self._log.moves[:self._length]
+
+    @property
+    def hashes(self) -> array:
+        """Copy of the hashes, starting with that of the start position"""
+        return self._log.hashes[:self._length + 1]
+
+    @property
+    def flags(self) -> bytearray:
+        """Copy of the per-move flags"""
+        return self._log.flags[:self._length]
+
+    @property
+    def last_hash(self) -> int:
+        """Hash of the current position"""
+        return self._log.hashes[self._length]
+
+    def pushed(self, move: int, hash_: int, flags: int) -> "MoveHistory":
+        """This history with one more move; this one is left unchanged"""
+        log, length = self._log, self._length
+        if len(log.moves) != length:
+            log = _Log(log.moves[:length], log.hashes[:length + 1], log.flags[:length])
+        log.moves.append(move)
+        log.hashes.append(hash_)
+        log.flags.append(flags)
+        log.seen.setdefault(hash_, []).append(length + 1)
+        history = MoveHistory.__new__(MoveHistory)
+        history.start_fen = self.start_fen
+        history._log = log
+        history._length = length + 1
+        return history
+
+    def repetitions(self, hash_: Optional[int] = None) -> int:
+        """How often a position (by default the current one) occurred in the game"""
+        plies = self._log.seen.get(self.last_hash if hash_ is None else hash_)
+        if not plies:
+            return 0
+        # Newer views of the log may have added later plies
+        return len(plies) if plies[-1] <= self._length else bisect_right(plies, self._length)
+
+    def cycle_flags(self) -> bytearray:
+        """Flags of the moves since the current position first occurred"""
+        first = self._log.seen[self.last_hash][0]
+        return self._log.flags[first:self._length]
+
+    def dump(self) -> str:
+        """Storage text: start FEN and the moves as 4 hex digits each"""
+        return self.start_fen + "|" + "".join(f"{move:04x}" for move in self.moves)
+
+
+def replay(start_fen: str, moves) -> Tuple[Board, MoveHistory]:
+    """Board after playing `moves` from a FEN position, and the history of those moves"""
+    board = board_class().from_state(from_fen(start_fen))
+    history = MoveHistory(start_fen, board.hash)
+    for move in moves:
+        if move not in generator_for(board).legal_moves(board, board.turn):
+            raise ValueError(f"Illegal move {move:#06x} in game history")
+        board.do_move(move)
+        history = history.pushed(move, board.hash, move_flags(board, move))
+    return board, history
+
+
+def load_history(text: str) -> MoveHistory:
+    """Parse MoveHistory.dump output, replaying the moves to rebuild hashes and flags"""
+    start_fen, _, moves = text.partition("|")
+    if len(moves) % 4:
+        raise ValueError("Malformed move list in game history")
+    return replay(start_fen, [int(moves[i:i + 4], 16) for i in range(0, len(moves), 4)])[1]
+
+
+def history_of(game_state: GameState) -> MoveHistory:
+    """The game's move history, starting at this position if it has none yet"""
+    if game_state._history is None:
+        game_state._history = MoveHistory(to_fen(game_state), board_of(game_state).hash)
+    return game_state._history
+
+
+def history_page(game_state: GameState, offset: int = 0, limit: int = 50) -> List[Tuple[int, int, int, int]]:
+    """(ply, move, hash after it, flags) for up to `limit` moves starting at `offset`"""
+    history = history_of(game_state)
+    log = history._log
+    end = min(len(history), offset + limit)
+    return [(i + 1, log.moves[i], log.hashes[i + 1], log.flags[i]) for i in range(offset, end)]
@@ -0,0 +1,64 @@
+import json
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; extra record attributes are included as fields"""
+
+    _RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+                    + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in self._RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """Parse 'app.game_logic=DEBUG,app.main=WARNING' into logger name -> level"""
+    levels = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        name, level = item.split("=", 1)
+        levels[name.strip()] = logging.getLevelName(level.strip().upper())
+    return levels
+
+
+def configure_logging(level: Optional[str] = None, module_levels: Optional[str] = None,
+                      fmt: Optional[str] = None) -> None:
+    """Set up the `app` loggers from arguments or the LOG_LEVEL, LOG_LEVELS and LOG_FORMAT variables.
+
+    LOG_LEVEL sets the level of all `app.*` loggers (default INFO), LOG_LEVELS
+    overrides it per module, and LOG_FORMAT=json switches to JSON lines.
+    """
+    level = level or os.environ.get("LOG_LEVEL", "INFO")
+    module_levels = module_levels if module_levels is not None else os.environ.get("LOG_LEVELS", "")
+    fmt = fmt or os.environ.get("LOG_FORMAT", "text")
+
+    handler = logging.StreamHandler()
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    root = logging.getLogger("app")
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+    root.propagate = False
+    for name, module_level in parse_levels(module_levels).items():
+        logging.getLogger(name).setLevel(module_level)
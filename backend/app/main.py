@@ -1,10 +1,91 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import hmac
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, Union
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional
-from app.models import GameState, Move, Side
-from app.game_logic import is_valid_move, make_move, get_ai_move
+from app.models import AnalysisRequest, GameState, Move, Side
+from app.game_logic import check_position, is_valid_move, make_move, get_ai_move, undo_moves
+from app.history import CHASE, CHECK, history_page, history_of
+from app.book import format_iccs
+from app.movegen import generate_moves, generator_for, legal_move_map
+from app.board import board_of, coords
+from app.fen import from_fen, to_fen
+from app.search import MAX_PLY, SearchLimits
+from app.engine_pool import EngineBusy, EnginePool, SearchProgress
+from app.channels import GameChannels
+from app.persistence import SQLiteGameStore
+from app.sessions import GameSession, GameStore
+from app.logging_config import configure_logging
+from app.metrics import CONTENT_TYPE, ENGINE_PENDING, PHASE_LATENCY, REGISTRY, REQUEST_LATENCY, SamplingProfiler
+from app import config
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# Games live in memory; state changes are written behind to SQLite in batches
+games = GameStore(
+    SQLiteGameStore(config.GAME_DB_PATH, flush_interval=config.PERSIST_FLUSH_MS / 1000),
+    max_games=config.SESSION_MAX_GAMES,
+    ttl_seconds=config.SESSION_TTL_SECONDS,
+)
+
+# Media type (or ?format=compact) selecting FEN + last-move responses instead of the pieces list
+COMPACT_MEDIA_TYPE = "application/vnd.xiangqi.compact+json"
+
+# The legacy single-game routes (/api/new-game, /api/game-state, /api/move) use this id
+DEFAULT_GAME_ID = "default"
+
+# Open WebSockets per game, pushed player moves, AI progress and AI moves
+channels = GameChannels()
 
-app = FastAPI()
+# AI searches run in worker processes so the event loop stays responsive. The
+# workers are spawned by the first AI request, not at startup.
+engine = EnginePool(
+    workers=config.ENGINE_WORKERS,
+    max_pending=config.ENGINE_MAX_PENDING,
+    tt_size_mb=config.TT_SIZE_MB,
+    book_path=config.BOOK_PATH,
+    search_threads=config.SEARCH_THREADS,
+    tablebase_dir=config.TABLEBASE_DIR,
+    ponder_budget=config.PONDER_BUDGET,
+    analysis_budget=config.ANALYSIS_BUDGET,
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    games.backend.start()
+    yield
+    engine.shutdown()
+    games.backend.close()
+
+app = FastAPI(lifespan=lifespan)
+
+# Samples whole requests with cProfile; adjustable at runtime via /debug/profiler
+profiler = SamplingProfiler(config.PROFILE_DIR, config.PROFILE_EVERY, config.PROFILE_KEEP)
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    """Record the latency of every request by route, profiling the sampled ones"""
+    profile = profiler.start()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        REQUEST_LATENCY.observe(time.perf_counter() - start, request.method, path, str(status))
+        if profile is not None:
+            logger.info("Profile of %s %s written to %s", request.method, path, profiler.stop(profile, path))
 
 # Disable CORS. Do not remove this for full-stack development.
 app.add_middleware(
@@ -15,65 +96,71 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
-import json
-import os
+def ai_search_limits() -> SearchLimits:
+    """AI search budget for /api/move, as configured by the operator"""
+    return SearchLimits(
+        max_depth=config.AI_MAX_DEPTH,
+        time_ms=config.AI_TIME_LIMIT_MS,
+        nodes=config.AI_NODE_LIMIT,
+    )
 
-GAME_STATE_FILE = "game_state.json"
+def wants_compact(response_format: Optional[str] = Query(None, alias="format"),
+                  accept: Optional[str] = Header(None)) -> bool:
+    """Whether the client opted into compact game states"""
+    return response_format == "compact" or (accept is not None and COMPACT_MEDIA_TYPE in accept)
 
-def save_game_state(game_state: Optional[GameState]):
-    """Save game state to file"""
-    if game_state:
-        with open(GAME_STATE_FILE, "w") as f:
-            json.dump(game_state.dict(), f)
-    else:
-        if os.path.exists(GAME_STATE_FILE):
-            os.remove(GAME_STATE_FILE)
+def render_state(state: GameState, compact: bool):
+    """A game state as a response body: the full model, or its FEN plus the last move.
 
-def load_game_state() -> Optional[GameState]:
-    """Load game state from file"""
-    try:
-        if os.path.exists(GAME_STATE_FILE):
-            with open(GAME_STATE_FILE, "r") as f:
-                data = json.load(f)
-                return GameState(**data)
-    except Exception as e:
-        print(f"Error loading game state: {e}")
-    return None
+    Piece ids in compact responses are the FEN reading order, the same ids
+    the full pieces list uses.
+    """
+    if not compact:
+        return state
+    return {"fen": to_fen(state), "game_over": state.game_over, "winner": state.winner,
+            "last_move": last_move_of(state)}
 
-# Initialize game state from file
-current_game = load_game_state()
+def last_move_of(state: GameState):
+    """The move that produced a state (piece id, from, to, captured type), or None"""
+    if state._last_move is None:
+        return None
+    from_sq, to_sq, captured = state._last_move
+    return {
+        "piece_id": board_of(state).ids[to_sq],
+        "from": coords(from_sq),
+        "to": coords(to_sq),
+        "captured": captured,
+    }
 
-@app.get("/healthz")
-async def healthz():
-    return {"status": "ok"}
+def move_message(kind: str, state: GameState) -> dict:
+    """WebSocket delta for a move just played: the move and the resulting turn and result"""
+    return {"type": kind, "move": last_move_of(state), "turn": state.current_turn,
+            "game_over": state.game_over, "winner": state.winner}
 
-@app.post("/api/new-game")
-async def new_game():
-    """Start a new game"""
-    global current_game
-    current_game = GameState.new_game()
-    save_game_state(current_game)
-    return current_game
+def move_map_etag(state: GameState) -> str:
+    """Entity tag of a game's move map: the position hash, plus whether the game is over"""
+    return f'"{board_of(state).hash:016x}{"-over" if state.game_over else ""}"'
 
-@app.get("/api/game-state")
-async def get_game_state():
-    """Get the current game state"""
-    if not current_game:
-        raise HTTPException(status_code=404, detail="No game in progress")
-    return current_game
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """Whether an If-None-Match header covers the entity tag (weak comparison)"""
+    if if_none_match is None:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
 
-@app.post("/api/move")
-async def make_player_move(move: Move):
-    """Make a player move and respond with AI move"""
-    global current_game
-    print("\n=== Starting move processing ===")
-    
-    if not current_game:
+def get_session(game_id: str) -> GameSession:
+    """Look up a game or fail with 404"""
+    session = games.get(game_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="No game in progress")
+    return session
+
+def apply_player_move(session: GameSession, move: Move) -> GameState:
+    """Validate and apply a player move, returning the state the AI replies to"""
+    current_game = session.state
     
-    print(f"Received move: piece_id={move.piece_id}, to=({move.to_x}, {move.to_y})")
-    print(f"Current turn: {current_game.current_turn}")
-    print(f"Piece count: {len(current_game.pieces)}")
+    logger.info("Received move: piece_id=%s, to=(%s, %s)", move.piece_id, move.to_x, move.to_y)
+    logger.debug("Current turn: %s, piece count: %s", current_game.current_turn, len(current_game.pieces))
     
     if current_game.game_over:
         raise HTTPException(status_code=400, detail="Game is already over")
@@ -91,62 +178,401 @@ async def make_player_move(move: Move):
             raise HTTPException(status_code=400, detail="Cannot move opponent's piece")
             
         # Validate and make player move
-        if not is_valid_move(current_game, move):
-            print("Move validation failed")
+        with PHASE_LATENCY.time("validate"):
+            valid = is_valid_move(current_game, move)
+        if not valid:
+            logger.info("Move validation failed")
             raise HTTPException(status_code=400, detail="Invalid move")
         
         # Make player move
-        print("\n=== Making player move ===")
-        updated_game = make_move(current_game, move)
+        with PHASE_LATENCY.time("make_move"):
+            updated_game = make_move(current_game, move)
         if not updated_game: 
             raise HTTPException(status_code=500, detail="Failed to update game state")
         
-        current_game = updated_game
-        save_game_state(current_game)
-        print(f"Player move completed")
-        print(f"Turn after player move: {current_game.current_turn}")
+    except HTTPException:
+        raise
+    except ValueError as ve:
+        logger.info("Rejected move: %s", ve)
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.exception("Server error while processing move")
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+    
+    session.state = updated_game
+    with PHASE_LATENCY.time("save"):
+        games.save(session)
+    logger.debug("Player move completed, turn: %s", updated_game.current_turn)
+    return updated_game
+
+async def play_ai_move(session: GameSession) -> GameState:
+    """Search for the AI reply in the engine pool and apply it"""
+    current_game = session.state
+    if current_game.game_over:
+        return current_game
         
-        if current_game.game_over:
-            return current_game
-            
-        # Process AI move
-        print("\n=== Processing AI move ===")
-        if current_game.current_turn != Side.BLACK:
-            print("Warning: Expected BLACK's turn for AI move")
-            return current_game
-            
-        ai_move = get_ai_move(current_game)
-        if not ai_move:
-            print("Warning: AI could not generate a valid move")
-            return current_game
-            
-        print(f"AI selected move: piece_id={ai_move.piece_id}, to=({ai_move.to_x}, {ai_move.to_y})")
-        ai_piece = current_game.pieces[ai_move.piece_id]
-        print(f"Moving {ai_piece.type} from ({ai_piece.x}, {ai_piece.y})")
+    # Process AI move
+    if current_game.current_turn != Side.BLACK:
+        logger.warning("Expected BLACK's turn for AI move")
+        return current_game
+    
+    on_progress = None
+    if channels.has_subscribers(session.game_id):
+        async def on_progress(progress: SearchProgress):
+            await channels.publish(session.game_id, {
+                "type": "progress", "depth": progress.depth, "score": progress.score, "nodes": progress.nodes,
+                "move": progress.move.model_dump() if progress.move is not None else None,
+            })
+    try:
+        with PHASE_LATENCY.time("search"):
+            ai_move = await engine.search(session.game_id, current_game, ai_search_limits(), on_progress)
+    except EngineBusy as e:
+        await channels.publish(session.game_id, {"type": "error", "detail": str(e)})
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    # The game may have been restarted, resigned or deleted while the AI was thinking
+    if not session.active or session.state is not current_game:
+        logger.info("AI move discarded: game changed during search")
+        return session.state
+    if not ai_move:
+        logger.warning("AI could not generate a valid move")
+        return current_game
         
-        if not is_valid_move(current_game, ai_move):
-            print("Warning: AI generated an invalid move")
-            return current_game
-            
-        print("\n=== Making AI move ===")
-        ai_game_state = make_move(current_game, ai_move)
-        if not ai_game_state:
-            print("Warning: AI move failed to generate new game state")
-            return current_game
-            
-        current_game = ai_game_state
-        save_game_state(current_game)
-        print("AI move completed")
-        print(f"Turn after AI move: {current_game.current_turn}")
+    logger.info("AI selected move: piece_id=%s, to=(%s, %s)", ai_move.piece_id, ai_move.to_x, ai_move.to_y)
+    ai_piece = current_game.pieces[ai_move.piece_id]
+    logger.debug("Moving %s from (%s, %s)", ai_piece.type, ai_piece.x, ai_piece.y)
+    
+    if not is_valid_move(current_game, ai_move):
+        logger.warning("AI generated an invalid move")
+        return current_game
         
-        print("\n=== Move processing completed ===")
-        print(f"Final turn: {current_game.current_turn}")
-        print(f"Final piece count: {len(current_game.pieces)}")
+    with PHASE_LATENCY.time("make_move"):
+        ai_game_state = make_move(current_game, ai_move)
+    if not ai_game_state:
+        logger.warning("AI move failed to generate new game state")
         return current_game
         
-    except ValueError as ve:
-        print(f"Error: {str(ve)}")
-        raise HTTPException(status_code=400, detail=str(ve))
-    except Exception as e:
-        print(f"Server error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+    session.state = ai_game_state
+    with PHASE_LATENCY.time("save"):
+        games.save(session)
+    await channels.publish(session.game_id, move_message("ai_move", ai_game_state))
+    logger.debug("AI move completed, turn: %s, piece count: %s",
+                 ai_game_state.current_turn, len(ai_game_state.pieces))
+    return ai_game_state
+
+async def play_player_move(session: GameSession, move: Move, wait: bool = True) -> GameState:
+    """Make a player move; with wait=False return right away and let the AI reply in the background"""
+    if session.ai_task is not None and not session.ai_task.done():
+        raise HTTPException(status_code=400, detail="Not player's turn")
+    state = apply_player_move(session, move)
+    await channels.publish(session.game_id, move_message("ack", state))
+    if wait:
+        return await play_ai_move(session)
+    if not state.game_over:
+        session.ai_task = asyncio.create_task(play_ai_move(session))
+    return state
+
+def end_game(game_id: str):
+    """Abort any AI search for a game that is being replaced or removed"""
+    if engine.cancel(game_id):
+        logger.info("Cancelled AI search for game %s", game_id)
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+@app.get("/metrics")
+async def get_metrics():
+    """Counters and latency histograms in the Prometheus text format"""
+    ENGINE_PENDING.set(engine.pending)
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Guard for the /debug routes: they exist only when ADMIN_TOKEN is set, and need it"""
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, config.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@app.get("/debug/profiler", dependencies=[Depends(require_admin)])
+async def get_profiler():
+    """Sampling profiler settings and how many profiles it has written"""
+    return {"every": profiler.every, "directory": profiler.directory, "dumped": profiler.dumped}
+
+@app.put("/debug/profiler", dependencies=[Depends(require_admin)])
+async def set_profiler(every: int = Query(..., ge=0)):
+    """Profile every N-th request from now on (0 turns profiling off)"""
+    profiler.every = every
+    logger.info("Sampling profiler: every %s requests into %s", every, profiler.directory)
+    return await get_profiler()
+
+@app.post("/api/games")
+async def create_game(compact: bool = Depends(wants_compact)):
+    """Start a new game and return its id with the initial state"""
+    session = games.create(GameState.new_game())
+    return {"game_id": session.game_id, "state": render_state(session.state, compact)}
+
+@app.get("/api/games/{game_id}")
+async def get_game(game_id: str, compact: bool = Depends(wants_compact)):
+    """Get the state of a game"""
+    return render_state(get_session(game_id).state, compact)
+
+@app.get("/api/games/{game_id}/legal-moves")
+async def get_game_legal_moves(game_id: str):
+    """List the moves available to the side to move in a game"""
+    state = get_session(game_id).state
+    if state.game_over:
+        return []
+    return generate_moves(state)
+
+@app.get("/api/games/{game_id}/move-map")
+async def get_game_move_map(game_id: str, response: Response, if_none_match: Optional[str] = Header(None)):
+    """Legal destinations of every piece of the side to move, keyed by piece id.
+
+    Maps are cached per position; the ETag changes with the position, so a
+    client polling an unchanged game gets 304 Not Modified.
+    """
+    state = get_session(game_id).state
+    etag = move_map_etag(state)
+    if etag_matches(etag, if_none_match):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    moves = {} if state.game_over else legal_move_map(state)
+    return {"turn": state.current_turn, "moves": moves}
+
+@app.get("/api/games/{game_id}/history")
+async def get_game_history(game_id: str, offset: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=500)):
+    """A page of the game's move log, oldest first.
+
+    Each move comes in ICCS notation and as board coordinates, with the hash
+    of the position it led to and whether it gave check or chased a piece.
+    `repetitions` counts how often the current position has occurred.
+    """
+    state = get_session(game_id).state
+    history = history_of(state)
+    moves = [{"ply": ply, "move": format_iccs(move), "from": coords(move >> 7), "to": coords(move & 127),
+              "hash": f"{hash_:016x}", "check": bool(flags & CHECK), "chase": bool(flags & CHASE)}
+             for ply, move, hash_, flags in history_page(state, offset, limit)]
+    return {"start_fen": history.start_fen, "total": len(history), "offset": offset,
+            "repetitions": history.repetitions(), "moves": moves}
+
+@app.post("/api/games/{game_id}/undo")
+async def undo_game_moves(game_id: str, plies: int = Query(2, ge=1), compact: bool = Depends(wants_compact)):
+    """Take back moves, by default the player's last move and the AI reply.
+
+    Any AI search in progress is aborted. The position is rebuilt by
+    replaying the move log, so a finished game can be resumed as well.
+    """
+    session = get_session(game_id)
+    end_game(game_id)
+    try:
+        state = undo_moves(session.state, plies)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    session.state = state
+    games.save(session)
+    await channels.publish(game_id, {"type": "undo", "plies": plies, "turn": state.current_turn,
+                                     **jsonable_encoder(render_state(state, compact=True))})
+    return render_state(state, compact)
+
+@app.websocket("/api/games/{game_id}/ws")
+async def game_socket(websocket: WebSocket, game_id: str, compact: bool = Depends(wants_compact)):
+    """Live channel for a game.
+
+    The server sends {"type": "state"} on connect, then pushes "ack" for
+    player moves, "progress" for each depth the AI completes, "ai_move"
+    for its reply and "undo" (with the compact state) when moves are taken
+    back, from this socket or any other client of the game.
+    Piece ids in progress messages are those of the position being searched.
+    Clients send {"type": "move", "piece_id", "to_x", "to_y"}; a rejected
+    move is answered with {"type": "error", "detail"}.
+    """
+    await websocket.accept()
+    session = games.get(game_id)
+    if session is None:
+        await websocket.send_json({"type": "error", "detail": "No game in progress"})
+        await websocket.close(code=4404)
+        return
+    channels.subscribe(game_id, websocket)
+    try:
+        await websocket.send_json({"type": "state", "state": jsonable_encoder(render_state(session.state, compact))})
+        while True:
+            message = await websocket.receive_json()
+            try:
+                if not isinstance(message, dict) or message.get("type") != "move":
+                    raise HTTPException(status_code=400, detail="Expected a move message")
+                try:
+                    move = Move.model_validate(message)
+                except ValidationError as e:
+                    raise HTTPException(status_code=400, detail=f"Malformed move: {e.error_count()} errors")
+                await play_player_move(get_session(game_id), move, wait=False)
+            except HTTPException as e:
+                await websocket.send_json({"type": "error", "detail": e.detail})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        channels.unsubscribe(game_id, websocket)
+
+@app.post("/api/games/{game_id}/move")
+async def make_game_move(game_id: str, move: Move, wait: bool = True, compact: bool = Depends(wants_compact)):
+    """Make a player move in a game.
+
+    By default the response is the state after the AI reply. With
+    wait=false it is the state after the player move, and the AI reply is
+    collected by polling /api/games/{game_id}/ai-move.
+    """
+    return render_state(await play_player_move(get_session(game_id), move, wait), compact)
+
+@app.get("/api/games/{game_id}/ai-move")
+async def poll_ai_move(game_id: str, compact: bool = Depends(wants_compact)):
+    """Report whether the AI is still thinking, and the state once it has replied"""
+    session = get_session(game_id)
+    task = session.ai_task
+    if task is not None and not task.done():
+        return {"status": "thinking"}
+    if task is not None and task.exception() is not None:
+        session.ai_task = None
+        error = task.exception()
+        detail = error.detail if isinstance(error, HTTPException) else str(error)
+        return {"status": "error", "detail": detail, "state": render_state(session.state, compact)}
+    return {"status": "ready", "state": render_state(session.state, compact)}
+
+@app.post("/api/games/{game_id}/ai-move")
+async def request_ai_move(game_id: str):
+    """(Re)start the AI reply in the background, e.g. after a failed search"""
+    session = get_session(game_id)
+    if session.ai_task is None or session.ai_task.done():
+        session.ai_task = asyncio.create_task(play_ai_move(session))
+    return {"status": "thinking"}
+
+@app.post("/api/games/{game_id}/resign")
+async def resign_game(game_id: str, compact: bool = Depends(wants_compact)):
+    """Resign the player's game, aborting any AI search in progress"""
+    session = get_session(game_id)
+    if session.state.game_over:
+        raise HTTPException(status_code=400, detail="Game is already over")
+    end_game(game_id)
+    session.state = session.state.model_copy(update={"game_over": True, "winner": Side.BLACK})
+    games.save(session)
+    return render_state(session.state, compact)
+
+@app.delete("/api/games/{game_id}")
+async def delete_game(game_id: str):
+    """End a game and remove it from the store"""
+    get_session(game_id)
+    end_game(game_id)
+    games.delete(game_id)
+    return {"status": "deleted"}
+
+def analysis_limits(analysis: AnalysisRequest) -> SearchLimits:
+    """The request's limits clamped to the server's; a search without a time or node limit gets the default time"""
+    time_ms, nodes = analysis.time_ms, analysis.nodes
+    if time_ms is None and nodes is None:
+        time_ms = config.ANALYSIS_TIME_LIMIT_MS
+    if time_ms is not None and config.ANALYSIS_MAX_TIME_MS:
+        time_ms = min(time_ms, config.ANALYSIS_MAX_TIME_MS)
+    if nodes is not None and config.ANALYSIS_MAX_NODES:
+        nodes = min(nodes, config.ANALYSIS_MAX_NODES)
+    return SearchLimits(max_depth=min(analysis.depth, config.ANALYSIS_MAX_DEPTH, MAX_PLY), time_ms=time_ms, nodes=nodes)
+
+async def analyze_position(position: Union[str, GameState], analysis: AnalysisRequest) -> dict:
+    """Best lines of one position in ICCS notation; raises ValueError for a position that cannot arise in play"""
+    fen = check_position(from_fen(position) if isinstance(position, str) else position)
+    board = board_of(from_fen(fen))
+    generator = generator_for(board)
+    if not generator.legal_moves(board, board.turn):
+        # Nothing to search: the side to move has lost
+        return {"fen": fen, "lines": [],
+                "result": "checkmate" if generator.in_check(board, board.turn) else "stalemate"}
+    lines = await engine.analyze(fen, analysis_limits(analysis), analysis.multipv)
+    return {"fen": fen, "lines": [
+        {"move": format_iccs(pv[0]), "score": score, "depth": depth, "nodes": nodes,
+         "pv": [format_iccs(move) for move in pv]}
+        for score, depth, nodes, pv in lines
+    ]}
+
+async def analysis_stream(analysis: AnalysisRequest) -> AsyncIterator[str]:
+    """NDJSON results of a batch in completion order, keeping every engine worker busy"""
+    async def run(index: int, position: Union[str, GameState]) -> dict:
+        try:
+            return {"index": index, **await analyze_position(position, analysis)}
+        except (ValueError, EngineBusy) as e:
+            return {"index": index, "error": str(e)}
+
+    window = min(2 * max(1, engine.workers), engine.max_pending)
+    queued = iter(enumerate(analysis.positions))
+    running = set()
+    try:
+        while True:
+            for index, position in queued:
+                running.add(asyncio.create_task(run(index, position)))
+                if len(running) >= window:
+                    break
+            if not running:
+                return
+            done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield json.dumps(task.result()) + "\n"
+    finally:
+        for task in running:  # the client went away: stop the searches still in flight
+            task.cancel()
+
+@app.post("/api/analyze")
+async def analyze_positions(analysis: AnalysisRequest):
+    """Top principal variations of one position or a batch of positions.
+
+    A single `position` is answered with {"fen", "lines"}; each line has
+    its first move and PV in ICCS notation and a score from the view of the
+    side to move. A position without legal moves has no lines and a
+    "result" of "checkmate" or "stalemate" instead. Positions that cannot
+    arise in play (e.g. the side not to move in check) are rejected with
+    400. A batch of `positions` is fanned out over the engine
+    workers and streamed back as NDJSON, one object per position as soon as
+    it is done, tagged with its `index` in the batch (or carrying an `error`).
+    """
+    if (analysis.position is None) == (analysis.positions is None):
+        raise HTTPException(status_code=400, detail="Give either position or positions")
+    if analysis.positions is not None:
+        return StreamingResponse(analysis_stream(analysis), media_type="application/x-ndjson")
+    try:
+        return await analyze_position(analysis.position, analysis)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except EngineBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@app.post("/api/new-game")
+async def new_game(compact: bool = Depends(wants_compact)):
+    """Start a new game"""
+    end_game(DEFAULT_GAME_ID)
+    return render_state(games.create(GameState.new_game(), game_id=DEFAULT_GAME_ID).state, compact)
+
+@app.get("/api/game-state")
+async def get_game_state(compact: bool = Depends(wants_compact)):
+    """Get the current game state"""
+    return render_state(get_session(DEFAULT_GAME_ID).state, compact)
+
+@app.get("/api/legal-moves")
+async def get_legal_moves():
+    """List the moves available to the side to move"""
+    return await get_game_legal_moves(DEFAULT_GAME_ID)
+
+@app.get("/api/move-map")
+async def get_move_map(response: Response, if_none_match: Optional[str] = Header(None)):
+    """Legal destinations of every piece of the side to move, keyed by piece id"""
+    return await get_game_move_map(DEFAULT_GAME_ID, response, if_none_match)
+
+@app.get("/api/history")
+async def get_history(offset: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=500)):
+    """A page of the game's move log, oldest first"""
+    return await get_game_history(DEFAULT_GAME_ID, offset, limit)
+
+@app.post("/api/undo")
+async def undo(plies: int = Query(2, ge=1), compact: bool = Depends(wants_compact)):
+    """Take back moves, by default the player's last move and the AI reply"""
+    return await undo_game_moves(DEFAULT_GAME_ID, plies, compact)
+
+@app.post("/api/move")
+async def make_player_move(move: Move, compact: bool = Depends(wants_compact)):
+    """Make a player move and respond with AI move"""
+    return render_state(await play_player_move(get_session(DEFAULT_GAME_ID), move), compact)
@@ -0,0 +1,228 @@
+import cProfile
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Prometheus text exposition format, without the client library: a few
+# counters and histograms are all the server needs.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from sub-millisecond validation up to long searches
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Monotonic count per label combination"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *label_values: str) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, values)} {_format_value(v)}" for values, v in items]
+
+
+class Gauge(Counter):
+    """Value that can go up and down, set directly"""
+
+    kind = "gauge"
+
+    def set(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            self._values[label_values] = value
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observations per label combination"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket (non-cumulative, +Inf last), sum]
+        self._series: Dict[LabelValues, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *label_values: str) -> Iterator[None]:
+        """Observe the duration of a `with` block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def count(self, *label_values: str) -> int:
+        series = self._series.get(label_values)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((values, (counts[:], total)) for values, (counts, total) in self._series.items())
+        lines = []
+        for values, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, values, le)} {cumulative}")
+            labels = _format_labels(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    "xiangqi_http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")))
+PHASE_LATENCY = REGISTRY.register(Histogram(
+    "xiangqi_phase_duration_seconds",
+    "Latency of the phases of a move: validate, make_move, search, save and persist", ("phase",)))
+SEARCH_NODES = REGISTRY.register(Counter("xiangqi_search_nodes_total", "Nodes searched by the AI"))
+AI_MOVES = REGISTRY.register(Counter(
+    "xiangqi_ai_moves_total", "AI moves by source: search, ponder (a ponder hit) or lookup (book or tablebase)",
+    ("source",)))
+TT_PROBES = REGISTRY.register(Counter(
+    "xiangqi_tt_probes_total", "Transposition table probes during AI searches", ("result",)))
+TT_HIT_RATE = REGISTRY.register(Gauge(
+    "xiangqi_tt_hit_ratio", "Share of transposition table probes that hit, over all searches so far"))
+PONDERS = REGISTRY.register(Counter(
+    "xiangqi_ponders_total", "Player moves that matched (hit) or missed the pondered reply", ("result",)))
+ENGINE_PENDING = REGISTRY.register(Gauge("xiangqi_engine_pending_searches", "AI searches queued or running"))
+MOVEGEN_CALLS = REGISTRY.register(Counter(
+    "xiangqi_movegen_calls_total",
+    "Move lists generated: by API requests (generate_moves, move_map, move_map_cached) or by AI searches (search)",
+    ("kind",)))
+
+
+def record_search(nodes: int, tt_hits: int, tt_misses: int, movegen_calls: int = 0) -> None:
+    """Add one search's node, table and move generation counts"""
+    SEARCH_NODES.inc(nodes)
+    MOVEGEN_CALLS.inc(movegen_calls, "search")
+    TT_PROBES.inc(tt_hits, "hit")
+    TT_PROBES.inc(tt_misses, "miss")
+    probes = TT_PROBES.value("hit") + TT_PROBES.value("miss")
+    if probes:
+        TT_HIT_RATE.set(TT_PROBES.value("hit") / probes)
+
+
+class SamplingProfiler:
+    """Profiles every N-th request with cProfile and dumps the stats to a directory.
+
+    `every` can be changed at any time (0 turns sampling off). Only one
+    request is profiled at once. cProfile follows the event loop thread, so
+    other requests interleaved with a profiled one show up in its profile.
+    Dumps are named <time>-<route>.prof and open with pstats or snakeviz;
+    only the latest `keep` of them are kept.
+    """
+
+    def __init__(self, directory: str, every: int = 0, keep: int = 50):
+        self.directory = directory
+        self.every = every
+        self.keep = keep
+        self.dumped = 0
+        self._files: Deque[str] = deque()
+        self._requests = 0
+        self._active = False
+
+    def start(self) -> Optional[cProfile.Profile]:
+        """A running profiler if this request is sampled, else None"""
+        if self.every <= 0 or self._active:
+            return None
+        self._requests += 1
+        if self._requests % self.every:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # another profiler (e.g. a debugger) is already active
+            return None
+        self._active = True
+        return profile
+
+    def stop(self, profile: cProfile.Profile, route: str) -> str:
+        """Stop a profile from start() and write it out; returns the file path"""
+        profile.disable()
+        self._active = False
+        os.makedirs(self.directory, exist_ok=True)
+        name = route.strip("/").replace("/", "_").replace("{", "").replace("}", "") or "root"
+        path = os.path.join(self.directory, f"{time.strftime('%Y%m%dT%H%M%S')}-{self.dumped:04d}-{name}.prof")
+        profile.dump_stats(path)
+        self.dumped += 1
+        self._files.append(path)
+        while len(self._files) > max(1, self.keep):
+            try:
+                os.remove(self._files.popleft())
+            except FileNotFoundError:
+                pass
+        return path
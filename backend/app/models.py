@@ -1,6 +1,6 @@
 from enum import Enum
-from typing import List, Optional, Tuple
-from pydantic import BaseModel
+from typing import Any, List, Optional, Tuple, Union
+from pydantic import BaseModel, Field, PrivateAttr
 
 class PieceType(str, Enum):
     GENERAL = "general"  # 将/帅
@@ -27,6 +27,20 @@ class GameState(BaseModel):
     game_over: bool = False
     winner: Optional[Side] = None
 
+    # Cached mailbox board (see app.board.board_of); never serialized
+    _board: Any = PrivateAttr(default=None)
+    # (from square, to square, captured PieceType or None) of the move that led here
+    _last_move: Any = PrivateAttr(default=None)
+    # Compact move log with repetition counts (see app.history.history_of)
+    _history: Any = PrivateAttr(default=None)
+
+    def __eq__(self, other):
+        # Compare the game itself, not the private caches pydantic would include
+        if not isinstance(other, GameState):
+            return False
+        return (self.pieces, self.current_turn, self.game_over, self.winner) == \
+            (other.pieces, other.current_turn, other.game_over, other.winner)
+
     @classmethod
     def new_game(cls) -> "GameState":
         """Create a new game with pieces in their initial positions"""
@@ -66,6 +80,8 @@ class GameState(BaseModel):
         for x in [0, 2, 4, 6, 8]:
             add_piece(PieceType.SOLDIER, Side.BLACK, x, 3)
 
+        # Piece ids follow board order (top-left to bottom-right), as in FEN
+        pieces.sort(key=lambda p: (p.y, p.x))
         return cls(pieces=pieces, current_turn=Side.RED)
 
 class Move(BaseModel):
@@ -83,3 +99,20 @@ class Move(BaseModel):
         if not isinstance(other, Move):
             return False
         return (self.piece_id, self.to_x, self.to_y) == (other.piece_id, other.to_x, other.to_y)
+
+
+class AnalysisRequest(BaseModel):
+    """Positions for /api/analyze, each a FEN string or a GameState.
+
+    Give either `position` (answered with one JSON object) or `positions`
+    (answered with one NDJSON line per position). The limits apply to
+    every line searched; time_ms and nodes are optional. The server clamps
+    them to its own maxima and applies a default time limit when neither
+    is given (see the ANALYSIS_* settings in app.config).
+    """
+    position: Optional[Union[str, GameState]] = None
+    positions: Optional[List[Union[str, GameState]]] = None
+    depth: int = Field(4, ge=1, le=64)
+    time_ms: Optional[int] = Field(None, ge=1)
+    nodes: Optional[int] = Field(None, ge=1)
+    multipv: int = Field(1, ge=1, le=20)
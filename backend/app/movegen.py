@@ -0,0 +1,467 @@
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Tuple
+from .models import GameState, Move
+from .board import (
+    Board, board_of, coords, square, NO_PIECE, EMPTY, BOARD_WIDTH, BOARD_HEIGHT, NUM_SQUARES,
+    BLACK_FLAG, TYPE_MASK, GENERAL, ADVISOR, ELEPHANT, HORSE, CHARIOT, CANNON, SOLDIER, RED, BLACK,
+)
+from .metrics import MOVEGEN_CALLS
+
+# Moves are packed into a single int: from-square in the high bits, to-square in the low 7 bits
+def encode_move(from_sq: int, to_sq: int) -> int:
+    """Pack a move into an int"""
+    return (from_sq << 7) | to_sq
+
+def move_from(move: int) -> int:
+    """From-square of a packed move"""
+    return move >> 7
+
+def move_to(move: int) -> int:
+    """To-square of a packed move"""
+    return move & 127
+
+
+def _on_board(x: int, y: int) -> bool:
+    return 0 <= x < BOARD_WIDTH and 0 <= y < BOARD_HEIGHT
+
+def _in_palace(side: int, x: int, y: int) -> bool:
+    return 3 <= x <= 5 and (7 <= y <= 9 if side == RED else 0 <= y <= 2)
+
+def _own_half(side: int, y: int) -> bool:
+    return y >= 5 if side == RED else y <= 4
+
+# Horse jumps as (dx, dy, leg dx, leg dy); the leg square must be empty
+_HORSE_DELTAS = ((1, 2, 0, 1), (-1, 2, 0, 1), (1, -2, 0, -1), (-1, -2, 0, -1),
+                 (2, 1, 1, 0), (2, -1, 1, 0), (-2, 1, -1, 0), (-2, -1, -1, 0))
+
+def _build_tables():
+    """Precompute per-square target lists for every piece type"""
+    rays = []
+    general = ([], [])
+    advisor = ([], [])
+    elephant = ([], [])
+    horse = []
+    soldier = ([], [])
+    for sq in range(NUM_SQUARES):
+        x, y = coords(sq)
+
+        sq_rays = []
+        for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            ray = []
+            nx, ny = x + dx, y + dy
+            while _on_board(nx, ny):
+                ray.append(square(nx, ny))
+                nx, ny = nx + dx, ny + dy
+            sq_rays.append(tuple(ray))
+        rays.append(tuple(sq_rays))
+
+        steps = []
+        for dx, dy, leg_dx, leg_dy in _HORSE_DELTAS:
+            if _on_board(x + dx, y + dy):
+                steps.append((square(x + dx, y + dy), square(x + leg_dx, y + leg_dy)))
+        horse.append(tuple(steps))
+
+        for side in (RED, BLACK):
+            general[side].append(tuple(
+                square(x + dx, y + dy) for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1))
+                if _in_palace(side, x, y) and _in_palace(side, x + dx, y + dy)
+            ))
+            advisor[side].append(tuple(
+                square(x + dx, y + dy) for dx, dy in ((1, 1), (1, -1), (-1, 1), (-1, -1))
+                if _in_palace(side, x, y) and _in_palace(side, x + dx, y + dy)
+            ))
+            elephant[side].append(tuple(
+                (square(x + dx, y + dy), square(x + dx // 2, y + dy // 2))
+                for dx, dy in ((2, 2), (2, -2), (-2, 2), (-2, -2))
+                if _on_board(x + dx, y + dy) and _own_half(side, y) and _own_half(side, y + dy)
+            ))
+            forward = -1 if side == RED else 1
+            targets = []
+            if _on_board(x, y + forward):
+                targets.append(square(x, y + forward))
+            if not _own_half(side, y):
+                targets.extend(square(x + dx, y) for dx in (1, -1) if _on_board(x + dx, y))
+            soldier[side].append(tuple(targets))
+
+    return (tuple(rays), tuple(map(tuple, general)), tuple(map(tuple, advisor)),
+            tuple(map(tuple, elephant)), tuple(horse), tuple(map(tuple, soldier)))
+
+RAYS, GENERAL_STEPS, ADVISOR_STEPS, ELEPHANT_STEPS, HORSE_STEPS, SOLDIER_STEPS = _build_tables()
+
+def _build_attack_tables():
+    """Reverse tables: the squares a horse or soldier must stand on to attack a square"""
+    horse = [[] for _ in range(NUM_SQUARES)]
+    for frm in range(NUM_SQUARES):
+        x, y = coords(frm)
+        for dx, dy, leg_dx, leg_dy in _HORSE_DELTAS:
+            if _on_board(x + dx, y + dy):
+                # The leg is next to the attacking horse, not next to the target
+                horse[square(x + dx, y + dy)].append((frm, square(x + leg_dx, y + leg_dy)))
+    soldier = ([[] for _ in range(NUM_SQUARES)], [[] for _ in range(NUM_SQUARES)])
+    for side in (RED, BLACK):
+        for frm in range(NUM_SQUARES):
+            for to in SOLDIER_STEPS[side][frm]:
+                soldier[side][to].append(frm)
+    return tuple(map(tuple, horse)), tuple(tuple(map(tuple, table)) for table in soldier)
+
+# HORSE_ATTACKS[sq]: (horse square, leg square); SOLDIER_ATTACKS[side][sq]: soldier squares
+HORSE_ATTACKS, SOLDIER_ATTACKS = _build_attack_tables()
+
+def _build_exposure_tables():
+    """Per general square: which of its rays passes through each square, and horses by leg square"""
+    ray_index, horse_by_leg = [], []
+    for g in range(NUM_SQUARES):
+        index = [-1] * NUM_SQUARES
+        for i, ray in enumerate(RAYS[g]):
+            for sq in ray:
+                index[sq] = i
+        by_leg = {}
+        for frm, leg in HORSE_ATTACKS[g]:
+            by_leg.setdefault(leg, []).append(frm)
+        ray_index.append(tuple(index))
+        horse_by_leg.append({leg: tuple(horses) for leg, horses in by_leg.items()})
+    return tuple(ray_index), tuple(horse_by_leg)
+
+# Outside check, a move can only expose its general on g along the ray of
+# RAYS[g] it leaves or enters (RAY_INDEX[g][sq]), or by leaving a horse leg
+# square (HORSE_BY_LEG[g][leg] lists the horses that leg blocks)
+RAY_INDEX, HORSE_BY_LEG = _build_exposure_tables()
+
+
+def pseudo_moves(board: Board, side: int) -> List[int]:
+    """Generate packed moves for one side following the piece movement rules"""
+    moves = []
+    append = moves.append
+    squares = board.squares
+    locs = board.locs
+    flag = BLACK_FLAG if side == BLACK else 0
+
+    for pid in board.side_pieces[side]:
+        frm = locs[pid]
+        if frm == NO_PIECE:
+            continue
+        base = frm << 7
+        kind = squares[frm] & TYPE_MASK
+
+        if kind == CHARIOT:
+            for ray in RAYS[frm]:
+                for to in ray:
+                    target = squares[to]
+                    if not target:
+                        append(base | to)
+                    else:
+                        if target & BLACK_FLAG != flag:
+                            append(base | to)
+                        break
+        elif kind == CANNON:
+            for ray in RAYS[frm]:
+                screened = False
+                for to in ray:
+                    target = squares[to]
+                    if not screened:
+                        if not target:
+                            append(base | to)
+                        else:
+                            screened = True
+                    elif target:
+                        if target & BLACK_FLAG != flag:
+                            append(base | to)
+                        break
+        elif kind == HORSE:
+            for to, leg in HORSE_STEPS[frm]:
+                if not squares[leg]:
+                    target = squares[to]
+                    if not target or target & BLACK_FLAG != flag:
+                        append(base | to)
+        elif kind == ELEPHANT:
+            for to, eye in ELEPHANT_STEPS[side][frm]:
+                if not squares[eye]:
+                    target = squares[to]
+                    if not target or target & BLACK_FLAG != flag:
+                        append(base | to)
+        else:
+            if kind == SOLDIER:
+                targets = SOLDIER_STEPS[side][frm]
+            elif kind == GENERAL:
+                targets = GENERAL_STEPS[side][frm]
+            else:
+                targets = ADVISOR_STEPS[side][frm]
+            for to in targets:
+                target = squares[to]
+                if not target or target & BLACK_FLAG != flag:
+                    append(base | to)
+
+    return moves
+
+
+def is_attacked(board: Board, sq: int, by_side: int) -> bool:
+    """Whether a piece of `by_side` could capture on `sq`.
+
+    Generals count along open files, which covers the flying-general rule.
+    Advisors and elephants never leave their own half, so they cannot
+    attack the enemy general and are not checked.
+    """
+    squares = board.squares
+    flag = BLACK_FLAG if by_side == BLACK else 0
+    chariot, cannon, general = CHARIOT | flag, CANNON | flag, GENERAL | flag
+    for ray in RAYS[sq]:
+        screened = False
+        for to in ray:
+            code = squares[to]
+            if not code:
+                continue
+            if screened:
+                if code == cannon:
+                    return True
+                break
+            if code == chariot or code == general:
+                return True
+            screened = True
+    horse = HORSE | flag
+    for frm, leg in HORSE_ATTACKS[sq]:
+        if squares[frm] == horse and not squares[leg]:
+            return True
+    soldier = SOLDIER | flag
+    for frm in SOLDIER_ATTACKS[by_side][sq]:
+        if squares[frm] == soldier:
+            return True
+    return False
+
+
+def is_defended(board: Board, sq: int, side: int) -> bool:
+    """Whether a piece of `side` could capture an enemy piece standing on `sq`.
+
+    Unlike is_attacked, which looks for attacks on a general, this covers
+    every piece: generals and advisors step within their palace, elephants
+    need an empty eye, and a general does not slide along a file.
+    """
+    squares = board.squares
+    flag = BLACK_FLAG if side == BLACK else 0
+    chariot, cannon = CHARIOT | flag, CANNON | flag
+    for ray in RAYS[sq]:
+        screened = False
+        for to in ray:
+            code = squares[to]
+            if not code:
+                continue
+            if screened:
+                if code == cannon:
+                    return True
+                break
+            if code == chariot:
+                return True
+            screened = True
+    general, advisor, elephant = GENERAL | flag, ADVISOR | flag, ELEPHANT | flag
+    # Palace and elephant steps are symmetric: sq is reachable from the squares it reaches
+    for frm in GENERAL_STEPS[side][sq]:
+        if squares[frm] == general:
+            return True
+    for frm in ADVISOR_STEPS[side][sq]:
+        if squares[frm] == advisor:
+            return True
+    for frm, eye in ELEPHANT_STEPS[side][sq]:
+        if squares[frm] == elephant and not squares[eye]:
+            return True
+    horse = HORSE | flag
+    for frm, leg in HORSE_ATTACKS[sq]:
+        if squares[frm] == horse and not squares[leg]:
+            return True
+    soldier = SOLDIER | flag
+    for frm in SOLDIER_ATTACKS[side][sq]:
+        if squares[frm] == soldier:
+            return True
+    return False
+
+
+def piece_captures(board: Board, sq: int) -> List[int]:
+    """Squares of the enemy pieces the piece on `sq` could capture (legality aside)"""
+    squares = board.squares
+    code = squares[sq]
+    flag = code & BLACK_FLAG
+    side = BLACK if flag else RED
+    kind = code & TYPE_MASK
+    targets = []
+    if kind == CHARIOT or kind == CANNON:
+        for ray in RAYS[sq]:
+            screened = kind == CHARIOT
+            for to in ray:
+                if squares[to]:
+                    if screened:
+                        targets.append(to)
+                        break
+                    screened = True
+    elif kind == HORSE:
+        targets = [to for to, leg in HORSE_STEPS[sq] if not squares[leg]]
+    elif kind == ELEPHANT:
+        targets = [to for to, eye in ELEPHANT_STEPS[side][sq] if not squares[eye]]
+    elif kind == SOLDIER:
+        targets = list(SOLDIER_STEPS[side][sq])
+    elif kind == GENERAL:
+        targets = list(GENERAL_STEPS[side][sq])
+    else:
+        targets = list(ADVISOR_STEPS[side][sq])
+    return [to for to in targets if squares[to] and squares[to] & BLACK_FLAG != flag]
+
+
+def in_check(board: Board, side: int) -> bool:
+    """Whether `side`'s general is attacked (or faces the other general)"""
+    general_sq = board.squares.find(GENERAL | (BLACK_FLAG if side == BLACK else 0))
+    return general_sq != -1 and is_attacked(board, general_sq, side ^ 1)
+
+
+def _ray_attacked(squares, ray, chariot: int, cannon: int, general: int) -> bool:
+    """Whether the first piece along a ray is a chariot or general, or the second a cannon"""
+    screened = False
+    for sq in ray:
+        code = squares[sq]
+        if not code:
+            continue
+        if screened:
+            return code == cannon
+        if code == chariot or code == general:
+            return True
+        screened = True
+    return False
+
+
+_NO_RAYS = (-1,) * NUM_SQUARES
+
+def check_context(board: Board, side: int):
+    """(general square, in check, RAY_INDEX row, HORSE_BY_LEG row) for testing moves of `side`.
+
+    Outside check, a non-general move with ray_index[from] < 0,
+    ray_index[to] < 0 and from not in horse_by_leg cannot expose the
+    general, so it needs no check test.
+    """
+    general_sq = board.squares.find(GENERAL | (BLACK_FLAG if side == BLACK else 0))
+    if general_sq == -1:
+        return general_sq, False, _NO_RAYS, {}
+    return general_sq, is_attacked(board, general_sq, side ^ 1), RAY_INDEX[general_sq], HORSE_BY_LEG[general_sq]
+
+
+def legal_moves(board: Board, side: int) -> List[int]:
+    """Pseudo moves of `side` that do not leave its own general in check"""
+    pseudo = pseudo_moves(board, side)
+    general_sq, checked, ray_index, horse_by_leg = check_context(board, side)
+    if general_sq == -1:
+        return pseudo
+    squares = board.squares
+    enemy = side ^ 1
+    enemy_flag = BLACK_FLAG if enemy == BLACK else 0
+    chariot, cannon, general, horse = CHARIOT | enemy_flag, CANNON | enemy_flag, GENERAL | enemy_flag, HORSE | enemy_flag
+    rays = RAYS[general_sq]
+
+    # Moves are tried on the mailbox alone: only occupancy matters for attacks
+    moves = []
+    for move in pseudo:
+        frm, to = move >> 7, move & 127
+        if checked or frm == general_sq:
+            code, captured = squares[frm], squares[to]
+            squares[to] = code
+            squares[frm] = EMPTY
+            if not is_attacked(board, to if frm == general_sq else general_sq, enemy):
+                moves.append(move)
+            squares[frm] = code
+            squares[to] = captured
+            continue
+        from_ray, to_ray = ray_index[frm], ray_index[to]
+        horses = horse_by_leg.get(frm)
+        if from_ray < 0 and to_ray < 0 and horses is None:
+            moves.append(move)
+            continue
+        code, captured = squares[frm], squares[to]
+        squares[to] = code
+        squares[frm] = EMPTY
+        exposed = ((from_ray >= 0 and _ray_attacked(squares, rays[from_ray], chariot, cannon, general))
+                   or (to_ray >= 0 and to_ray != from_ray
+                       and _ray_attacked(squares, rays[to_ray], chariot, cannon, general))
+                   or (horses is not None and any(squares[h] == horse for h in horses)))
+        squares[frm] = code
+        squares[to] = captured
+        if not exposed:
+            moves.append(move)
+    return moves
+
+
+def to_api_move(board: Board, move: int) -> Move:
+    """Convert a packed move into the API Move model"""
+    to_x, to_y = coords(move & 127)
+    return Move(piece_id=board.ids[move >> 7], to_x=to_x, to_y=to_y)
+
+
+class MoveGenerator(NamedTuple):
+    """Move generation and check detection for one board representation"""
+    pseudo_moves: Callable[[Board, int], List[int]]
+    legal_moves: Callable[[Board, int], List[int]]
+    in_check: Callable[[Board, int], bool]
+    check_context: Callable[[Board, int], Tuple]
+
+MAILBOX_GENERATOR = MoveGenerator(pseudo_moves, legal_moves, in_check, check_context)
+_GENERATORS: Dict[type, MoveGenerator] = {Board: MAILBOX_GENERATOR}
+
+
+def register_generator(board_class: type, generator: MoveGenerator) -> None:
+    """Use `generator` for boards of `board_class` (see app.bitboard)"""
+    _GENERATORS[board_class] = generator
+
+
+def generator_for(board: Board) -> MoveGenerator:
+    """The move generator matching a board's representation"""
+    return _GENERATORS[type(board)]
+
+
+def generate_moves(game_state: GameState) -> List[Move]:
+    """Generate all legal moves for the side to move, the moves is_valid_move accepts"""
+    MOVEGEN_CALLS.inc(1, "generate_moves")
+    board = board_of(game_state)
+    return [to_api_move(board, m) for m in generator_for(board).legal_moves(board, board.turn)]
+
+
+# Legal-move maps by position hash and piece layout (the square of each piece
+# id). States from make_move number pieces in FEN reading order, so every game
+# reaching a position shares its map; states with the pieces listed in another
+# order (client-supplied or legacy ones) get their own.
+MOVE_MAP_CACHE_SIZE = 4096
+_move_maps: "OrderedDict[Tuple[int, Tuple[int, ...]], Dict[int, List[Tuple[int, int]]]]" = OrderedDict()
+
+
+def legal_move_map(game_state: GameState) -> Dict[int, List[Tuple[int, int]]]:
+    """Legal (x, y) destinations of each movable piece of the side to move, keyed by piece id.
+
+    Computed once per position and cached by its Zobrist hash and piece
+    layout; the state returned by make_move has a new hash, so it never sees
+    a stale map. The returned dict is shared and must not be modified.
+    """
+    board = board_of(game_state)
+    key = (board.hash, tuple(board.locs))
+    moves = _move_maps.get(key)
+    if moves is not None:
+        MOVEGEN_CALLS.inc(1, "move_map_cached")
+        _move_maps.move_to_end(key)
+        return moves
+    MOVEGEN_CALLS.inc(1, "move_map")
+    moves = {}
+    ids = board.ids
+    for move in generator_for(board).legal_moves(board, board.turn):
+        moves.setdefault(ids[move >> 7], []).append(coords(move & 127))
+    _move_maps[key] = moves
+    if len(_move_maps) > MOVE_MAP_CACHE_SIZE:
+        _move_maps.popitem(last=False)
+    return moves
+
+
+def perft(board: Board, depth: int) -> int:
+    """Count the leaf positions of the legal move tree to a fixed depth (move generator check and benchmark)"""
+    return _perft(board, depth, generator_for(board).legal_moves)
+
+
+def _perft(board: Board, depth: int, legal) -> int:
+    moves = legal(board, board.turn)
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    total = 0
+    for move in moves:
+        board.do_move(move)
+        total += _perft(board, depth - 1, legal)
+        board.undo_move()
+    return total
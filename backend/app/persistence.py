@@ -0,0 +1,131 @@
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+from .metrics import PHASE_LATENCY
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteGameStore:
+    """Write-behind persistence of game payloads in a local SQLite file.
+
+    `enqueue` only records the latest payload per game in memory; a
+    background thread writes everything pending in a single transaction
+    every `flush_interval` seconds (or sooner once `batch_size` games are
+    dirty), so request handlers never wait on disk I/O.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 0.5, batch_size: int = 256):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending: Dict[str, Optional[str]] = {}  # None marks a deletion
+        self._inflight: Dict[str, Optional[str]] = {}  # batch currently being written
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database on first use (and again after close)"""
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS games ("
+                " game_id TEXT PRIMARY KEY, payload TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def start(self) -> None:
+        """Start the background flush thread"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="game-store-flush", daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        """Stop the flush thread, write anything still pending and close the database"""
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def enqueue(self, game_id: str, payload: str) -> None:
+        """Schedule a game payload to be written; later calls supersede earlier ones"""
+        with self._lock:
+            self._pending[game_id] = payload
+            if len(self._pending) >= self.batch_size:
+                self._wake.set()
+
+    def delete(self, game_id: str) -> None:
+        """Schedule a game to be removed from storage"""
+        with self._lock:
+            self._pending[game_id] = None
+
+    def load(self, game_id: str) -> Optional[str]:
+        """Latest payload for a game, including writes that are not flushed yet"""
+        with self._lock:
+            if game_id in self._pending:
+                return self._pending[game_id]
+            if game_id in self._inflight:
+                return self._inflight[game_id]
+        with self._db_lock:
+            row = self._connection().execute("SELECT payload FROM games WHERE game_id = ?", (game_id,)).fetchone()
+        return row[0] if row else None
+
+    def flush(self) -> int:
+        """Write all pending changes in one transaction; returns the number of games written"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._inflight = pending
+        if not pending:
+            return 0
+        now = time.time()
+        upserts = [(game_id, payload, now) for game_id, payload in pending.items() if payload is not None]
+        deletes = [(game_id,) for game_id, payload in pending.items() if payload is None]
+        try:
+            with self._db_lock, PHASE_LATENCY.time("persist"):
+                conn = self._connection()
+                with conn:
+                    if upserts:
+                        conn.executemany(
+                            "INSERT INTO games (game_id, payload, updated_at) VALUES (?, ?, ?)"
+                            " ON CONFLICT(game_id) DO UPDATE SET payload = excluded.payload,"
+                            " updated_at = excluded.updated_at",
+                            upserts,
+                        )
+                    if deletes:
+                        conn.executemany("DELETE FROM games WHERE game_id = ?", deletes)
+        except sqlite3.Error:
+            # Put the batch back unless a newer write arrived meanwhile
+            with self._lock:
+                for game_id, payload in pending.items():
+                    self._pending.setdefault(game_id, payload)
+            raise
+        finally:
+            with self._lock:
+                self._inflight = {}
+        return len(pending)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.error("Error flushing game store: %s", e)
@@ -0,0 +1,311 @@
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Set
+from .board import Board, TYPE_MASK, GENERAL
+from .evaluation import DEFAULT_WEIGHTS, Weights
+from .movegen import MAILBOX_GENERATOR, generator_for
+from .tt import TranspositionTable, EXACT, LOWER, UPPER
+
+MATE = 100000
+INFINITY = MATE + 1
+MAX_PLY = 64
+
+# How often (in nodes) the clock and node budget are checked
+CHECK_INTERVAL = 1024
+
+
+@dataclass
+class SearchLimits:
+    """Budget for a single search; any unset limit is ignored"""
+    max_depth: int = 4
+    time_ms: Optional[int] = 1000
+    nodes: Optional[int] = None
+
+
+@dataclass
+class SearchResult:
+    move: Optional[int]  # packed (from << 7 | to) move, None if no move exists
+    score: int
+    depth: int
+    nodes: int
+    elapsed: float
+    pv: List[int] = field(default_factory=list)
+    tt_hits: int = 0
+    tt_misses: int = 0
+    movegen_calls: int = 0  # move lists generated, at the root, in the tree and in quiescence
+
+    @property
+    def nps(self) -> int:
+        """Nodes searched per second"""
+        return int(self.nodes / self.elapsed) if self.elapsed > 0 else self.nodes
+
+
+class SearchAborted(Exception):
+    """Raised inside the search when the time or node budget runs out"""
+
+
+def evaluate(board: Board) -> int:
+    """Static evaluation from the point of view of the side to move.
+
+    The board keeps its material + piece-square score up to date in
+    do_move/undo_move, so this is a lookup rather than a scan.
+    """
+    return -board.score if board.turn else board.score
+
+
+def _score_to_tt(score: int, ply: int) -> int:
+    """Store mate scores relative to the node rather than the root"""
+    if score >= MATE - MAX_PLY:
+        return score + ply
+    if score <= -MATE + MAX_PLY:
+        return score - ply
+    return score
+
+
+def _score_from_tt(score: int, ply: int) -> int:
+    if score >= MATE - MAX_PLY:
+        return score - ply
+    if score <= -MATE + MAX_PLY:
+        return score + ply
+    return score
+
+
+def _capture_order(board: Board, move: int, values: List[int]) -> int:
+    """MVV-LVA key: most valuable victim first, least valuable attacker breaks ties"""
+    squares = board.squares
+    return values[squares[move & 127] & TYPE_MASK] * 16 - values[squares[move >> 7] & TYPE_MASK] // 10
+
+
+class Searcher:
+    """Negamax alpha-beta with iterative deepening and capture quiescence"""
+
+    def __init__(self, limits: Optional[SearchLimits] = None, tt: Optional[TranspositionTable] = None,
+                 stop: Optional[Callable[[], bool]] = None, start_depth: int = 1,
+                 on_depth: Optional[Callable[["SearchResult"], None]] = None, weights: Optional[Weights] = None):
+        self.limits = limits or SearchLimits()
+        self.weights = weights or DEFAULT_WEIGHTS  # evaluation and move ordering values
+        self.piece_values = list(self.weights.material)
+        self.tt = tt
+        self.stop = stop  # polled with the clock; returning True aborts the search
+        self.on_depth = on_depth  # called with the result so far after each completed iteration
+        self.start_depth = start_depth  # first iteration; Lazy SMP helpers vary it (see app.smp)
+        self.gen = MAILBOX_GENERATOR  # matched to the board's representation by search()
+        self.nodes = 0
+        self.movegen_calls = 0
+        self.deadline: Optional[float] = None
+        self.node_limit: Optional[int] = None
+        self.next_check = CHECK_INTERVAL
+        self.prev_pv: List[int] = []
+        self.excluded: Set[int] = set()  # root moves to skip; analyze() excludes the lines already found
+        self.pv_table: List[List[int]] = [[] for _ in range(MAX_PLY + 1)]
+
+    def _check_limits(self):
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchAborted()
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchAborted()
+        if self.stop is not None and self.stop():
+            raise SearchAborted()
+        self.next_check = self.nodes + CHECK_INTERVAL
+        if self.node_limit is not None:
+            self.next_check = min(self.next_check, self.node_limit)
+
+    def _order_moves(self, board: Board, moves: List[int], ply: int, hash_move: Optional[int]) -> List[int]:
+        squares = board.squares
+        values = self.piece_values
+        captures = [m for m in moves if squares[m & 127]]
+        captures.sort(key=lambda m: _capture_order(board, m, values), reverse=True)
+        quiets = [m for m in moves if not squares[m & 127]]
+        ordered = captures + quiets
+        hints = [hash_move]
+        if ply < len(self.prev_pv):
+            hints.append(self.prev_pv[ply])
+        for hint in hints:
+            if hint is not None and hint in moves:
+                ordered.remove(hint)
+                ordered.insert(0, hint)
+        return ordered
+
+    def _quiesce(self, board: Board, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if self.nodes >= self.next_check:
+            self._check_limits()
+
+        stand_pat = evaluate(board)
+        if stand_pat >= beta or ply >= MAX_PLY:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        squares = board.squares
+        side = board.turn
+        gen = self.gen
+        self.movegen_calls += 1
+        captures = [m for m in gen.pseudo_moves(board, side) if squares[m & 127]]
+        values = self.piece_values
+        captures.sort(key=lambda m: _capture_order(board, m, values), reverse=True)
+        if captures:
+            general_sq, checked, ray_index, horse_by_leg = gen.check_context(board, side)
+            in_check = gen.in_check
+        for move in captures:
+            if squares[move & 127] & TYPE_MASK == GENERAL:
+                return MATE - ply - 1
+            frm, to = move >> 7, move & 127
+            board.do_move(move)
+            if ((checked or frm == general_sq or ray_index[frm] >= 0 or ray_index[to] >= 0 or frm in horse_by_leg)
+                    and in_check(board, side)):
+                board.undo_move()
+                continue
+            score = -self._quiesce(board, -beta, -alpha, ply + 1)
+            board.undo_move()
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    def _negamax(self, board: Board, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self.pv_table[ply] = []
+        if depth <= 0 or ply >= MAX_PLY:
+            return self._quiesce(board, alpha, beta, ply)
+
+        self.nodes += 1
+        if self.nodes >= self.next_check:
+            self._check_limits()
+
+        tt = self.tt
+        hash_move = None
+        if tt is not None:
+            entry = tt.probe(board.hash)
+            if entry is not None:
+                entry_depth, bound, score, hash_move = entry
+                if ply > 0 and entry_depth >= depth:
+                    score = _score_from_tt(score, ply)
+                    if bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha):
+                        if hash_move is not None:
+                            self.pv_table[ply] = [hash_move]
+                        return score
+
+        side = board.turn
+        gen = self.gen
+        in_check = gen.in_check
+        self.movegen_calls += 1
+        moves = gen.pseudo_moves(board, side)
+        if not ply and self.excluded:
+            moves = [m for m in moves if m not in self.excluded]
+        general_sq, checked, ray_index, horse_by_leg = gen.check_context(board, side)
+        squares = board.squares
+        alpha_orig = alpha
+        best = -INFINITY
+        best_move = None
+        for move in self._order_moves(board, moves, ply, hash_move):
+            if squares[move & 127] & TYPE_MASK == GENERAL:
+                score = MATE - ply - 1
+                self.pv_table[ply + 1] = []
+            else:
+                frm, to = move >> 7, move & 127
+                board.do_move(move)
+                if ((checked or frm == general_sq or ray_index[frm] >= 0 or ray_index[to] >= 0
+                     or frm in horse_by_leg) and in_check(board, side)):
+                    # Illegal: leaves the general attacked or facing the other general
+                    board.undo_move()
+                    continue
+                score = -self._negamax(board, depth - 1, -beta, -alpha, ply + 1)
+                board.undo_move()
+            if score > best:
+                best = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    self.pv_table[ply] = [move] + self.pv_table[ply + 1]
+                    if alpha >= beta:
+                        break
+
+        if best_move is None:
+            # No legal move: checkmate or stalemate, both lost in Xiangqi
+            return -MATE + ply
+
+        if tt is not None and (ply or not self.excluded):  # a restricted root result is no real bound
+            bound = LOWER if best >= beta else (EXACT if best > alpha_orig else UPPER)
+            tt.store(board.hash, depth, bound, _score_to_tt(best, ply), best_move)
+        return best
+
+    def search(self, board: Board) -> SearchResult:
+        """Search a position within the configured limits and return the best move found"""
+        # Moves are made and unmade in place; an aborted search may leave the
+        # scratch board mid-line, so never search the caller's board directly
+        board = board.copy()
+        if board.piece_square is not self.weights.piece_square:
+            board.set_weights(self.weights.piece_square)
+        self.gen = generator_for(board)
+        limits = self.limits
+        start = time.perf_counter()
+        self.nodes = 0
+        self.movegen_calls = 1  # the root's legal moves below
+        self.deadline = start + limits.time_ms / 1000 if limits.time_ms else None
+        self.node_limit = limits.nodes or None
+        self.next_check = min(CHECK_INTERVAL, self.node_limit or CHECK_INTERVAL)
+        self.prev_pv = []
+        tt = self.tt
+        if tt is not None:
+            tt.new_search()
+            hits, misses = tt.hits, tt.misses
+
+        root_moves = [m for m in self.gen.legal_moves(board, board.turn) if m not in self.excluded]
+        result = SearchResult(move=root_moves[0] if root_moves else None, score=0, depth=0, nodes=0, elapsed=0.0)
+        if root_moves:
+            max_depth = max(1, limits.max_depth)
+            for depth in range(min(self.start_depth, max_depth), max_depth + 1):
+                try:
+                    score = self._negamax(board, depth, -INFINITY, INFINITY, 0)
+                except SearchAborted:
+                    # Root moves already searched to completion in this iteration
+                    # (the previous best is always tried first) are still usable
+                    pv = self.pv_table[0]
+                    if pv:
+                        result.move, result.pv = pv[0], pv
+                    break
+                pv = self.pv_table[0]
+                if pv:
+                    result.move, result.score, result.depth, result.pv = pv[0], score, depth, pv
+                self.prev_pv = pv
+                if self.on_depth is not None:
+                    result.nodes = self.nodes
+                    self.on_depth(result)
+                if abs(score) >= MATE - MAX_PLY:
+                    break  # forced result found, deeper search cannot change it
+
+        result.nodes = self.nodes
+        result.movegen_calls = self.movegen_calls
+        result.elapsed = time.perf_counter() - start
+        if tt is not None:
+            result.tt_hits = tt.hits - hits
+            result.tt_misses = tt.misses - misses
+        return result
+
+
+def search(board: Board, limits: Optional[SearchLimits] = None,
+           tt: Optional[TranspositionTable] = None, stop: Optional[Callable[[], bool]] = None,
+           on_depth: Optional[Callable[[SearchResult], None]] = None,
+           weights: Optional[Weights] = None) -> SearchResult:
+    """Convenience wrapper: run a fresh Searcher on a board, optionally reusing a table"""
+    return Searcher(limits, tt, stop, on_depth=on_depth, weights=weights).search(board)
+
+
+def analyze(board: Board, limits: Optional[SearchLimits] = None, multipv: int = 1,
+            tt: Optional[TranspositionTable] = None, stop: Optional[Callable[[], bool]] = None) -> List[SearchResult]:
+    """The best `multipv` lines of a position, best first.
+
+    Each line is a full search within `limits` that excludes the first moves
+    of the lines before it, so the scores are exact rather than bounds.
+    Lines whose search did not complete a single depth are left out.
+    """
+    searcher = Searcher(limits, tt, stop)
+    lines: List[SearchResult] = []
+    while len(lines) < multipv:
+        result = searcher.search(board)
+        if result.move is None or result.depth == 0:
+            break
+        lines.append(result)
+        searcher.excluded.add(result.move)
+    return lines
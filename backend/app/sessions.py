@@ -0,0 +1,97 @@
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Optional
+from .models import GameState
+from .fen import dump_state, load_state
+from .persistence import SQLiteGameStore
+
+
+@dataclass
+class GameSession:
+    game_id: str
+    state: GameState
+    last_access: float = field(default_factory=time.monotonic)
+    ai_task: Optional[Any] = None  # background asyncio task computing the AI reply
+    active: bool = True  # cleared once the game is replaced or deleted
+
+
+class GameStore:
+    """In-memory games keyed by id with LRU and idle-TTL eviction.
+
+    Evicted games stay in the backing SQLiteGameStore (if any) and are loaded
+    back on the next access.
+    """
+
+    def __init__(self, backend: Optional[SQLiteGameStore] = None, max_games: int = 1000,
+                 ttl_seconds: float = 3600):
+        self.backend = backend
+        self.max_games = max_games
+        self.ttl_seconds = ttl_seconds
+        self._games: "OrderedDict[str, GameSession]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._games)
+
+    def __contains__(self, game_id: str) -> bool:
+        return game_id in self._games
+
+    def create(self, state: GameState, game_id: Optional[str] = None) -> GameSession:
+        """Register a new game (or replace one with the same id) and persist it"""
+        session = GameSession(game_id=game_id or uuid.uuid4().hex, state=state)
+        replaced = self._games.get(session.game_id)
+        if replaced is not None:
+            replaced.active = False
+        self._games[session.game_id] = session
+        self._games.move_to_end(session.game_id)
+        self.save(session)
+        self._evict()
+        return session
+
+    def get(self, game_id: str) -> Optional[GameSession]:
+        """Look up a game, reloading it from storage if it was evicted"""
+        session = self._games.get(game_id)
+        if session is None and self.backend is not None:
+            payload = self.backend.load(game_id)
+            if payload is not None:
+                session = GameSession(game_id=game_id, state=load_state(payload))
+                self._games[game_id] = session
+        if session is None:
+            return None
+        session.last_access = time.monotonic()
+        self._games.move_to_end(game_id)
+        self._evict()
+        return session
+
+    def save(self, session: GameSession) -> None:
+        """Queue the session's current state (as a compact FEN record) for write-behind persistence"""
+        if self.backend is not None:
+            self.backend.enqueue(session.game_id, dump_state(session.state))
+
+    def delete(self, game_id: str) -> None:
+        """Forget a game in memory and in storage"""
+        session = self._games.pop(game_id, None)
+        if session is not None:
+            session.active = False
+        if self.backend is not None:
+            self.backend.delete(game_id)
+
+    def _evict(self) -> None:
+        """Drop least recently used games over max_games, then idle ones past the TTL.
+
+        Games whose AI reply is still being computed are kept: the task holds
+        the session and would otherwise save its move into a dropped copy.
+        So is the game just created or accessed, even if that leaves the
+        store over max_games until those replies are done.
+        """
+        games = self._games
+        excess = len(games) - self.max_games
+        cutoff = time.monotonic() - self.ttl_seconds
+        for game_id, session in list(games.items())[:-1]:
+            if excess <= 0 and session.last_access >= cutoff:
+                break
+            if session.ai_task is not None and not session.ai_task.done():
+                continue
+            del games[game_id]
+            excess -= 1
@@ -0,0 +1,187 @@
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from typing import Callable, List, Optional
+from .board import Board, board_class
+from .fen import board_fen, from_fen
+from .logging_config import configure_logging
+from .search import SearchLimits, SearchResult, Searcher
+from .tt import TranspositionTable, ENTRY_BYTES, _MOVE_MASK, _SCORE_MASK, _SCORE_OFFSET, _pack
+
+# Shared block layout: one 8-byte header word (the search age), then the key
+# words of every slot, then the data words
+_HEADER_WORDS = 1
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """TranspositionTable whose entries live in a multiprocessing.shared_memory block.
+
+    The process that creates the table owns it; others attach with its
+    `name` and the same `size_mb`. Reads and writes take no locks: each key
+    word holds key ^ data, so an entry torn by two processes writing the
+    same slot fails verification and is treated as a miss. Only the owner
+    advances the search age, which every process reads from the block.
+    """
+
+    def __init__(self, size_mb: int = 16, name: Optional[str] = None):
+        buckets = max(1, size_mb * 1024 * 1024 // (2 * ENTRY_BYTES))
+        buckets = 1 << (buckets.bit_length() - 1)
+        size = (_HEADER_WORDS + 4 * buckets) * 8
+        self.owner = name is None
+        if self.owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+            self._shm.buf[:size] = bytes(size)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self.name = self._shm.name
+        self.size_mb = size_mb
+        words = self._shm.buf[:size].cast("Q")
+        self._header = words[:_HEADER_WORDS]
+        self.keys = words[_HEADER_WORDS:_HEADER_WORDS + 2 * buckets]
+        self.data = words[_HEADER_WORDS + 2 * buckets:]
+        self._words = words
+        self.mask = buckets - 1
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    @property
+    def age(self) -> int:
+        return self._header[0]
+
+    @age.setter
+    def age(self, value: int) -> None:
+        if self.owner:
+            self._header[0] = value
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters (owner only)"""
+        if self.owner:
+            self._shm.buf[:self._words.nbytes] = bytes(self._words.nbytes)
+        self.hits = self.misses = self.stores = 0
+
+    def probe(self, key: int):
+        """Return (depth, bound, score, best_move) stored for a key, or None"""
+        i = (key & self.mask) << 1
+        keys, data = self.keys, self.data
+        for slot in (i, i + 1):
+            word = data[slot]
+            if keys[slot] ^ word == key:
+                bound = (word >> 34) & 3
+                if bound:
+                    self.hits += 1
+                    move = word & _MOVE_MASK
+                    return ((word >> 36) & 255, bound,
+                            ((word >> 14) & _SCORE_MASK) - _SCORE_OFFSET, move or None)
+        self.misses += 1
+        return None
+
+    def store(self, key: int, depth: int, bound: int, score: int, move: Optional[int]) -> None:
+        """Record a search result, replacing according to the two-tier policy"""
+        i = (key & self.mask) << 1
+        keys, data = self.keys, self.data
+        age = self.age
+        old = data[i]
+        if (keys[i] ^ old == key or not (old >> 34) & 3 or ((old >> 44) & 255) != age
+                or depth >= (old >> 36) & 255):
+            slot = i
+        else:
+            slot = i + 1
+        if move is None and keys[slot] ^ data[slot] == key:
+            move = data[slot] & _MOVE_MASK or None
+        word = _pack(depth, bound, score, move, age)
+        data[slot] = word
+        keys[slot] = key ^ word
+        self.stores += 1
+
+    def close(self) -> None:
+        """Detach from the block; the owner also frees it"""
+        for view in (self._header, self.keys, self.data, self._words):
+            view.release()
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
+
+
+# Per-helper state, set up once by _init_helper in each helper process
+_helper_tt: Optional[SharedTranspositionTable] = None
+_helper_stop = None
+
+
+def _init_helper(tt_name: str, tt_size_mb: int, stop_flag) -> None:
+    global _helper_tt, _helper_stop
+    configure_logging()
+    _helper_tt = SharedTranspositionTable(tt_size_mb, name=tt_name)
+    _helper_stop = stop_flag
+
+
+def _helper_search(fen: str, limits: SearchLimits, index: int) -> SearchResult:
+    """Helper-side job: search the root until done or told to stop.
+
+    Odd helpers start one iteration deeper, so helpers spread over two
+    depths and fill the table with entries the main search can use.
+    """
+    board = board_class().from_state(from_fen(fen))
+    searcher = Searcher(limits, _helper_tt, stop=lambda: _helper_stop.value != 0, start_depth=1 + index % 2)
+    return searcher.search(board)
+
+
+class LazySMP:
+    """Parallel search: helper processes search the same root as the caller.
+
+    All searches share one SharedTranspositionTable and otherwise run
+    independently; what one finds speeds up the others. The caller's own
+    search decides when to stop. Its result is used unless a helper
+    completed a deeper iteration.
+    """
+
+    def __init__(self, threads: int = 2, tt_size_mb: int = 16):
+        self.threads = max(1, threads)
+        self.tt_size_mb = tt_size_mb
+        self.tt = SharedTranspositionTable(tt_size_mb)
+        self._stop = multiprocessing.get_context("spawn").Value("b", 0, lock=False)
+        self._executor: Optional[Executor] = None
+
+    def start(self) -> None:
+        if self._executor is not None or self.threads == 1:
+            return
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.threads - 1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_helper,
+            initargs=(self.tt.name, self.tt_size_mb, self._stop),
+        )
+
+    def close(self) -> None:
+        """Stop the helpers and free the shared table"""
+        self._stop.value = 1
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        self.tt.close()
+
+    def search(self, board: Board, limits: Optional[SearchLimits] = None,
+               stop: Optional[Callable[[], bool]] = None,
+               on_depth: Optional[Callable[[SearchResult], None]] = None) -> SearchResult:
+        """Search a position with every thread; same contract as search.search"""
+        limits = limits or SearchLimits()
+        self.start()
+        self._stop.value = 0
+        searcher = Searcher(limits, self.tt, stop, on_depth=on_depth)
+        helpers = []
+        if self._executor is not None:
+            # Helpers read the search age from the table, which the main Searcher advances
+            fen = board_fen(board)
+            helpers = [self._executor.submit(_helper_search, fen, limits, i) for i in range(1, self.threads)]
+        result = searcher.search(board)
+        self._stop.value = 1
+        done, _ = wait(helpers)
+        results: List[SearchResult] = [f.result() for f in done if f.exception() is None]
+        best = result
+        for helper in results:
+            if helper.move is not None and helper.depth > best.depth:
+                best = helper
+        best.nodes = result.nodes + sum(helper.nodes for helper in results)
+        best.movegen_calls = result.movegen_calls + sum(helper.movegen_calls for helper in results)
+        best.elapsed = result.elapsed
+        return best
@@ -0,0 +1,124 @@
+import logging
+import mmap
+import os
+import struct
+from array import array
+from typing import Dict, Iterable, List, Optional
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# Snapshot file layout: a header, one directory entry per table, then the
+# tables' raw items in native byte order (snapshots are built on the machine
+# that uses them, like the opening book and tablebases). Table names carry
+# their own layout version (e.g. "bitboard/1/file_slides"), so changing how
+# one module lays out a table only invalidates that table: a stale snapshot
+# simply misses the new name and the module builds the table itself.
+SNAPSHOT_MAGIC = b"XQTS"
+SNAPSHOT_VERSION = 1
+_HEADER = struct.Struct("<4sII")  # magic, format version, table count
+_ENTRY = struct.Struct("<40sc7xQQ")  # name, array typecode, byte offset, item count
+
+_WIDE_MASK = (1 << 64) - 1
+
+
+def split_wide(values: Iterable[int]) -> array:
+    """Non-negative ints of up to 128 bits (bitboards) as (low, high) 64-bit words"""
+    words = array("Q")
+    for value in values:
+        words.append(value & _WIDE_MASK)
+        words.append(value >> 64)
+    return words
+
+
+def join_wide(words) -> List[int]:
+    """Inverse of split_wide"""
+    low, high = words[0::2], words[1::2]
+    return [lo | hi << 64 if hi else lo for lo, hi in zip(low, high)]
+
+
+def write_snapshot(path: str, tables: Dict[str, array]) -> None:
+    """Write named arrays to a snapshot file, replacing it atomically"""
+    offset = _HEADER.size + _ENTRY.size * len(tables)
+    entries, blobs = [], []
+    for name, values in sorted(tables.items()):
+        offset += -offset % 8  # keep every table 8-byte aligned for memoryview.cast
+        blob = values.tobytes()
+        entries.append(_ENTRY.pack(name.encode(), values.typecode.encode(), offset, len(values)))
+        blobs.append((offset, blob))
+        offset += len(blob)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(tables)))
+        f.write(b"".join(entries))
+        for start, blob in blobs:
+            f.write(bytes(start - f.tell()))
+            f.write(blob)
+    os.replace(tmp, path)
+
+
+class Snapshot:
+    """Read-only view of a snapshot file mapped with mmap; tables are memoryviews into the map"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._entries = self._read_directory()
+        except (ValueError, struct.error):
+            self._map.close()
+            raise
+
+    def _read_directory(self) -> Dict[str, tuple]:
+        magic, version, count = _HEADER.unpack_from(self._map, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"{self.path} is not a version {SNAPSHOT_VERSION} table snapshot")
+        entries = {}
+        for i in range(count):
+            name, typecode, offset, length = _ENTRY.unpack_from(self._map, _HEADER.size + i * _ENTRY.size)
+            typecode = typecode.decode()
+            if offset + length * array(typecode).itemsize > len(self._map):
+                raise ValueError(f"{self.path} is truncated")
+            entries[name.rstrip(b"\0").decode()] = (typecode, offset, length)
+        return entries
+
+    def names(self) -> List[str]:
+        return sorted(self._entries)
+
+    def get(self, name: str) -> Optional[memoryview]:
+        """A table as a typed memoryview, or None if the snapshot does not have it"""
+        entry = self._entries.get(name)
+        if entry is None:
+            return None
+        typecode, offset, length = entry
+        size = array(typecode).itemsize
+        return memoryview(self._map)[offset:offset + length * size].cast(typecode)
+
+    def close(self) -> None:
+        self._map.close()
+
+
+# The process-wide snapshot named by config.TABLE_SNAPSHOT, opened on first use
+_snapshot: Optional[Snapshot] = None
+_opened = False
+
+
+def load_tables(names: Iterable[str]) -> Optional[Dict[str, memoryview]]:
+    """The named tables from the configured snapshot, or None unless it has all of them"""
+    global _snapshot, _opened
+    if not _opened:
+        _opened = True
+        path = config.TABLE_SNAPSHOT
+        if path and os.path.exists(path):
+            try:
+                _snapshot = Snapshot(path)
+            except (OSError, ValueError) as e:
+                logger.warning("Table snapshot ignored: %s", e)
+    if _snapshot is None:
+        return None
+    tables = {name: _snapshot.get(name) for name in names}
+    if any(view is None for view in tables.values()):
+        logger.info("Table snapshot %s is missing some tables; building them", _snapshot.path)
+        return None
+    return tables
@@ -0,0 +1,367 @@
+import logging
+import mmap
+import os
+import struct
+from array import array
+from itertools import product
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from .board import (
+    Board, TYPE_CODES, BLACK_FLAG, TYPE_MASK, NO_PIECE, RED, BLACK, GENERAL, ADVISOR, ELEPHANT, SOLDIER,
+    NUM_SQUARES, BOARD_HEIGHT, coords, square,
+)
+from .fen import FEN_LETTERS, LETTER_TYPES
+from .movegen import generator_for, in_check, legal_moves
+
+logger = logging.getLogger(__name__)
+
+# Table file layout: a 32-byte header, then one byte per position index.
+# A byte is DRAW, INVALID (the index is not a legal position), or the
+# distance to mate in plies plus one: odd distances are wins for the side
+# to move, even ones losses (0 = mated or stalemated now).
+TB_MAGIC = b"XQTB"
+TB_VERSION = 1
+_HEADER = struct.Struct(">4sII20s")  # magic, version, entry count, ending name
+DRAW = 0
+INVALID = 255
+MAX_DISTANCE = 253
+TB_SUFFIX = ".xqtb"
+
+# Endings built by tools.build_tablebase unless others are named; the
+# smaller endings reachable by captures are always built with them
+DEFAULT_ENDINGS = ("KR-K", "KR-KA", "KR-KAA", "KR-KB", "KN-K", "KN-KA", "KP-K", "KNP-K", "KC-KA")
+
+Ending = Tuple[int, ...]  # piece codes, sorted: red pieces (general first), then black pieces
+
+
+def parse_ending(name: str) -> Ending:
+    """Piece codes of an ending written like "KNP-K" (FEN letters, red before the dash)"""
+    sides = name.upper().split("-")
+    if len(sides) != 2:
+        raise ValueError(f"Ending must look like KR-KA, got {name!r}")
+    codes = []
+    for flag, letters in zip((0, BLACK_FLAG), sides):
+        types = [LETTER_TYPES.get(letter.lower()) for letter in letters]
+        if None in types:
+            raise ValueError(f"Unknown piece letter in ending {name!r}")
+        side_codes = [TYPE_CODES[t] for t in types]
+        if side_codes.count(GENERAL) != 1:
+            raise ValueError(f"Each side of ending {name!r} needs exactly one general")
+        codes.extend(code | flag for code in side_codes)
+    return tuple(sorted(codes))
+
+
+def ending_name(codes: Ending) -> str:
+    letters = {code: FEN_LETTERS[piece_type].upper() for piece_type, code in TYPE_CODES.items()}
+    red = "".join(letters[c] for c in codes if not c & BLACK_FLAG)
+    black = "".join(letters[c & TYPE_MASK] for c in codes if c & BLACK_FLAG)
+    return f"{red}-{black}"
+
+
+def _mirror_codes(codes: Iterable[int]) -> Ending:
+    return tuple(sorted(code ^ BLACK_FLAG for code in codes))
+
+
+def _mirror_square(sq: int) -> int:
+    x, y = coords(sq)
+    return square(x, BOARD_HEIGHT - 1 - y)
+
+
+def canonical(codes: Ending) -> Tuple[Ending, bool]:
+    """The stored orientation of an ending (red has the larger material), and whether it is mirrored"""
+    red = sorted((c for c in codes if not c & BLACK_FLAG), reverse=True)
+    black = sorted((c & TYPE_MASK for c in codes if c & BLACK_FLAG), reverse=True)
+    if red >= black:
+        return codes, False
+    return _mirror_codes(codes), True
+
+
+def _domain(code: int) -> Tuple[int, ...]:
+    """Squares a piece can ever stand on"""
+    kind, side = code & TYPE_MASK, 1 if code & BLACK_FLAG else 0
+    squares = []
+    for sq in range(NUM_SQUARES):
+        x, y = coords(sq)
+        row = y if side == BLACK else BOARD_HEIGHT - 1 - y  # rows from the side's own back rank
+        if kind in (GENERAL, ADVISOR):
+            ok = 3 <= x <= 5 and row <= 2 and (kind == GENERAL or (x - 3 + row) % 2 == 0)
+        elif kind == ELEPHANT:
+            ok = row <= 4 and x % 2 == 0 and row % 2 == 0 and (x // 2 + row // 2) % 2 == 1
+        elif kind == SOLDIER:
+            ok = row >= 5 or (row in (3, 4) and x % 2 == 0)
+        else:
+            ok = True
+        if ok:
+            squares.append(sq)
+    return tuple(squares)
+
+
+class _Layout:
+    """Mixed-radix position index of an ending: each piece's place in its domain, then the side to move"""
+
+    def __init__(self, codes: Ending):
+        self.codes = codes
+        self.domains = [_domain(code) for code in codes]
+        self.places = [{sq: i for i, sq in enumerate(domain)} for domain in self.domains]
+        self.strides = [1] * len(codes)
+        for i in range(len(codes) - 2, -1, -1):
+            self.strides[i] = self.strides[i + 1] * len(self.domains[i + 1])
+        self.per_side = self.strides[0] * len(self.domains[0])
+        self.size = 2 * self.per_side
+
+    def index(self, pieces: List[Tuple[int, int]], side: int) -> int:
+        """Index of (code, square) pieces sorted by code, with `side` to move"""
+        index = side * self.per_side
+        for (_, sq), places, stride in zip(pieces, self.places, self.strides):
+            index += places[sq] * stride
+        return index
+
+
+def _table_index(codes: Ending, pieces: List[Tuple[int, int]], side: int) -> Tuple[Ending, int, "_Layout"]:
+    # Mirror into the stored orientation, then index
+    stored, mirrored = canonical(codes)
+    if mirrored:
+        pieces = sorted((code ^ BLACK_FLAG, _mirror_square(sq)) for code, sq in pieces)
+        side ^= 1
+    layout = _layouts.get(stored)
+    if layout is None:
+        layout = _layouts[stored] = _Layout(stored)
+    return stored, layout.index(pieces, side), layout
+
+_layouts: Dict[Ending, _Layout] = {}
+
+
+def solve(codes: Ending, tables: Dict[Ending, bytes]) -> bytes:
+    """Retrograde analysis of one ending; `tables` must hold every ending reachable by a capture.
+
+    Moves are generated once into a graph of (position, successor) edges.
+    Captures lead out of the ending, to a fixed node per value found in the
+    smaller table. Values are then settled ply by ply: a position is won
+    in d if some move reaches a loss in d - 1, and lost in d if every move
+    reaches a win of at most d - 1. Whatever is left undecided is a draw.
+    """
+    import numpy as np  # only the solver needs it, so probing servers start without it
+    layout = _Layout(codes)
+    per_side, strides, places = layout.per_side, layout.strides, layout.places
+    n = len(codes)
+    values = np.full(layout.size, -1, dtype=np.int32)
+    src, dst = array("i"), array("i")
+    external: Dict[int, int] = {}  # table byte of a capture result -> fixed node
+
+    board = Board()
+    board.locs = [NO_PIECE] * n
+    board.side_pieces = ([i for i, c in enumerate(codes) if not c & BLACK_FLAG],
+                         [i for i, c in enumerate(codes) if c & BLACK_FLAG])
+    squares, ids, locs = board.squares, board.ids, board.locs
+    for side in (RED, BLACK):
+        base, other_base = side * per_side, (side ^ 1) * per_side
+        board.turn = side
+        for offset, placement in enumerate(product(*layout.domains)):
+            index = base + offset
+            if len(set(placement)) < n:
+                values[index] = -3
+                continue
+            for i, sq in enumerate(placement):
+                squares[sq] = codes[i]
+                ids[sq] = i
+                locs[i] = sq
+            if in_check(board, side ^ 1):
+                values[index] = -3  # the side that just moved left its general attacked
+            else:
+                for move in legal_moves(board, side):
+                    frm, to = move >> 7, move & 127
+                    mover, captured = ids[frm], ids[to]
+                    src.append(index)
+                    if captured == NO_PIECE:
+                        dst.append(other_base + offset + (places[mover][to] - places[mover][frm]) * strides[mover])
+                        continue
+                    rest = [(codes[i], to if i == mover else placement[i]) for i in range(n) if i != captured]
+                    sub_codes = tuple(code for code, _ in rest)
+                    stored, sub_index, _ = _table_index(sub_codes, rest, side ^ 1)
+                    value = tables[stored][sub_index]
+                    dst.append(-1 - external.setdefault(value, len(external)))
+            for sq in placement:
+                squares[sq] = 0
+                ids[sq] = NO_PIECE
+
+    # Fixed nodes go after the positions; a draw is -2 so it never counts as decided
+    fixed = np.array([(value - 1 if value != DRAW else -2) for value in external], dtype=np.int32)
+    src_np = np.frombuffer(src, dtype=np.int32) if len(src) else np.zeros(0, dtype=np.int32)
+    dst_np = np.frombuffer(dst, dtype=np.int32) if len(dst) else np.zeros(0, dtype=np.int32)
+    dst_np = np.where(dst_np < 0, layout.size - 1 - dst_np, dst_np)
+    children = np.bincount(src_np, minlength=layout.size)
+    values[(values == -1) & (children == 0)] = 0
+    state = np.concatenate([values, fixed])
+
+    last_external = int(fixed.max()) if len(fixed) else 0
+    quiet = 0
+    distance = 0
+    while quiet < 2 or distance <= last_external + 1:
+        distance += 1
+        if distance > MAX_DISTANCE:
+            raise ValueError(f"{ending_name(codes)}: distance to mate exceeds {MAX_DISTANCE} plies")
+        child = state[dst_np]
+        if distance % 2:
+            reached = np.zeros(layout.size, dtype=bool)
+            reached[src_np[child == distance - 1]] = True
+        else:
+            wins = np.bincount(src_np[(child >= 0) & (child % 2 == 1) & (child < distance)], minlength=layout.size)
+            reached = wins == children
+        new = reached & (state[:layout.size] == -1)
+        state[:layout.size][new] = distance
+        quiet = 0 if new.any() else quiet + 1
+
+    values = state[:layout.size]
+    table = np.where(values >= 0, values + 1, DRAW)
+    table[values == -3] = INVALID
+    return table.astype(np.uint8).tobytes()
+
+
+def sub_endings(codes: Ending) -> List[Ending]:
+    """Stored endings reachable by capturing one non-general piece"""
+    found = []
+    for i, code in enumerate(codes):
+        if code & TYPE_MASK != GENERAL:
+            stored, _ = canonical(codes[:i] + codes[i + 1:])
+            if stored not in found:
+                found.append(stored)
+    return found
+
+
+def build(names: Iterable[str], directory: str) -> List[str]:
+    """Solve the named endings, and the smaller ones they depend on, into `directory`.
+
+    Returns the names written. Tables already present in the directory are
+    loaded instead of being solved again.
+    """
+    os.makedirs(directory, exist_ok=True)
+    tables: Dict[Ending, bytes] = {}
+    written = []
+
+    def ensure(codes: Ending) -> None:
+        if codes in tables:
+            return
+        for sub in sub_endings(codes):
+            ensure(sub)
+        name = ending_name(codes)
+        path = os.path.join(directory, name + TB_SUFFIX)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                tables[codes] = _read_table(f.read(), path)[1]
+            return
+        logger.info("Solving %s", name)
+        tables[codes] = solve(codes, tables)
+        write_table(path, codes, tables[codes])
+        written.append(name)
+
+    for name in names:
+        ensure(canonical(parse_ending(name))[0])
+    return written
+
+
+def write_table(path: str, codes: Ending, values: bytes) -> None:
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(TB_MAGIC, TB_VERSION, len(values), ending_name(codes).encode()))
+        f.write(values)
+
+
+def _read_table(data, path: str) -> Tuple[Ending, memoryview]:
+    if len(data) < _HEADER.size:
+        raise ValueError(f"{path} is not a version {TB_VERSION} tablebase file")
+    magic, version, count, name = _HEADER.unpack_from(data, 0)
+    if magic != TB_MAGIC or version != TB_VERSION:
+        raise ValueError(f"{path} is not a version {TB_VERSION} tablebase file")
+    codes = parse_ending(name.rstrip(b"\0").decode())
+    if count != _Layout(codes).size or _HEADER.size + count > len(data):
+        raise ValueError(f"{path} is truncated or has the wrong size")
+    return codes, memoryview(data)[_HEADER.size:_HEADER.size + count]
+
+
+class Tablebase:
+    """Read-only endgame tables from a directory of .xqtb files, each mapped with mmap.
+
+    A probe finds the table by the board's material and reads one byte at
+    the position's index, so its cost does not depend on the table size.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._maps: List[mmap.mmap] = []
+        self._tables: Dict[Ending, memoryview] = {}
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith(TB_SUFFIX):
+                continue
+            path = os.path.join(directory, filename)
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                codes, values = _read_table(mapped, path)
+            except ValueError:
+                mapped.close()
+                raise
+            self._maps.append(mapped)
+            self._tables[codes] = values
+        self.max_pieces = max((len(codes) for codes in self._tables), default=0)
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+    def endings(self) -> List[str]:
+        return sorted(ending_name(codes) for codes in self._tables)
+
+    def close(self) -> None:
+        for values in self._tables.values():
+            values.release()
+        self._tables.clear()
+        for mapped in self._maps:
+            mapped.close()
+        self._maps.clear()
+
+    def probe(self, board: Board) -> Optional[Tuple[int, int]]:
+        """(outcome, plies) for the side to move: outcome 1 win, 0 draw, -1 loss; None if not covered"""
+        locs = board.locs
+        if len(locs) - locs.count(NO_PIECE) > self.max_pieces:
+            return None
+        squares = board.squares
+        pieces = sorted((squares[sq], sq) for sq in locs if sq != NO_PIECE)
+        codes = tuple(code for code, _ in pieces)
+        stored, mirrored = canonical(codes)
+        values = self._tables.get(stored)
+        if values is None:
+            return None
+        value = values[_table_index(codes, pieces, board.turn)[1]]
+        if value == DRAW:
+            return 0, 0
+        if value == INVALID:
+            return None
+        plies = value - 1
+        return (1 if plies % 2 else -1), plies
+
+    def best_move(self, board: Board) -> Optional[int]:
+        """Packed move that wins fastest, holds the draw, or loses slowest; None if not covered"""
+        best, best_key = None, None
+        for move in generator_for(board).legal_moves(board, board.turn):
+            board.do_move(move)
+            result = self.probe(board)
+            board.undo_move()
+            if result is None:
+                return None
+            outcome, plies = result
+            # Rank by the opponent's outcome: their loss first (sooner is better),
+            # then draws, then their win (later is better)
+            key = (outcome, plies if outcome < 0 else -plies)
+            if best_key is None or key < best_key:
+                best, best_key = move, key
+        return best
+
+
+def open_tablebase(directory: Optional[str]) -> Optional[Tablebase]:
+    """Open the configured tables, or None if no directory is set or it cannot be used"""
+    if not directory:
+        return None
+    try:
+        tablebase = Tablebase(directory)
+    except (OSError, ValueError) as e:
+        logger.warning("Endgame tablebase disabled: %s", e)
+        return None
+    logger.info("Endgame tablebase: %s", ", ".join(tablebase.endings()) or "no tables")
+    return tablebase
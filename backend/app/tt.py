@@ -0,0 +1,100 @@
+from array import array
+from typing import Optional, Tuple
+
+# Bound types stored with each entry; 0 marks an empty slot
+EXACT, LOWER, UPPER = 1, 2, 3
+
+# One entry is a 64-bit key plus a 64-bit packed data word
+ENTRY_BYTES = 16
+
+# Data word layout (low to high): move 14 bits, score 20 bits, bound 2 bits, depth 8 bits, age 8 bits
+_SCORE_OFFSET = 1 << 19
+_MOVE_MASK = (1 << 14) - 1
+_SCORE_MASK = (1 << 20) - 1
+
+
+def _pack(depth: int, bound: int, score: int, move: Optional[int], age: int) -> int:
+    return ((move or 0) | ((score + _SCORE_OFFSET) << 14) | (bound << 34)
+            | (min(depth, 255) << 36) | ((age & 255) << 44))
+
+
+class TranspositionTable:
+    """Fixed-size two-tier transposition table.
+
+    Each bucket holds a depth-preferred slot (kept unless the new result is at
+    least as deep or the old one is from an earlier search) and an
+    always-replace slot. Memory use is capped at `size_mb` megabytes.
+    """
+
+    def __init__(self, size_mb: int = 16):
+        buckets = max(1, size_mb * 1024 * 1024 // (2 * ENTRY_BYTES))
+        buckets = 1 << (buckets.bit_length() - 1)  # power of two for mask indexing
+        self.mask = buckets - 1
+        self.keys = array("Q", bytes(16 * buckets))
+        self.data = array("Q", bytes(16 * buckets))
+        self.age = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.keys) * ENTRY_BYTES
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def new_search(self) -> None:
+        """Mark entries from previous searches as replaceable"""
+        self.age = (self.age + 1) & 255
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters"""
+        self.keys = array("Q", bytes(len(self.keys) * 8))
+        self.data = array("Q", bytes(len(self.data) * 8))
+        self.age = 0
+        self.hits = self.misses = self.stores = 0
+
+    def probe(self, key: int) -> Optional[Tuple[int, int, int, Optional[int]]]:
+        """Return (depth, bound, score, best_move) stored for a key, or None"""
+        i = (key & self.mask) << 1
+        keys = self.keys
+        for slot in (i, i + 1):
+            if keys[slot] == key:
+                data = self.data[slot]
+                bound = (data >> 34) & 3
+                if bound:
+                    self.hits += 1
+                    move = data & _MOVE_MASK
+                    return ((data >> 36) & 255, bound,
+                            ((data >> 14) & _SCORE_MASK) - _SCORE_OFFSET, move or None)
+        self.misses += 1
+        return None
+
+    def store(self, key: int, depth: int, bound: int, score: int, move: Optional[int]) -> None:
+        """Record a search result, replacing according to the two-tier policy"""
+        i = (key & self.mask) << 1
+        keys, data = self.keys, self.data
+        old = data[i]
+        if (keys[i] == key or not (old >> 34) & 3 or ((old >> 44) & 255) != self.age
+                or depth >= (old >> 36) & 255):
+            slot = i
+        else:
+            slot = i + 1
+        if move is None and keys[slot] == key:
+            move = data[slot] & _MOVE_MASK or None  # keep the known best move
+        keys[slot] = key
+        data[slot] = _pack(depth, bound, score, move, self.age)
+        self.stores += 1
+
+    def stats(self) -> dict:
+        """Counters for monitoring table efficiency"""
+        return {
+            "size_mb": self.size_bytes / (1024 * 1024),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": self.hit_rate,
+        }
@@ -0,0 +1,24 @@
+import random
+from typing import List
+
+# Fixed seed so keys (and anything persisted by key) are stable across runs
+ZOBRIST_SEED = 0x58_51_41_4E_47_51_49
+
+_rng = random.Random(ZOBRIST_SEED)
+
+# PIECE_KEYS[code][sq]: one 64-bit key per piece code (see app.board) and square
+PIECE_KEYS: List[List[int]] = [[_rng.getrandbits(64) for _ in range(90)] for _ in range(16)]
+for _sq in range(90):
+    PIECE_KEYS[0][_sq] = 0  # empty squares contribute nothing
+
+# XORed into the key when black is to move
+SIDE_KEY = _rng.getrandbits(64)
+
+
+def compute_hash(squares, turn: int) -> int:
+    """Full Zobrist key of a mailbox position; boards update it incrementally afterwards"""
+    key = SIDE_KEY if turn else 0
+    for sq, code in enumerate(squares):
+        if code:
+            key ^= PIECE_KEYS[code][sq]
+    return key
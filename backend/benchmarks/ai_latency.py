@@ -0,0 +1,69 @@
+"""Benchmark: AI turn latency and validator throughput with verbose vs default logging.
+
+The verbose run sends DEBUG output for every `app.*` module to /dev/null,
+which is what every call paid when the engine printed unconditionally.
+
+    python -m benchmarks.ai_latency [--depth N] [--turns N]
+"""
+import argparse
+import logging
+import os
+import time
+
+from app.game_logic import get_ai_move, is_valid_move, make_move
+from app.logging_config import configure_logging
+from app.models import GameState, Move
+from app.search import SearchLimits
+
+
+def ai_turns(turns: int, depth: int) -> float:
+    """Average seconds per AI turn (validate + apply + search + apply) over a self-play line"""
+    limits = SearchLimits(max_depth=depth, time_ms=None)
+    state = GameState.new_game()
+    start = time.perf_counter()
+    for _ in range(turns):
+        move = get_ai_move(state, limits)
+        if move is None or not is_valid_move(state, move):
+            break
+        state = make_move(state, move)
+        if state.game_over:
+            break
+    return (time.perf_counter() - start) / turns
+
+
+def validator_rate(rounds: int) -> float:
+    """is_valid_move calls per second probing every square for every piece"""
+    state = GameState.new_game()
+    probes = [Move(piece_id=i, to_x=x, to_y=y) for i in range(len(state.pieces)) for x in range(9) for y in range(10)]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for move in probes:
+            is_valid_move(state, move)
+    return rounds * len(probes) / (time.perf_counter() - start)
+
+
+def run(level: str, args) -> dict:
+    configure_logging(level=level, module_levels="")
+    handler = logging.getLogger("app").handlers[0]
+    handler.setStream(open(os.devnull, "w"))
+    return {"turn_seconds": ai_turns(args.turns, args.depth), "validations_per_second": validator_rate(args.rounds)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    verbose = run("DEBUG", args)
+    default = run("INFO", args)
+    for name, result in (("verbose (DEBUG)", verbose), ("default (INFO)", default)):
+        print(f"{name:16} AI turn {result['turn_seconds'] * 1000:8.1f} ms   "
+              f"validator {result['validations_per_second']:12,.0f} calls/s")
+    print(f"speedup: AI turn {verbose['turn_seconds'] / default['turn_seconds']:.2f}x, "
+          f"validator {default['validations_per_second'] / verbose['validations_per_second']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Engine benchmark suite: perft counts, move generation, validation and AI time-to-move.
+
+Runs over the positions in benchmarks/positions.fen and prints the results as
+JSON. With --baseline, compares against an earlier run and exits with status 1
+when a perft count differs or a speed metric regresses beyond --threshold.
+
+Run from the backend directory:
+
+    python -m benchmarks.engine --output bench.json
+    python -m benchmarks.engine --baseline bench.json --threshold 0.15
+    python -m benchmarks.engine --backend bitboard --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from app import config
+from app.board import board_class
+from app.fen import from_fen
+from app.game_logic import get_ai_move, is_valid_move
+from app.models import GameState, Move
+from app.movegen import perft, pseudo_moves
+from app.search import SearchLimits
+
+POSITIONS_FILE = os.path.join(os.path.dirname(__file__), "positions.fen")
+
+# Metrics where a larger value is better; everything else timed is "lower is better"
+RATE_METRICS = ("perft_nps", "movegen_per_second", "validations_per_second")
+TIME_METRICS = ("ai_ms",)
+
+
+def load_positions(path: str = POSITIONS_FILE) -> List[Tuple[str, str, str]]:
+    """(phase, name, fen) for every non-comment line of a positions file"""
+    positions = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            phase, name, fen = line.split(None, 2)
+            positions.append((phase, name, fen))
+    return positions
+
+
+def timed(fn, min_seconds: float) -> Tuple[int, float]:
+    """Call fn() (which returns a work count) until min_seconds have passed"""
+    count = 0
+    start = time.perf_counter()
+    while True:
+        count += fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return count, elapsed
+
+
+def bench_position(state: GameState, perft_depth: int, ai_depth: int, min_seconds: float) -> Dict:
+    board = board_class().from_state(state)
+    result: Dict = {"perft": {}}
+
+    perft_nodes = 0
+    start = time.perf_counter()
+    for depth in range(1, perft_depth + 1):
+        nodes = perft(board, depth)
+        result["perft"][str(depth)] = nodes
+        perft_nodes += nodes
+    result["perft_nps"] = perft_nodes / (time.perf_counter() - start)
+
+    def movegen():
+        return len(pseudo_moves(board, board.turn))
+    count, elapsed = timed(movegen, min_seconds)
+    result["movegen_per_second"] = count / elapsed
+
+    probes = [Move(piece_id=i, to_x=x, to_y=y)
+              for i in range(len(state.pieces)) for y in range(10) for x in range(9)]
+
+    def validate():
+        for move in probes:
+            is_valid_move(state, move)
+        return len(probes)
+    count, elapsed = timed(validate, min_seconds)
+    result["validations_per_second"] = count / elapsed
+
+    # Best of a few runs: a single search is short enough to be noisy
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        get_ai_move(state, SearchLimits(max_depth=ai_depth, time_ms=None))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    result["ai_ms"] = best * 1000
+    return result
+
+
+def run(positions: List[Tuple[str, str, str]], perft_depth: int, ai_depth: int, min_seconds: float) -> Dict:
+    report = {
+        "python": platform.python_version(),
+        "backend": config.BOARD_BACKEND,
+        "perft_depth": perft_depth,
+        "ai_depth": ai_depth,
+        "positions": {},
+    }
+    for phase, name, fen in positions:
+        entry = {"phase": phase, "fen": fen}
+        entry.update(bench_position(from_fen(fen), perft_depth, ai_depth, min_seconds))
+        report["positions"][name] = entry
+        print(f"{name:22} perft {entry['perft']}  ai {entry['ai_ms']:.0f} ms", file=sys.stderr)
+    return report
+
+
+def compare(report: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Human-readable regressions of report against baseline (empty if none)"""
+    problems = []
+    for name, entry in report["positions"].items():
+        base = baseline.get("positions", {}).get(name)
+        if base is None:
+            continue
+        for depth, nodes in entry["perft"].items():
+            expected = base["perft"].get(depth)
+            if expected is not None and expected != nodes:
+                problems.append(f"{name}: perft({depth}) = {nodes}, baseline {expected}")
+        for metric in RATE_METRICS:
+            if entry[metric] < base[metric] * (1 - threshold):
+                problems.append(f"{name}: {metric} {entry[metric]:,.0f} < baseline {base[metric]:,.0f}")
+        for metric in TIME_METRICS:
+            if entry[metric] > base[metric] * (1 + threshold):
+                problems.append(f"{name}: {metric} {entry[metric]:,.1f} > baseline {base[metric]:,.1f}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--positions", default=POSITIONS_FILE, help="FEN position file")
+    parser.add_argument("--perft-depth", type=int, default=4)
+    parser.add_argument("--ai-depth", type=int, default=4)
+    parser.add_argument("--min-seconds", type=float, default=0.2, help="minimum time per throughput measurement")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="JSON report of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative slowdown")
+    parser.add_argument("--backend", choices=("mailbox", "bitboard"), default=config.BOARD_BACKEND,
+                        help="board representation (default: BOARD_BACKEND)")
+    args = parser.parse_args()
+    config.BOARD_BACKEND = args.backend
+
+    report = run(load_positions(args.positions), args.perft_depth, args.ai_depth, args.min_seconds)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(report, json.load(f), args.threshold)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark: scalar vs vectorized position evaluation.
+
+Run from the backend directory:
+
+    python -m benchmarks.evaluation [--positions N] [--rounds N]
+"""
+import argparse
+import time
+
+from app.board import board_of
+from app.evaluation import evaluate_batch, evaluate_moves
+from app.game_logic import evaluate_move
+from app.movegen import generate_moves, pseudo_moves
+from app.search import evaluate
+from benchmarks.make_unmake import sample_positions
+
+
+def rate(fn, rounds: int) -> float:
+    """Evaluations per second of fn(), which returns how many it did"""
+    count = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        count += fn()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--positions", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    positions = sample_positions(args.positions)
+    api_work = [(state, generate_moves(state)) for state in positions]
+    boards = [board_of(state) for state in positions]
+    work = [(board, pseudo_moves(board, board.turn)) for board in boards]
+
+    def per_move_api():
+        for state, moves in api_work:
+            for move in moves:
+                evaluate_move(state, move)
+        return sum(len(moves) for _, moves in api_work)
+
+    def do_undo_scalar():
+        for board, moves in work:
+            for move in moves:
+                board.do_move(move)
+                evaluate(board)
+                board.undo_move()
+        return sum(len(moves) for _, moves in work)
+
+    def batched_moves():
+        for board, moves in work:
+            evaluate_moves(board, moves)
+        return sum(len(moves) for _, moves in work)
+
+    def batched_positions():
+        evaluate_batch(boards)
+        return len(boards)
+
+    rounds = args.rounds
+    results = [
+        ("evaluate_move, one move per call", rate(per_move_api, max(1, rounds // 10))),
+        ("do_move + evaluate + undo_move", rate(do_undo_scalar, rounds)),
+        ("evaluate_moves, batch per position", rate(batched_moves, rounds * 5)),
+        ("evaluate_batch, positions", rate(batched_positions, rounds * 50)),
+    ]
+    for name, evals in results:
+        print(f"{name:36} {evals:14,.0f} evals/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Microbenchmark: in-place Board.do_move/undo_move vs the immutable make_move.
+
+Run from the backend directory:
+
+    python -m benchmarks.make_unmake [--rounds N]
+"""
+import argparse
+import contextlib
+import io
+import random
+import time
+
+from app.board import board_of
+from app.game_logic import make_move
+from app.models import GameState
+from app.movegen import generate_moves, pseudo_moves
+
+
+def sample_positions(count: int, seed: int = 1):
+    """Positions reached by short random playouts from the opening"""
+    rng = random.Random(seed)
+    positions = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(count):
+            state = GameState.new_game()
+            for _ in range(rng.randrange(0, 30)):
+                moves = generate_moves(state)
+                if state.game_over or not moves:
+                    break
+                state = make_move(state, rng.choice(moves))
+            positions.append(state)
+    return positions
+
+
+def bench_make_move(positions, rounds: int) -> float:
+    """make_move calls per second (stdout discarded)"""
+    work = [(state, generate_moves(state)) for state in positions]
+    calls = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for state, moves in work:
+                for move in moves:
+                    make_move(state, move)
+                calls += len(moves)
+        elapsed = time.perf_counter() - start
+    return calls / elapsed
+
+
+def bench_do_undo(positions, rounds: int) -> float:
+    """do_move + undo_move pairs per second"""
+    work = []
+    for state in positions:
+        board = board_of(state).copy()
+        work.append((board, pseudo_moves(board, board.turn)))
+    calls = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for board, moves in work:
+            do_move, undo_move = board.do_move, board.undo_move
+            for move in moves:
+                do_move(move)
+                undo_move()
+            calls += len(moves)
+    elapsed = time.perf_counter() - start
+    return calls / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--positions", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    positions = sample_positions(args.positions)
+    make_rate = bench_make_move(positions, max(1, args.rounds // 10))
+    do_undo_rate = bench_do_undo(positions, args.rounds)
+    print(f"make_move:         {make_rate:12,.0f} moves/s")
+    print(f"do_move/undo_move: {do_undo_rate:12,.0f} moves/s ({do_undo_rate / make_rate:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
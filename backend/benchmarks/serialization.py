@@ -0,0 +1,46 @@
+"""Benchmark: full pydantic JSON vs compact FEN encoding of game states.
+
+Run from the backend directory:
+
+    python -m benchmarks.serialization [--rounds N]
+"""
+import argparse
+import time
+
+from app.fen import dump_state, load_state
+from app.models import GameState
+from benchmarks.make_unmake import sample_positions
+
+
+def rate(fn, states, rounds: int) -> float:
+    """Calls of fn per second over all states"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for state in states:
+            fn(state)
+    return rounds * len(states) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--positions", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=40)
+    args = parser.parse_args()
+
+    states = sample_positions(args.positions)
+    as_json = [state.model_dump_json() for state in states]
+    as_fen = [dump_state(state) for state in states]
+
+    rows = [
+        ("bytes per state", sum(map(len, as_json)) / len(states), sum(map(len, as_fen)) / len(states)),
+        ("encodes/s", rate(GameState.model_dump_json, states, args.rounds), rate(dump_state, states, args.rounds)),
+        ("decodes/s", rate(GameState.model_validate_json, as_json, args.rounds), rate(load_state, as_fen, args.rounds)),
+    ]
+    print(f"{'':16} {'json':>12} {'fen':>12}")
+    for name, full, compact in rows:
+        print(f"{name:16} {full:12,.0f} {compact:12,.0f}  ({full / compact:.1f}x)" if name.startswith("bytes")
+              else f"{name:16} {full:12,.0f} {compact:12,.0f}  ({compact / full:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
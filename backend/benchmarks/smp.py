@@ -0,0 +1,68 @@
+"""Benchmark: Lazy SMP time-to-depth as the number of search processes grows.
+
+Each position of benchmarks/positions.fen is searched to a fixed depth with
+1, 2, 4, ... processes (up to the CPU count), starting from an empty shared
+table every time. Speedup is the single-process time divided by the time with
+N processes; it can only grow while there are idle cores.
+
+Run from the backend directory:
+
+    python -m benchmarks.smp [--depth 5] [--threads 1,2,4,8]
+"""
+import argparse
+import os
+import time
+from typing import List
+
+from app.board import Board
+from app.fen import from_fen
+from app.search import SearchLimits
+from app.smp import LazySMP
+from benchmarks.engine import load_positions
+
+
+def default_threads() -> List[int]:
+    counts, n = [], 1
+    while n <= (os.cpu_count() or 1):
+        counts.append(n)
+        n *= 2
+    return counts
+
+
+def time_to_depth(smp: LazySMP, boards: List[Board], depth: int):
+    """(seconds, nodes) to search every board to `depth` from a cold table"""
+    elapsed = nodes = 0
+    for board in boards:
+        smp.tt.clear()
+        start = time.perf_counter()
+        result = smp.search(board, SearchLimits(max_depth=depth, time_ms=None))
+        elapsed += time.perf_counter() - start
+        nodes += result.nodes
+    return elapsed, nodes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--threads", default=",".join(map(str, default_threads())),
+                        help="comma-separated process counts")
+    parser.add_argument("--tt-mb", type=int, default=16)
+    args = parser.parse_args()
+
+    boards = [Board.from_state(from_fen(fen)) for _, _, fen in load_positions()]
+    print(f"{len(boards)} positions to depth {args.depth} on {os.cpu_count()} CPUs")
+    print(f"{'threads':>7} {'seconds':>9} {'speedup':>8} {'nodes':>10}")
+    base = None
+    for threads in (int(t) for t in args.threads.split(",")):
+        smp = LazySMP(threads, args.tt_mb)
+        try:
+            smp.search(boards[0], SearchLimits(max_depth=1, time_ms=None))  # start the helpers
+            elapsed, nodes = time_to_depth(smp, boards, args.depth)
+        finally:
+            smp.close()
+        base = base or elapsed
+        print(f"{threads:7} {elapsed:9.2f} {base / elapsed:7.2f}x {nodes:10,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark: server cold start, from `import app.main` to the first /healthz response.
+
+Every run is a fresh interpreter that imports app.main, serves it with
+uvicorn on a free port and polls /healthz. The first AI move is timed
+separately, since engine workers are only spawned by the first AI request.
+Runs alternate between building the engine tables on import and mapping
+the snapshot written by tools.build_tables.
+
+Run from the backend directory:
+
+    python -m benchmarks.startup [--runs 5] [--backend bitboard]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from app.bitboard import snapshot_tables
+from app.snapshot import write_snapshot
+
+# Executed in each child process; prints the phase timings as JSON
+_CHILD = r"""
+import json, socket, threading, time
+import http.client
+import uvicorn
+
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+sock = socket.socket()
+sock.bind(("127.0.0.1", 0))
+port = sock.getsockname()[1]
+server = uvicorn.Server(uvicorn.Config(app.main.app, log_level="warning"))
+threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True).start()
+
+
+def request(method, path, body=None):
+    while True:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port)
+            conn.request(method, path, body=body and json.dumps(body),
+                         headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            return response.status, json.loads(response.read() or "null")
+        except ConnectionError:
+            time.sleep(0.001)
+
+
+request("GET", "/healthz")
+healthy = time.perf_counter()
+status, game = request("POST", "/api/games")
+status, moves = request("GET", f"/api/games/{game['game_id']}/legal-moves")
+before_move = time.perf_counter()
+request("POST", f"/api/games/{game['game_id']}/move", moves[0])
+moved = time.perf_counter()
+server.should_exit = True
+print(json.dumps({"import_ms": (imported - start) * 1000, "healthz_ms": (healthy - start) * 1000,
+                  "first_ai_move_ms": (moved - before_move) * 1000}))
+"""
+
+
+def cold_start(env: dict) -> dict:
+    output = subprocess.run([sys.executable, "-W", "ignore", "-c", _CHILD], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--backend", default="mailbox", choices=("mailbox", "bitboard"))
+    parser.add_argument("--depth", type=int, default=3, help="AI depth for the first move")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = os.path.join(tmp, "engine_tables.bin")
+        write_snapshot(snapshot, snapshot_tables())
+        env = dict(os.environ, PYTHONPATH=os.getcwd(), BOARD_BACKEND=args.backend, AI_MAX_DEPTH=str(args.depth),
+                   AI_TIME_LIMIT_MS="0", GAME_DB_PATH=os.path.join(tmp, "games.sqlite3"))
+        results = {"built": [], "snapshot": []}
+        for _ in range(args.runs):
+            results["built"].append(cold_start(dict(env, TABLE_SNAPSHOT="")))
+            results["snapshot"].append(cold_start(dict(env, TABLE_SNAPSHOT=snapshot)))
+
+    print(f"{args.backend} board, median of {args.runs} cold starts")
+    print(f"{'tables':>10} {'import ms':>10} {'healthz ms':>11} {'first AI move ms':>17}")
+    for name, runs in results.items():
+        median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        print(f"{name:>10} {median['import_ms']:10.0f} {median['healthz_ms']:11.0f} {median['first_ai_move_ms']:17.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# Keep API tests fast and away from the working directory's database
+os.environ.setdefault("GAME_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="xiangqi-test-"), "games.sqlite3"))
+os.environ.setdefault("AI_MAX_DEPTH", "2")
+os.environ.setdefault("AI_TIME_LIMIT_MS", "200")
+os.environ.setdefault("ENGINE_WORKERS", "1")
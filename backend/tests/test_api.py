@@ -0,0 +1,197 @@
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import analysis_limits, app, engine
+from app.models import AnalysisRequest
+from app import config
+
+
+def test_games_are_independent():
+    with TestClient(app) as client:
+        first = client.post("/api/games").json()
+        second = client.post("/api/games").json()
+        assert first["game_id"] != second["game_id"]
+
+        reply = client.post(f"/api/games/{first['game_id']}/move", json={"piece_id": 21, "to_x": 4, "to_y": 7})
+        assert reply.status_code == 200
+        assert reply.json()["current_turn"] == "red"
+
+        untouched = client.get(f"/api/games/{second['game_id']}").json()
+        assert untouched == second["state"]
+        assert len(client.get(f"/api/games/{second['game_id']}/legal-moves").json()) == 44
+
+
+def test_invalid_moves_and_unknown_games():
+    with TestClient(app) as client:
+        game_id = client.post("/api/games").json()["game_id"]
+        assert client.post(f"/api/games/{game_id}/move", json={"piece_id": 27, "to_x": 4, "to_y": 5}).status_code == 400
+        assert client.get("/api/games/missing").status_code == 404
+        assert client.delete(f"/api/games/{game_id}").status_code == 200
+        assert client.get(f"/api/games/{game_id}").status_code == 404
+
+
+def test_legacy_routes_use_default_game():
+    with TestClient(app) as client:
+        state = client.post("/api/new-game").json()
+        assert client.get("/api/game-state").json() == state
+        assert client.post("/api/move", json={"piece_id": 21, "to_x": 4, "to_y": 7}).status_code == 200
+
+
+def test_submit_move_then_poll_for_ai_reply():
+    with TestClient(app) as client:
+        assert client.get("/healthz").json() == {"status": "ok"}
+        assert engine._executor is None  # the workers start with the first AI request
+        game_id = client.post("/api/games").json()["game_id"]
+        state = client.post(f"/api/games/{game_id}/move?wait=false", json={"piece_id": 21, "to_x": 4, "to_y": 7}).json()
+        assert state["current_turn"] == "black"
+        assert client.get("/healthz").json() == {"status": "ok"}
+
+        deadline = time.monotonic() + 30
+        while (reply := client.get(f"/api/games/{game_id}/ai-move").json())["status"] == "thinking":
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        assert reply["status"] == "ready"
+        assert reply["state"]["current_turn"] == "red"
+
+
+def test_resign_ends_game():
+    with TestClient(app) as client:
+        game_id = client.post("/api/games").json()["game_id"]
+        state = client.post(f"/api/games/{game_id}/resign").json()
+        assert state["game_over"] and state["winner"] == "black"
+        assert client.post(f"/api/games/{game_id}/move", json={"piece_id": 21, "to_x": 4, "to_y": 7}).status_code == 400
+
+
+def test_compact_format_returns_fen_and_last_move():
+    with TestClient(app) as client:
+        created = client.post("/api/games?format=compact").json()
+        assert created["state"]["fen"].startswith("rnbakabnr/9/1c5c1/")
+        assert created["state"]["last_move"] is None
+        game_id = created["game_id"]
+
+        headers = {"Accept": "application/vnd.xiangqi.compact+json"}
+        state = client.post(f"/api/games/{game_id}/move?wait=false", json={"piece_id": 21, "to_x": 4, "to_y": 7},
+                            headers=headers).json()
+        assert state["fen"] == "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/4C2C1/9/RNBAKABNR b"
+        assert state["last_move"] == {"piece_id": 21, "from": [1, 7], "to": [4, 7], "captured": None}
+        assert "pieces" in client.get(f"/api/games/{game_id}").json()
+
+
+def test_move_map_with_etag():
+    with TestClient(app) as client:
+        game_id = client.post("/api/games").json()["game_id"]
+        first = client.get(f"/api/games/{game_id}/move-map")
+        assert first.status_code == 200
+        body = first.json()
+        assert body["turn"] == "red"
+        assert sum(len(targets) for targets in body["moves"].values()) == 44
+        assert [4, 7] in body["moves"]["21"]
+
+        etag = first.headers["ETag"]
+        unchanged = client.get(f"/api/games/{game_id}/move-map", headers={"If-None-Match": etag})
+        assert unchanged.status_code == 304
+        assert unchanged.headers["ETag"] == etag
+
+        client.post(f"/api/games/{game_id}/move", json={"piece_id": 21, "to_x": 4, "to_y": 7})
+        after = client.get(f"/api/games/{game_id}/move-map", headers={"If-None-Match": etag})
+        assert after.status_code == 200
+        assert after.headers["ETag"] != etag
+
+
+def test_websocket_streams_ack_progress_and_ai_move():
+    with TestClient(app) as client:
+        game_id = client.post("/api/games").json()["game_id"]
+        with client.websocket_connect(f"/api/games/{game_id}/ws?format=compact") as ws:
+            assert ws.receive_json()["state"]["fen"].endswith(" w")
+
+            ws.send_json({"type": "move", "piece_id": 27, "to_x": 4, "to_y": 5})
+            assert ws.receive_json() == {"type": "error", "detail": "Invalid move"}
+
+            ws.send_json({"type": "move", "piece_id": 21, "to_x": 4, "to_y": 7})
+            ack = ws.receive_json()
+            assert ack["type"] == "ack" and ack["turn"] == "black"
+            assert ack["move"] == {"piece_id": 21, "from": [1, 7], "to": [4, 7], "captured": None}
+
+            messages = []
+            while not messages or messages[-1]["type"] == "progress":
+                messages.append(ws.receive_json())
+            assert messages[-1]["type"] == "ai_move" and messages[-1]["turn"] == "red"
+            for progress in messages[:-1]:
+                assert progress["depth"] >= 1 and progress["nodes"] > 0
+        assert client.get(f"/api/games/{game_id}").json()["current_turn"] == "red"
+
+
+def test_websocket_for_unknown_game():
+    with TestClient(app) as client:
+        with client.websocket_connect("/api/games/missing/ws") as ws:
+            assert ws.receive_json()["type"] == "error"
+
+
+def test_history_pages_and_undo():
+    with TestClient(app) as client:
+        game_id = client.post("/api/games").json()["game_id"]
+        start = client.get(f"/api/games/{game_id}").json()
+        after_first = client.post(f"/api/games/{game_id}/move", json={"piece_id": 21, "to_x": 4, "to_y": 7}).json()
+        second = client.get(f"/api/games/{game_id}/legal-moves").json()[0]
+        assert client.post(f"/api/games/{game_id}/move", json=second).status_code == 200
+
+        history = client.get(f"/api/games/{game_id}/history").json()
+        assert history["total"] == 4 and history["repetitions"] == 1
+        # The central cannon attacks the middle soldier, which has not crossed the river: no chase
+        assert history["moves"][0] == {"ply": 1, "move": "b2e2", "from": [1, 7], "to": [4, 7],
+                                       "hash": history["moves"][0]["hash"], "check": False, "chase": False}
+        page = client.get(f"/api/games/{game_id}/history?offset=3&limit=10").json()
+        assert [m["ply"] for m in page["moves"]] == [4]
+
+        assert client.post(f"/api/games/{game_id}/undo").json() == after_first
+        assert client.get(f"/api/games/{game_id}/history").json()["total"] == 2
+        assert client.post(f"/api/games/{game_id}/undo?plies=3").status_code == 400
+        assert client.post(f"/api/games/{game_id}/undo").json() == start
+        assert client.post("/api/new-game").status_code == 200
+        assert client.get("/api/history").json()["total"] == 0
+
+
+def test_analyze_single_position_and_streamed_batch():
+    start = "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w"
+    with TestClient(app) as client:
+        single = client.post("/api/analyze", json={"position": start, "depth": 2, "multipv": 2}).json()
+        assert single["fen"] == start
+        assert len(single["lines"]) == 2 and single["lines"][0]["move"] != single["lines"][1]["move"]
+        assert single["lines"][0]["pv"][0] == single["lines"][0]["move"]
+
+        state = client.post("/api/games").json()["state"]
+        batch = client.post("/api/analyze", json={"positions": [start, "bad fen", state], "depth": 1})
+        assert batch.headers["content-type"] == "application/x-ndjson"
+        results = sorted((json.loads(line) for line in batch.text.splitlines()), key=lambda r: r["index"])
+        assert [r["index"] for r in results] == [0, 1, 2]
+        assert "error" in results[1]
+        assert results[2]["fen"] == start and len(results[0]["lines"]) == 1
+        assert results[0]["lines"][0]["move"] == results[2]["lines"][0]["move"]
+
+        assert client.post("/api/analyze", json={"position": "bad fen"}).status_code == 400
+        for fen in ("9/9/9/9/9/9/9/9/9/4K4 w", "4k4/9/9/9/9/9/9/9/9/9 w"):
+            assert client.post("/api/analyze", json={"position": fen}).status_code == 400
+        generalless = {"pieces": [p for p in state["pieces"] if p["type"] != "general"], "current_turn": "red"}
+        assert client.post("/api/analyze", json={"position": generalless}).status_code == 400
+        # The side not to move in check, by a chariot or by facing generals
+        for fen in ("4k4/9/9/9/9/9/9/9/4R4/3K5 w", "4k4/9/9/9/9/9/9/9/9/4K4 w"):
+            assert client.post("/api/analyze", json={"position": fen}).status_code == 400
+        stacked = dict(state, pieces=state["pieces"][:-1] + [dict(state["pieces"][-1], x=0, y=9)])
+        assert client.post("/api/analyze", json={"position": stacked}).status_code == 400
+        mated = client.post("/api/analyze", json={"position": "3k5/9/4r4/9/9/9/9/9/3r1r3/4K4 w"}).json()
+        assert mated["lines"] == [] and mated["result"] == "checkmate"
+        stalemated = client.post("/api/analyze", json={"position": "3k5/9/9/9/9/9/9/9/3r1r3/4K4 w"}).json()
+        assert stalemated["result"] == "stalemate"
+        assert client.post("/api/analyze", json={"depth": 2}).status_code == 400
+
+
+def test_analysis_limits_are_bounded():
+    limits = analysis_limits(AnalysisRequest(position="x", depth=64))
+    assert limits.max_depth == config.ANALYSIS_MAX_DEPTH
+    assert limits.time_ms == config.ANALYSIS_TIME_LIMIT_MS and limits.nodes is None
+    limits = analysis_limits(AnalysisRequest(position="x", time_ms=10 ** 9, nodes=10 ** 12))
+    assert limits.time_ms == config.ANALYSIS_MAX_TIME_MS and limits.nodes == config.ANALYSIS_MAX_NODES
+    limits = analysis_limits(AnalysisRequest(position="x", nodes=1000))
+    assert limits.time_ms is None and limits.nodes == 1000
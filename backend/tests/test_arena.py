@@ -0,0 +1,64 @@
+import math
+
+import pytest
+
+from app import evaluation
+from app.board import CHARIOT, board_of
+from app.evaluation import DEFAULT_MATERIAL, make_weights, score_squares
+from app.fen import from_fen
+from app.search import SearchLimits, Searcher, search
+from tools.arena import (
+    BLACK_WINS, DRAWN, RED_WINS, MatchStats, parse_engine, play_game, schedule,
+)
+
+
+def test_parse_engine():
+    engine = parse_engine("strong:depth=3,time_ms=none,chariot=120")
+    assert (engine.name, engine.max_depth, engine.time_ms, engine.material) == ("strong", 3, None, {CHARIOT: 120})
+    assert engine.material_values()[CHARIOT] == 120
+    assert engine.limits(clock_ms=0.4).time_ms == 1
+    for bad in (":depth=3", "x:depth", "x:speed=3"):
+        with pytest.raises(ValueError):
+            parse_engine(bad)
+
+
+def test_weights_are_passed_explicitly():
+    weights = make_weights([v + 10 if code == CHARIOT else v for code, v in enumerate(DEFAULT_MATERIAL)])
+    board = board_of(from_fen("4k4/9/9/9/9/9/9/9/9/R3K4 w"))
+    default_score = board.score
+    assert score_squares(board.squares, weights.piece_square) == default_score + 10
+    limits = SearchLimits(max_depth=1, time_ms=None)
+    assert search(board, limits, weights=weights).score == search(board, limits).score + 10
+    assert board.score == default_score and board.piece_square is evaluation.PIECE_SQUARE
+    assert Searcher(weights=weights).piece_values[CHARIOT] == DEFAULT_MATERIAL[CHARIOT] + 10
+    assert evaluation.MATERIAL.tolist() == list(DEFAULT_MATERIAL)
+    board.set_weights(weights.piece_square)
+    board.do_move(9 * 9 << 7 | 7 * 9)  # the chariot up two ranks, scored with the new table
+    assert board.score == score_squares(board.squares, weights.piece_square)
+
+
+def test_match_stats():
+    even = MatchStats(wins=10, draws=10, losses=10)
+    assert even.elo()[0] == pytest.approx(0)
+    assert even.sprt(0, 10) == ""
+    strong = MatchStats(wins=300, draws=400, losses=200)
+    elo, margin = strong.elo()
+    assert elo == pytest.approx(38.8, abs=0.1) and 0 < margin < elo
+    assert strong.sprt(0, 10) == "H1"
+    assert MatchStats(wins=200, draws=400, losses=300).sprt(0, 10) == "H0"
+    assert MatchStats(wins=3).elo() == (math.inf, math.inf)
+
+
+def test_schedule_pairs_openings_and_colours():
+    engines = [parse_engine("base"), parse_engine("new")]
+    jobs = list(schedule(engines, 4, 2, 7, 100, None))
+    assert [(red["name"], black["name"], seed) for red, black, _, seed, _, _ in jobs] == [
+        ("new", "base", 7), ("base", "new", 7), ("new", "base", 8), ("base", "new", 8)]
+
+
+def test_play_game_record():
+    record = play_game(parse_engine("a:depth=1"), parse_engine("b:depth=1,soldier=30"), max_plies=8, seed=3)
+    assert record["result"] in (RED_WINS, BLACK_WINS, DRAWN)
+    assert record["plies"] == len(record["moves"].split()) <= 8
+    assert record["reason"] in ("mate", "repetition", "move_limit")
+    assert evaluation.MATERIAL.tolist() == list(DEFAULT_MATERIAL)
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from app import board as board_module
+from app import bitboard, movegen
+from app.bitboard import BitBoard
+from app.board import Board
+from app.fen import START_FEN, from_fen, to_fen
+from app.game_logic import get_ai_move, make_move
+from app.models import GameState, Move
+from app.search import SearchLimits
+
+
+def same_bitboards(a: BitBoard, b: BitBoard) -> bool:
+    return (a.bb, a.occ, a.occ_t, a.side_occ) == (b.bb, b.occ, b.occ_t, b.side_occ)
+
+
+def test_random_games_match_mailbox_rules():
+    rng = random.Random(7)
+    for _ in range(25):
+        state = GameState.new_game()
+        mailbox, bits = Board.from_state(state), BitBoard.from_state(state)
+        for _ in range(120):
+            side = mailbox.turn
+            assert sorted(bitboard.pseudo_moves(bits, side)) == sorted(movegen.pseudo_moves(mailbox, side))
+            legal = movegen.legal_moves(mailbox, side)
+            assert sorted(bitboard.legal_moves(bits, side)) == sorted(legal)
+            assert bitboard.in_check(bits, side) == movegen.in_check(mailbox, side)
+            if not legal:
+                break
+            move = rng.choice(legal)
+            mailbox.do_move(move)
+            bits.do_move(move)
+        assert bits.squares == mailbox.squares and bits.hash == mailbox.hash
+        while bits.undo_stack:
+            bits.undo_move()
+        assert same_bitboards(bits, BitBoard.from_state(state))
+
+
+@pytest.mark.parametrize("fen", [
+    START_FEN,
+    "r1bakab1r/9/1cn4cn/p1p1p1p1p/9/2P6/P3P1P1P/1C2C1N2/9/RNBAKAB1R b",
+    "3k5/1R6R/9/9/9/9/9/9/9/4K4 w",
+])
+def test_perft_matches_mailbox(fen):
+    state = from_fen(fen)
+    assert movegen.perft(BitBoard.from_state(state), 3) == movegen.perft(Board.from_state(state), 3)
+
+
+def test_backend_selected_by_config(monkeypatch):
+    monkeypatch.setattr("app.config.BOARD_BACKEND", "bitboard")
+    monkeypatch.setattr(board_module, "_board_class", None)
+    state = GameState.new_game()
+    assert type(board_module.board_of(state)) is BitBoard
+    after = make_move(state, Move(piece_id=21, to_x=4, to_y=7))
+    assert isinstance(board_module.board_of(after), BitBoard)
+    assert to_fen(after) == "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/4C2C1/9/RNBAKABNR b"
+    assert get_ai_move(after, SearchLimits(max_depth=2, time_ms=None)) is not None
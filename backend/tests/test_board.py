@@ -0,0 +1,34 @@
+import random
+
+from app.board import Board, board_of
+from app.game_logic import make_move
+from app.models import GameState
+from app.movegen import generate_moves, pseudo_moves
+
+
+def snapshot(board: Board):
+    return bytes(board.squares), list(board.ids), list(board.locs), board.turn, board.hash
+
+
+def test_undo_restores_every_position_on_random_lines():
+    rng = random.Random(11)
+    for _ in range(10):
+        board = board_of(GameState.new_game()).copy()
+        line = []
+        for _ in range(40):
+            moves = pseudo_moves(board, board.turn)
+            if not moves:
+                break
+            line.append(snapshot(board))
+            board.do_move(rng.choice(moves))
+        while line:
+            board.undo_move()
+            assert snapshot(board) == line.pop()
+
+
+def test_make_move_leaves_original_state_untouched():
+    state = GameState.new_game()
+    before = state.model_dump(), snapshot(board_of(state))
+    for move in generate_moves(state):
+        make_move(state, move)
+    assert (state.model_dump(), snapshot(board_of(state))) == before
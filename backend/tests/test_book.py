@@ -0,0 +1,83 @@
+import os
+import random
+
+import pytest
+
+from app.board import board_of
+from app.fen import from_fen
+from app.book import OpeningBook, book_entries, format_iccs, open_book, parse_iccs, write_book
+from app.game_logic import get_ai_move, make_move
+from app.models import GameState, Move
+from app.search import SearchLimits
+
+RECORDS = os.path.join(os.path.dirname(__file__), "..", "data", "openings.pgn")
+
+
+@pytest.fixture
+def book(tmp_path):
+    with open(RECORDS, encoding="utf-8") as f:
+        write_book(str(tmp_path / "book.bin"), book_entries(f.read()))
+    book = OpeningBook(str(tmp_path / "book.bin"))
+    yield book
+    book.close()
+
+
+def test_iccs_round_trip():
+    move = parse_iccs("h2e2")
+    assert format_iccs(move) == "h2e2"
+    assert parse_iccs("H2-E2") == move
+    with pytest.raises(ValueError):
+        parse_iccs("z2e2")
+
+
+def test_binary_search_finds_every_entry(tmp_path):
+    rng = random.Random(1)
+    entries = {(rng.getrandbits(64), rng.randrange(1 << 14)): rng.randrange(1, 100) for _ in range(500)}
+    write_book(str(tmp_path / "random.bin"), [(k, m, w) for (k, m), w in entries.items()])
+    book = OpeningBook(str(tmp_path / "random.bin"))
+    assert len(book) == len(entries)
+    for (key, move), weight in entries.items():
+        assert (move, weight) in book.moves(key)
+    assert book.moves(12345) == []
+    book.close()
+
+
+def test_start_position_moves_are_weighted(book):
+    board = board_of(GameState.new_game())
+    moves = dict(book.moves(board.hash))
+    assert {format_iccs(m) for m in moves} == {"h2e2", "c0e2", "c3c4", "h0g2", "h2d2"}
+    assert moves[parse_iccs("h2e2")] == max(moves.values())
+    rng = random.Random(0)
+    picks = {format_iccs(book.pick(board, rng)) for _ in range(200)}
+    assert len(picks) > 2
+
+
+def test_ai_plays_from_book_then_searches(book):
+    state = GameState.new_game()
+    move = get_ai_move(state, SearchLimits(max_depth=1, time_ms=None), book=book)
+    piece = state.pieces[move.piece_id]
+    assert (piece.x, piece.y, move.to_x, move.to_y) in {(7, 7, 4, 7), (2, 9, 4, 7), (2, 6, 2, 5), (7, 9, 6, 7), (7, 7, 3, 7)}
+
+    # Out of book (red's left chariot moved up): falls back to the search
+    off_book = make_move(state, Move(piece_id=23, to_x=0, to_y=8))
+    assert book.pick(board_of(off_book)) is None
+    assert get_ai_move(off_book, SearchLimits(max_depth=1, time_ms=None), book=book) is not None
+
+
+def test_bad_book_file_is_ignored(tmp_path):
+    (tmp_path / "junk.bin").write_bytes(b"not a book at all")
+    assert open_book(str(tmp_path / "junk.bin")) is None
+    assert open_book("") is None
+    assert open_book(str(tmp_path / "missing.bin")) is None
+
+
+def test_moves_exposing_the_general_are_not_booked_or_played(tmp_path):
+    # The red chariot on e1 is pinned against its general by the black one on e5
+    pinned = '[FEN "3k5/9/9/9/4r4/9/9/9/4R4/4K4 w"]\ne1a1 d9d8 1-0'
+    assert list(book_entries(pinned)) == []
+
+    board = board_of(from_fen("3k5/9/9/9/4r4/9/9/9/4R4/4K4 w"))
+    write_book(str(tmp_path / "damaged.bin"), [(board.hash, parse_iccs("e1a1"), 10)])
+    book = OpeningBook(str(tmp_path / "damaged.bin"))
+    assert book.pick(board) is None
+    book.close()
@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+import pytest
+
+from app.engine_pool import EngineBusy, EnginePool
+from app.fen import to_fen
+from app.game_logic import make_move
+from app.models import GameState
+from app.movegen import generate_moves
+from app.search import SearchLimits
+
+LONG_SEARCH = SearchLimits(max_depth=30, time_ms=60000)
+
+
+def run_with_pool(scenario, **kwargs):
+    async def main():
+        pool = EnginePool(tt_size_mb=1, **kwargs)
+        pool.start()
+        try:
+            return await scenario(pool)
+        finally:
+            pool.shutdown()
+    return asyncio.run(main())
+
+
+def test_search_returns_move_from_worker_process():
+    async def scenario(pool):
+        return await pool.search("g", GameState.new_game(), SearchLimits(max_depth=2, time_ms=None))
+    move = run_with_pool(scenario, workers=1)
+    assert move is not None
+
+
+def test_cancel_aborts_in_flight_search():
+    async def scenario(pool):
+        task = asyncio.create_task(pool.search("g", GameState.new_game(), LONG_SEARCH))
+        await asyncio.sleep(1.0)
+        assert pool.is_searching("g")
+        started = time.monotonic()
+        assert pool.cancel("g")
+        result = await task
+        return result, time.monotonic() - started, pool.pending
+    result, elapsed, pending = run_with_pool(scenario, workers=1)
+    assert result is None
+    assert elapsed < 5
+    assert pending == 0
+
+
+def test_full_queue_is_rejected():
+    async def scenario(pool):
+        task = asyncio.create_task(pool.search("a", GameState.new_game(), LONG_SEARCH))
+        await asyncio.sleep(0)
+        with pytest.raises(EngineBusy):
+            await pool.search("b", GameState.new_game(), LONG_SEARCH)
+        pool.cancel("a")
+        await task
+    run_with_pool(scenario, workers=0, max_pending=1)
+
+
+
+def test_ponder_hit_answers_at_once_and_a_miss_searches_anew():
+    limits = SearchLimits(max_depth=3, time_ms=None)
+
+    async def scenario(pool):
+        state = GameState.new_game()
+        state = make_move(state, await pool.search("g", state, limits))
+        ponder = pool._ponders["g"]
+        await ponder.future
+        replies = [make_move(state, reply) for reply in generate_moves(state)]
+        expected = next(after for after in replies if to_fen(after) == ponder.fen)
+        started = time.monotonic()
+        move = await pool.search("g", expected, limits)
+        hit_time = time.monotonic() - started
+        assert move is not None and pool.ponder_hits == 1
+
+        state = make_move(expected, move)
+        await pool._ponders["g"].future
+        unexpected = next(after for after in (make_move(state, reply) for reply in generate_moves(state))
+                          if to_fen(after) != pool._ponders["g"].fen)
+        assert await pool.search("g", unexpected, limits) is not None
+        return hit_time, pool.ponder_misses
+    hit_time, misses = run_with_pool(scenario, workers=0, ponder_budget=1)
+    assert hit_time < 0.05
+    assert misses == 1
+
+
+def test_no_pondering_without_budget():
+    async def scenario(pool):
+        await pool.search("g", GameState.new_game(), SearchLimits(max_depth=2, time_ms=None))
+        return dict(pool._ponders)
+    assert run_with_pool(scenario, workers=0) == {}
+
+
+def test_search_preempts_ponder_of_another_game():
+    async def scenario(pool):
+        await pool.search("a", GameState.new_game(), SearchLimits(max_depth=30, time_ms=1500))
+        assert "a" in pool._ponders
+        started = time.monotonic()
+        await pool.search("b", GameState.new_game(), SearchLimits(max_depth=2, time_ms=None))
+        return time.monotonic() - started, dict(pool._ponders)
+    elapsed, ponders = run_with_pool(scenario, workers=0, ponder_budget=1)
+    assert elapsed < 1.0
+    assert "a" not in ponders
+
+
+def test_analyses_leave_a_worker_for_game_searches():
+    start = to_fen(GameState.new_game())
+
+    async def scenario(pool):
+        analyses = [asyncio.create_task(pool.analyze(start, LONG_SEARCH)) for _ in range(2)]
+        await asyncio.sleep(0.5)
+        assert pool._analyses == 1 and len(pool._analysis_waiters) == 1
+        started = time.monotonic()
+        move = await pool.search("g", GameState.new_game(), SearchLimits(max_depth=2, time_ms=None))
+        elapsed = time.monotonic() - started
+        for task in analyses:
+            task.cancel()
+        await asyncio.gather(*analyses, return_exceptions=True)
+        await asyncio.sleep(0.5)
+        return move, elapsed, pool._analyses, pool.pending
+    move, elapsed, analyses, pending = run_with_pool(scenario, workers=2, analysis_budget=2)
+    assert move is not None
+    assert elapsed < 5
+    assert analyses == 0 and pending == 0
@@ -0,0 +1,65 @@
+import random
+
+from app.board import Board, board_of
+from app.evaluation import PST, evaluate_batch, evaluate_moves, score_squares
+from app.game_logic import evaluate_move, evaluate_moves as evaluate_moves_api, make_move
+from app.models import GameState, Move
+from app.movegen import generate_moves, pseudo_moves
+from app.search import evaluate
+
+
+def random_positions(count, seed=3):
+    rng = random.Random(seed)
+    positions = []
+    state = GameState.new_game()
+    while len(positions) < count:
+        moves = generate_moves(state)
+        if state.game_over or not moves:
+            state = GameState.new_game()
+            continue
+        state = make_move(state, rng.choice(moves))
+        positions.append(state)
+    return positions
+
+
+def test_tables_are_mirror_symmetric():
+    assert score_squares(board_of(GameState.new_game()).squares) == 0
+    for code in range(1, 8):
+        assert (PST[code].reshape(10, 9)[::-1] == -PST[code | 8].reshape(10, 9)).all()
+
+
+def test_incremental_score_matches_full_score():
+    for state in random_positions(80):
+        board = board_of(state)
+        assert board.score == Board.from_state(state).score == score_squares(board.squares)
+        for move in pseudo_moves(board, board.turn):
+            board.do_move(move)
+            assert board.score == score_squares(board.squares)
+            board.undo_move()
+        assert board.score == score_squares(board.squares)
+
+
+def test_batches_match_scalar_evaluation():
+    positions = random_positions(40)
+    boards = [board_of(state) for state in positions]
+    assert evaluate_batch(boards).tolist() == [evaluate(board) for board in boards]
+    for board in boards:
+        moves = pseudo_moves(board, board.turn)
+        expected = []
+        for move in moves:
+            board.do_move(move)
+            expected.append(-evaluate(board))
+            board.undo_move()
+        assert evaluate_moves(board, moves).tolist() == expected
+
+
+def test_evaluate_move_rewards_captures():
+    state = GameState.new_game()
+    # Red's right cannon takes black's horse
+    assert evaluate_move(state, Move(piece_id=22, to_x=7, to_y=0)) > 30
+
+
+def test_single_and_batched_move_scores_agree():
+    for state in random_positions(20, seed=9):
+        moves = generate_moves(state)
+        assert [evaluate_move(state, move) for move in moves] == evaluate_moves_api(state, moves)
@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from app.board import board_of
+from app.fen import START_FEN, dump_state, from_fen, load_state, to_fen
+from app.game_logic import make_move
+from app.models import GameState, Side
+from app.movegen import generate_moves, perft
+from benchmarks.engine import load_positions
+
+
+def test_start_position_round_trip():
+    state = from_fen(START_FEN)
+    assert to_fen(GameState.new_game()) == START_FEN
+    assert state == GameState.new_game()
+    assert board_of(state).squares == board_of(GameState.new_game()).squares
+    assert from_fen(START_FEN.replace(" w", " b")).current_turn == Side.BLACK
+
+
+def test_benchmark_positions_parse():
+    positions = load_positions()
+    assert {phase for phase, _, _ in positions} == {"opening", "middlegame", "endgame"}
+    for _, _, fen in positions:
+        assert to_fen(from_fen(fen)) == fen
+
+
+def test_board_perft_from_start():
+    board = board_of(from_fen(START_FEN))
+    assert [perft(board, depth) for depth in (1, 2, 3)] == [44, 1920, 79666]
+
+
+@pytest.mark.parametrize("fen", [
+    "",
+    "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/RNBAKABNR w",
+    "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNRR w",
+    "rnbakabnx/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w",
+    "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR x",
+    "9/9/9/9/9/9/9/9/9/4K4 w",  # no black general
+    "4k4/9/9/9/9/9/9/9/9/9 w",  # no red general
+    "3kk4/9/9/9/9/9/9/9/9/4K4 w",  # two black generals
+    "4k4/9/9/9/9/9/9/9/9/K8 w",  # red general outside the palace
+])
+def test_malformed_fen_is_rejected(fen):
+    with pytest.raises(ValueError):
+        from_fen(fen)
+
+
+def test_parsed_pieces_are_not_shared():
+    first = from_fen(START_FEN)
+    first.pieces[0].x = 4
+    assert from_fen(START_FEN).pieces[0].x == 0
+
+
+def test_storage_record_round_trips_played_games():
+    rng = random.Random(5)
+    state = GameState.new_game()
+    for _ in range(60):
+        record = dump_state(state)
+        assert load_state(record) == state
+        assert to_fen(load_state(record)) == to_fen(state)
+        moves = generate_moves(state)
+        if state.game_over or not moves:
+            break
+        state = make_move(state, rng.choice(moves))
+
+
+def test_storage_record_keeps_result_and_reads_legacy_json():
+    state = GameState.new_game()
+    for winner in (Side.RED, Side.BLACK, None):
+        finished = state.model_copy(update={"game_over": True, "winner": winner})
+        assert load_state(dump_state(finished)) == finished
+    assert dump_state(state).endswith(" *")
+    assert load_state(state.model_dump_json()) == state
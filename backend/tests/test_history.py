@@ -0,0 +1,113 @@
+from app.board import BLACK, RED, board_of, square
+from app.book import parse_iccs
+from app.fen import dump_state, from_fen, load_state
+from app.game_logic import make_move, undo_moves
+from app.history import CHASE, CHECK, MoveHistory, adjudicate, history_of, move_flags
+from app.models import GameState, Side
+from app.movegen import to_api_move
+
+# Both sides develop a horse and bring it back: the start position again
+HORSE_SHUFFLE = ["h0g2", "h9g7", "g2h0", "g7h9"]
+
+
+def play(state: GameState, moves):
+    for iccs in moves:
+        state = make_move(state, to_api_move(board_of(state), parse_iccs(iccs)))
+    return state
+
+
+def test_history_counts_repetitions_and_draws_the_third():
+    state = play(GameState.new_game(), HORSE_SHUFFLE)
+    history = history_of(state)
+    assert len(history) == 4 and history.repetitions() == 2
+    assert history.hashes[0] == history.hashes[-1] == board_of(GameState.new_game()).hash
+    assert not state.game_over
+
+    state = play(state, HORSE_SHUFFLE)
+    assert history_of(state).repetitions() == 3
+    assert state.game_over and state.winner is None
+    assert len(history) == 4  # earlier states keep their own history
+
+
+def test_history_views_share_a_log_and_fork_from_older_states():
+    root = MoveHistory("fen", 10)
+    a = root.pushed(1, 11, 0).pushed(2, 10, CHECK)
+    b = a.pushed(3, 11, 0)
+    assert a._log is b._log  # pushing from the newest view appends in place
+    assert (a.repetitions(), a.repetitions(11), b.repetitions(11)) == (2, 1, 2)
+    assert list(b.cycle_flags()) == [CHECK, 0]  # position 11 first occurred after ply 1
+    fork = a.pushed(4, 12, CHASE)
+    assert fork._log is not b._log
+    assert list(fork.moves) == [1, 2, 4] and list(b.moves) == [1, 2, 3]
+    assert (fork.repetitions(11), fork.repetitions(12), b.repetitions(12)) == (1, 1, 0)
+
+
+def test_move_flags():
+    board = board_of(from_fen("4k4/9/9/9/9/9/9/9/9/R3K4 w"))
+    move = parse_iccs("a0a9")
+    board.do_move(move)
+    assert move_flags(board, move) == CHECK
+    # The chariot attacks an undefended horse, then a horse defended by its general
+    board = board_of(from_fen("4k4/9/9/9/9/9/9/n8/9/1R1K5 w"))
+    move = parse_iccs("b0b2")
+    board.do_move(move)
+    assert move_flags(board, move) == CHASE
+    board = board_of(from_fen("3k5/3n5/9/9/9/9/9/9/9/1R2K4 w"))
+    move = parse_iccs("b0b8")
+    board.do_move(move)
+    assert move_flags(board, move) == 0
+    # Advisors defend diagonally within the palace
+    board = board_of(from_fen("4k4/4a4/3n5/9/9/R8/9/9/9/4K4 w"))
+    move = square(0, 5) << 7 | square(3, 5)
+    board.do_move(move)
+    assert move_flags(board, move) == 0
+    # Elephants defend unless a piece blocks their eye
+    move = square(0, 7) << 7 | square(2, 7)
+    for eye, flags in (("9", 0), ("3p5", CHASE)):
+        board = board_of(from_fen(f"4k4/9/4b4/{eye}/2n6/9/9/R8/9/4K4 w"))
+        board.do_move(move)
+        assert move_flags(board, move) == flags
+    # Soldiers are only chased once they have crossed the river
+    board = board_of(GameState.new_game())
+    move = parse_iccs("b2e2")
+    board.do_move(move)
+    assert move_flags(board, move) == 0
+    board = board_of(from_fen("4k4/9/9/9/9/9/4p4/9/9/R3K4 w"))
+    move = parse_iccs("a0a3")
+    board.do_move(move)
+    assert move_flags(board, move) == CHASE
+
+
+def test_adjudicate_perpetual_check_and_chase():
+    # Red is to move once the cycle closes, so the last move was black's
+    assert adjudicate([CHECK, 0, CHECK, 0], turn=RED) == RED
+    assert adjudicate([0, CHECK, 0, CHECK], turn=RED) == BLACK
+    assert adjudicate([CHECK, CHECK, CHECK, CHECK], turn=RED) is None
+    assert adjudicate([0, CHASE, 0, CHECK], turn=BLACK) == RED
+    assert adjudicate([CHASE, CHECK, CHASE, CHECK], turn=RED) == BLACK
+    assert adjudicate([0, 0, 0, 0], turn=BLACK) is None
+
+
+def test_undo_replays_the_log():
+    start = GameState.new_game()
+    two = play(start, HORSE_SHUFFLE[:2])
+    four = play(two, HORSE_SHUFFLE[2:])
+    undone = undo_moves(four, 2)
+    assert undone == two
+    assert list(history_of(undone).moves) == list(history_of(two).moves)
+    assert undone._last_move == two._last_move
+    assert undo_moves(four, 4) == start and undo_moves(four, 4)._last_move is None
+
+    finished = play(four, HORSE_SHUFFLE)
+    assert finished.game_over and not undo_moves(finished, 1).game_over
+
+
+def test_history_survives_storage():
+    state = play(GameState.new_game(), HORSE_SHUFFLE + ["h2e2"])
+    record = dump_state(state)
+    loaded = load_state(record)
+    assert loaded == state
+    assert list(history_of(loaded).hashes) == list(history_of(state).hashes)
+    assert history_of(loaded).repetitions(history_of(state).hashes[0]) == 2
+    assert load_state(dump_state(GameState.new_game())) == GameState.new_game()
+    assert state.current_turn == Side.BLACK
@@ -0,0 +1,30 @@
+import io
+import json
+import logging
+
+from app.logging_config import configure_logging, parse_levels
+
+
+def test_parse_levels():
+    assert parse_levels("app.main=debug, app.persistence=WARNING,bogus") == {
+        "app.main": logging.DEBUG,
+        "app.persistence": logging.WARNING,
+    }
+
+
+def test_json_lines_with_extra_fields():
+    configure_logging(level="INFO", module_levels="app.search=WARNING", fmt="json")
+    try:
+        stream = io.StringIO()
+        logging.getLogger("app").handlers[0].setStream(stream)
+        logging.getLogger("app.game_logic").info("AI move %s", "e2", extra={"nodes": 42})
+        logging.getLogger("app.game_logic").debug("not shown")
+        logging.getLogger("app.search").info("not shown either")
+        lines = stream.getvalue().splitlines()
+        assert len(lines) == 1
+        entry = json.loads(lines[0])
+        assert entry["level"] == "INFO" and entry["logger"] == "app.game_logic"
+        assert entry["message"] == "AI move e2" and entry["nodes"] == 42
+    finally:
+        logging.getLogger("app.search").setLevel(logging.NOTSET)
+        configure_logging(level="INFO", module_levels="", fmt="text")
@@ -0,0 +1,78 @@
+import pstats
+
+from fastapi.testclient import TestClient
+
+from app import config, main
+from app.main import app
+from app.metrics import Counter, Histogram, Registry
+
+
+def test_text_format():
+    registry = Registry()
+    calls = registry.register(Counter("calls_total", "Calls", ("kind",)))
+    latency = registry.register(Histogram("latency_seconds", "Latency", ("phase",), buckets=(0.1, 1.0)))
+    calls.inc(2, "a")
+    calls.inc(1, 'quote"d')
+    latency.observe(0.05, "x")
+    latency.observe(0.5, "x")
+    latency.observe(3, "x")
+    assert registry.render().splitlines() == [
+        "# HELP calls_total Calls",
+        "# TYPE calls_total counter",
+        'calls_total{kind="a"} 2',
+        'calls_total{kind="quote\\"d"} 1',
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{phase="x",le="0.1"} 1',
+        'latency_seconds_bucket{phase="x",le="1.0"} 2',
+        'latency_seconds_bucket{phase="x",le="+Inf"} 3',
+        'latency_seconds_sum{phase="x"} 3.55',
+        'latency_seconds_count{phase="x"} 3',
+    ]
+
+
+def sample(text: str, prefix: str) -> float:
+    return sum(float(line.rsplit(" ", 1)[1]) for line in text.splitlines() if line.startswith(prefix))
+
+
+def test_metrics_cover_routes_phases_and_search():
+    with TestClient(app) as client:
+        game_id = client.post("/api/games").json()["game_id"]
+        assert client.post(f"/api/games/{game_id}/move", json={"piece_id": 21, "to_x": 4, "to_y": 7}).status_code == 200
+        client.get(f"/api/games/{game_id}/legal-moves")
+        reply = client.get("/metrics")
+        assert reply.headers["content-type"].startswith("text/plain")
+        text = reply.text
+    route = 'xiangqi_http_request_duration_seconds_count{method="POST",route="/api/games/{game_id}/move",status="200"}'
+    assert sample(text, route) >= 1
+    for phase in ("validate", "make_move", "search", "save"):
+        assert sample(text, f'xiangqi_phase_duration_seconds_count{{phase="{phase}"}}') >= 1
+    assert sample(text, "xiangqi_search_nodes_total") > 0
+    assert 0 <= sample(text, "xiangqi_tt_hit_ratio") <= 1
+    assert sample(text, 'xiangqi_movegen_calls_total{kind="generate_moves"}') >= 1
+    assert sample(text, 'xiangqi_movegen_calls_total{kind="search"}') > 0
+
+
+def test_profiler_can_be_switched_on_at_runtime(tmp_path, monkeypatch):
+    monkeypatch.setattr(main.profiler, "directory", str(tmp_path))
+    monkeypatch.setattr(main.profiler, "keep", 2)
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+    admin = {"X-Admin-Token": "secret"}
+    with TestClient(app) as client:
+        assert client.put("/debug/profiler?every=1").status_code == 403
+        assert client.put("/debug/profiler?every=1", headers={"X-Admin-Token": "guess"}).status_code == 403
+        assert client.put("/debug/profiler?every=2", headers=admin).json()["every"] == 2
+        for _ in range(8):
+            client.get("/healthz")
+        assert client.put("/debug/profiler?every=0", headers=admin).json()["dumped"] >= 3
+        client.get("/healthz")
+    dumps = sorted(tmp_path.glob("*.prof"))
+    assert len(dumps) == 2  # older profiles were deleted
+    assert pstats.Stats(str(dumps[0])).total_calls > 0
+
+
+def test_debug_routes_are_off_without_admin_token(monkeypatch):
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "")
+    with TestClient(app) as client:
+        assert client.get("/debug/profiler", headers={"X-Admin-Token": ""}).status_code == 404
+        assert client.put("/debug/profiler?every=1").status_code == 404
@@ -0,0 +1,79 @@
+import random
+
+from app.game_logic import is_valid_move, make_move
+from app.models import GameState, Move, PieceType
+from app.movegen import generate_moves, legal_move_map
+
+
+def brute_force_moves(game_state: GameState):
+    """Every move is_valid_move accepts, found by probing all 90 squares"""
+    moves = set()
+    for i, piece in enumerate(game_state.pieces):
+        if piece.side != game_state.current_turn:
+            continue
+        for x in range(9):
+            for y in range(10):
+                move = Move(piece_id=i, to_x=x, to_y=y)
+                if is_valid_move(game_state, move):
+                    moves.add(move)
+    return moves
+
+
+def random_positions(seed: int, games: int = 6, plies: int = 25):
+    """Positions from random playouts, some with pieces thinned out to open lines"""
+    rng = random.Random(seed)
+    for _ in range(games):
+        state = GameState.new_game()
+        for _ in range(plies):
+            if state.game_over:
+                break
+            yield state
+            if rng.random() < 0.3:
+                pieces = [p for p in state.pieces
+                          if p.type == PieceType.GENERAL or rng.random() < 0.6]
+                yield GameState(pieces=pieces, current_turn=state.current_turn)
+            moves = generate_moves(state)
+            if not moves:
+                break
+            state = make_move(state, rng.choice(moves))
+
+
+def perft(game_state: GameState, depth: int, move_source) -> int:
+    if depth == 0:
+        return 1
+    return sum(perft(make_move(game_state, m), depth - 1, move_source)
+               for m in move_source(game_state))
+
+
+def test_generator_matches_validator_on_random_positions():
+    for state in random_positions(seed=2024):
+        generated = generate_moves(state)
+        assert len(generated) == len(set(generated))
+        assert set(generated) == brute_force_moves(state)
+
+
+def test_perft_matches_validator_from_start():
+    state = GameState.new_game()
+    assert perft(state, 1, generate_moves) == 44
+    assert perft(state, 2, generate_moves) == perft(state, 2, brute_force_moves)
+
+
+def test_legal_move_map_is_cached_per_position():
+    state = GameState.new_game()
+    moves = legal_move_map(state)
+    assert sum(len(targets) for targets in moves.values()) == len(generate_moves(state))
+    assert legal_move_map(GameState.new_game()) is moves  # same position, same hash
+    after = make_move(state, Move(piece_id=21, to_x=4, to_y=7))
+    assert legal_move_map(after) is not moves
+    assert set(legal_move_map(after)) == {m.piece_id for m in generate_moves(after)}
+
+
+def test_legal_move_map_follows_piece_order():
+    state = GameState.new_game()
+    reordered = GameState(pieces=state.pieces[::-1], current_turn=state.current_turn)
+    moves = legal_move_map(reordered)
+    assert moves is not legal_move_map(state)
+    expected = {}
+    for move in generate_moves(reordered):
+        expected.setdefault(move.piece_id, set()).add((move.to_x, move.to_y))
+    assert {piece_id: set(targets) for piece_id, targets in moves.items()} == expected
@@ -0,0 +1,76 @@
+import random
+
+from app.board import board_of
+from app.fen import from_fen
+from app.game_logic import get_ai_move, is_valid_move, make_move
+from app.models import GameState, Move, Side
+from app.movegen import in_check, legal_moves, pseudo_moves
+from app.search import MATE, SearchLimits, search
+
+
+def piece_at(state: GameState, x: int, y: int) -> int:
+    return next(i for i, p in enumerate(state.pieces) if (p.x, p.y) == (x, y))
+
+
+def test_fast_filter_matches_make_and_test():
+    rng = random.Random(4)
+    for _ in range(20):
+        board = board_of(GameState.new_game()).copy()
+        for _ in range(80):
+            side = board.turn
+            expected = []
+            for move in pseudo_moves(board, side):
+                board.do_move(move)
+                if not in_check(board, side):
+                    expected.append(move)
+                board.undo_move()
+            assert legal_moves(board, side) == expected
+            moves = pseudo_moves(board, side)
+            if not moves or board.squares.find(1) == -1 or board.squares.find(9) == -1:
+                break
+            board.do_move(rng.choice(moves))
+
+
+def test_flying_general_and_pinned_pieces():
+    # Red's chariot is the only piece between the generals on the e-file
+    state = from_fen("4k4/9/9/9/9/9/9/9/4R4/4K4 w")
+    chariot = piece_at(state, 4, 8)
+    assert not is_valid_move(state, Move(piece_id=chariot, to_x=0, to_y=8))
+    assert is_valid_move(state, Move(piece_id=chariot, to_x=4, to_y=1))
+    # The red general may not step onto the open file facing black's
+    facing = from_fen("3k5/9/9/9/9/9/9/9/9/4K4 w")
+    assert not is_valid_move(facing, Move(piece_id=piece_at(facing, 4, 9), to_x=3, to_y=9))
+
+
+def test_must_answer_check():
+    # Black's chariot checks along the e-file; a red horse could move elsewhere but must not
+    state = from_fen("3k5/9/9/9/4r4/9/9/1N7/9/4K4 w")
+    assert in_check(board_of(state), 0)
+    for move in legal_moves(board_of(state), 0):
+        assert move >> 7 == 85  # only general moves get out of this check
+    assert not is_valid_move(state, Move(piece_id=piece_at(state, 1, 7), to_x=2, to_y=5))
+
+
+def test_checkmate_ends_the_game():
+    # Rb1-b0 mates: the other chariot covers d1, the red general covers e0
+    state = from_fen("3k5/1R6R/9/9/9/9/9/9/9/4K4 w")
+    after = make_move(state, Move(piece_id=piece_at(state, 1, 1), to_x=1, to_y=0))
+    assert after.game_over and after.winner == Side.RED
+    assert legal_moves(board_of(after), 1) == []
+
+
+def test_stalemate_is_a_loss():
+    # Black's general on d0 is not attacked but every square it could go to is
+    state = from_fen("3k5/9/2R6/9/9/9/9/9/9/4K4 w")
+    after = make_move(state, Move(piece_id=piece_at(state, 2, 2), to_x=2, to_y=1))
+    assert not in_check(board_of(after), 1)
+    assert after.game_over and after.winner == Side.RED
+
+
+def test_search_finds_mate_in_one_and_avoids_illegal_lines():
+    state = from_fen("3k5/1R6R/9/9/9/9/9/9/9/4K4 w")
+    result = search(board_of(state), SearchLimits(max_depth=3, time_ms=None))
+    assert result.score >= MATE - 10
+    move = get_ai_move(state, SearchLimits(max_depth=3, time_ms=None))
+    assert is_valid_move(state, move)
+    assert make_move(state, move).game_over
@@ -0,0 +1,48 @@
+from app.board import board_of
+from app.game_logic import get_ai_move
+from app.models import GameState, Move, Piece, PieceType, Side
+from app.search import MATE, SearchLimits, analyze, search
+
+
+def endgame(*pieces, turn=Side.RED) -> GameState:
+    return GameState(pieces=[Piece(type=t, side=s, x=x, y=y) for t, s, x, y in pieces], current_turn=turn)
+
+
+def test_takes_hanging_chariot():
+    state = endgame(
+        (PieceType.GENERAL, Side.RED, 4, 9),
+        (PieceType.CHARIOT, Side.RED, 0, 5),
+        (PieceType.GENERAL, Side.BLACK, 3, 0),
+        (PieceType.CHARIOT, Side.BLACK, 7, 5),
+    )
+    assert get_ai_move(state, SearchLimits(max_depth=2, time_ms=None)) == Move(piece_id=1, to_x=7, to_y=5)
+
+
+def test_finds_general_capture_as_mate():
+    state = endgame(
+        (PieceType.GENERAL, Side.RED, 4, 9),
+        (PieceType.CHARIOT, Side.RED, 3, 5),
+        (PieceType.GENERAL, Side.BLACK, 3, 0),
+    )
+    result = search(board_of(state), SearchLimits(max_depth=3, time_ms=None))
+    assert result.score >= MATE - 10
+    assert result.move is not None
+
+
+def test_node_budget_still_returns_a_move():
+    result = search(board_of(GameState.new_game()), SearchLimits(max_depth=20, time_ms=None, nodes=3000))
+    assert result.move is not None
+    assert result.nodes <= 3000
+    assert 0 < result.movegen_calls <= result.nodes + 1
+    assert result.nps > 0
+
+
+def test_analyze_returns_distinct_lines_best_first():
+    board = board_of(GameState.new_game())
+    limits = SearchLimits(max_depth=2, time_ms=None)
+    lines = analyze(board, limits, multipv=3)
+    assert len(lines) == 3
+    assert len({line.move for line in lines}) == 3
+    assert [line.pv[0] for line in lines] == [line.move for line in lines]
+    assert lines[0].score >= lines[1].score >= lines[2].score
+    assert lines[0].move == search(board, limits).move
@@ -0,0 +1,59 @@
+from app.models import GameState
+from app.persistence import SQLiteGameStore
+from app.sessions import GameStore
+
+
+def test_lru_evicts_least_recently_used_game():
+    store = GameStore(max_games=2)
+    a = store.create(GameState.new_game())
+    b = store.create(GameState.new_game())
+    store.get(a.game_id)
+    store.create(GameState.new_game())
+    assert a.game_id in store
+    assert b.game_id not in store
+    assert len(store) == 2
+
+
+def test_idle_games_expire():
+    store = GameStore(ttl_seconds=0)
+    session = store.create(GameState.new_game())
+    store.create(GameState.new_game())
+    assert session.game_id not in store
+
+
+def test_write_behind_batches_and_reloads(tmp_path):
+    backend = SQLiteGameStore(str(tmp_path / "games.sqlite3"))
+    store = GameStore(backend, max_games=1)
+    first = store.create(GameState.new_game())
+    second = store.create(GameState.new_game())
+    assert first.game_id not in store
+
+    # Unflushed writes are still visible, then land in one batch
+    assert store.get(first.game_id).state == first.state
+    assert backend.flush() == 2
+    assert backend.flush() == 0
+    backend.close()
+
+    reopened = GameStore(SQLiteGameStore(str(tmp_path / "games.sqlite3")))
+    assert reopened.get(second.game_id).state == second.state
+    reopened.delete(second.game_id)
+    assert reopened.get(second.game_id) is None
+    reopened.backend.close()
+
+
+class _Running:
+    def done(self):
+        return False
+
+
+def test_games_with_a_running_ai_reply_are_not_evicted():
+    store = GameStore(max_games=1)
+    thinking = store.create(GameState.new_game())
+    thinking.ai_task = _Running()
+    other = store.create(GameState.new_game())
+    assert thinking.game_id in store and other.game_id in store
+
+    thinking.ai_task = None
+    store.create(GameState.new_game())
+    assert thinking.game_id not in store and other.game_id not in store
+    assert len(store) == 1
@@ -0,0 +1,62 @@
+import asyncio
+
+from app.board import Board
+from app.engine_pool import EnginePool
+from app.fen import from_fen
+from app.models import GameState
+from app.movegen import legal_moves
+from app.search import MATE, SearchLimits
+from app.smp import LazySMP, SharedTranspositionTable
+from app.tt import EXACT, LOWER
+
+
+def test_shared_table_is_visible_to_attached_tables():
+    owner = SharedTranspositionTable(1)
+    other = SharedTranspositionTable(1, name=owner.name)
+    try:
+        owner.store(0x1234, 5, EXACT, -42, 300)
+        assert other.probe(0x1234) == (5, EXACT, -42, 300)
+        other.store(0x9999, 3, LOWER, 7, None)
+        assert owner.probe(0x9999) == (3, LOWER, 7, None)
+        owner.new_search()
+        assert other.age == owner.age == 1
+    finally:
+        other.close()
+        owner.close()
+
+
+def test_torn_entry_fails_verification():
+    table = SharedTranspositionTable(1)
+    try:
+        table.store(0x1234, 5, EXACT, 10, 300)
+        slot = (0x1234 & table.mask) << 1
+        table.data[slot] ^= 1 << 20  # data word from a different write than its key word
+        assert table.probe(0x1234) is None
+    finally:
+        table.close()
+
+
+def test_parallel_search_returns_legal_move_and_finds_mate():
+    smp = LazySMP(threads=2, tt_size_mb=1)
+    try:
+        board = Board.from_state(GameState.new_game())
+        result = smp.search(board, SearchLimits(max_depth=3, time_ms=None))
+        assert result.move in legal_moves(board, board.turn)
+        assert result.depth >= 3
+
+        mate = Board.from_state(from_fen("3k5/1R6R/9/9/9/9/9/9/9/4K4 w"))
+        result = smp.search(mate, SearchLimits(max_depth=3, time_ms=None))
+        assert result.score == MATE - 1
+    finally:
+        smp.close()
+
+
+def test_engine_pool_with_search_threads():
+    async def main():
+        pool = EnginePool(workers=0, tt_size_mb=1, search_threads=2)
+        pool.start()
+        try:
+            return await pool.search("g", GameState.new_game(), SearchLimits(max_depth=2, time_ms=None))
+        finally:
+            pool.shutdown()
+    assert asyncio.run(main()) is not None
@@ -0,0 +1,51 @@
+from array import array
+
+import pytest
+
+from app import bitboard, config, snapshot
+from app.snapshot import Snapshot, join_wide, split_wide, write_snapshot
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "tables.bin")
+    wide = [0, 1, (1 << 89) | 5, (1 << 64) - 1]
+    write_snapshot(path, {"a/1/small": array("H", [1, 2, 3]), "a/1/wide": split_wide(wide)})
+    loaded = Snapshot(path)
+    assert loaded.names() == ["a/1/small", "a/1/wide"]
+    assert loaded.get("a/1/small").tolist() == [1, 2, 3]
+    assert join_wide(loaded.get("a/1/wide")) == wide
+    assert loaded.get("a/2/small") is None
+    loaded.close()
+
+
+def test_bad_snapshots_are_rejected(tmp_path):
+    path = tmp_path / "tables.bin"
+    write_snapshot(str(path), {"a/1/small": array("H", [1, 2, 3])})
+    data = path.read_bytes()
+    path.write_bytes(data[:-2])
+    with pytest.raises(ValueError, match="truncated"):
+        Snapshot(str(path))
+    path.write_bytes(data[:4] + b"\x09" + data[5:])
+    with pytest.raises(ValueError, match="version"):
+        Snapshot(str(path))
+
+
+@pytest.fixture
+def configured_snapshot(tmp_path, monkeypatch):
+    path = str(tmp_path / "engine_tables.bin")
+    monkeypatch.setattr(config, "TABLE_SNAPSHOT", path)
+    monkeypatch.setattr(snapshot, "_snapshot", None)
+    monkeypatch.setattr(snapshot, "_opened", False)
+    return path
+
+
+def test_bitboard_tables_load_from_snapshot(configured_snapshot):
+    write_snapshot(configured_snapshot, bitboard.snapshot_tables())
+    assert bitboard._load_tables() == (bitboard.RANK_SLIDES, bitboard.FILE_SLIDES, bitboard.HORSE_MOVES,
+                                       bitboard.HORSE_ATTACKERS, bitboard.ELEPHANT_MOVES)
+
+
+def test_stale_snapshot_falls_back_to_building(configured_snapshot):
+    tables = bitboard.snapshot_tables()
+    write_snapshot(configured_snapshot, {name.replace("/1/", "/0/"): values for name, values in tables.items()})
+    assert bitboard._load_tables() is None
@@ -0,0 +1,73 @@
+import pytest
+
+from app.board import board_of
+from app.fen import from_fen
+from app.game_logic import get_ai_move
+from app.movegen import legal_moves
+from app.search import SearchLimits
+from app.tablebase import Tablebase, build, ending_name, open_tablebase, parse_ending
+
+KR_K = "3k5/9/9/9/R8/9/9/9/9/5K3 w"
+
+
+@pytest.fixture(scope="module")
+def tablebase(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("tablebases")
+    assert build(["KR-K", "KN-K"], str(directory)) == ["K-K", "KR-K", "KN-K"]
+    assert build(["KR-K"], str(directory)) == []  # existing tables are reused
+    tablebase = Tablebase(str(directory))
+    yield tablebase
+    tablebase.close()
+
+
+def mirror_fen(fen: str) -> str:
+    """The same position with the colours swapped and the board turned around"""
+    placement, turn = fen.split()
+    ranks = [rank.swapcase() for rank in reversed(placement.split("/"))]
+    return "/".join(ranks) + (" b" if turn == "w" else " w")
+
+
+def test_parse_ending():
+    assert ending_name(parse_ending("knp-k")) == "KNP-K"
+    for bad in ("KR", "R-K", "KX-K"):
+        with pytest.raises(ValueError):
+            parse_ending(bad)
+
+
+def test_probe_known_positions(tablebase):
+    assert tablebase.endings() == ["K-K", "KN-K", "KR-K"]
+    assert tablebase.probe(board_of(from_fen(KR_K))) == (1, 3)
+    assert tablebase.probe(board_of(from_fen("3k5/9/9/9/R8/9/9/9/9/5K3 b"))) == (-1, 4)
+    assert tablebase.probe(board_of(from_fen("4k4/9/9/9/9/9/9/9/9/4K4 w"))) is None  # generals face each other
+    assert tablebase.probe(board_of(from_fen("3k5/9/9/9/9/9/9/9/9/5K3 w"))) == (0, 0)
+    assert tablebase.probe(board_of(from_fen("rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w"))) is None
+
+
+def test_black_side_endings_use_the_mirrored_table(tablebase):
+    for fen in (KR_K, "3k5/9/9/9/R8/9/9/9/9/5K3 b", "4k4/9/3N5/9/9/9/9/9/9/3K5 w"):
+        assert tablebase.probe(board_of(from_fen(mirror_fen(fen)))) == tablebase.probe(board_of(from_fen(fen)))
+
+
+def test_best_moves_mate_in_the_predicted_number_of_plies(tablebase):
+    board = board_of(from_fen(KR_K))
+    outcome, plies = tablebase.probe(board)
+    for _ in range(plies):
+        board.do_move(tablebase.best_move(board))
+    assert not legal_moves(board, board.turn)
+    assert tablebase.probe(board) == (-1, 0)
+
+
+def test_ai_plays_from_tablebase(tablebase):
+    state = from_fen(KR_K)
+    move = get_ai_move(state, SearchLimits(max_depth=1, time_ms=None), tablebase=tablebase)
+    board = board_of(state)
+    board.do_move(next(m for m in legal_moves(board, board.turn)
+                       if m & 127 == move.to_y * 9 + move.to_x and board.ids[m >> 7] == move.piece_id))
+    assert tablebase.probe(board) == (-1, 2)
+
+
+def test_open_tablebase_handles_missing_directory(tmp_path):
+    assert open_tablebase("") is None
+    assert open_tablebase(str(tmp_path / "missing")) is None
+    (tmp_path / "KR-K.xqtb").write_bytes(b"not a table")
+    assert open_tablebase(str(tmp_path)) is None
@@ -0,0 +1,55 @@
+import random
+
+from app.board import Board, board_of
+from app.game_logic import make_move
+from app.models import GameState
+from app.movegen import generate_moves
+from app.search import SearchLimits, search
+from app.tt import EXACT, LOWER, UPPER, TranspositionTable
+
+
+def test_incremental_hash_matches_full_hash():
+    rng = random.Random(7)
+    state = GameState.new_game()
+    seen = {board_of(state).hash}
+    for _ in range(60):
+        moves = generate_moves(state)
+        if state.game_over or not moves:
+            break
+        state = make_move(state, rng.choice(moves))
+        assert board_of(state).hash == Board.from_state(state).hash
+        seen.add(board_of(state).hash)
+    assert len(seen) > 50
+
+
+def test_store_and_probe_round_trip():
+    tt = TranspositionTable(1)
+    tt.store(12345, 7, LOWER, -99873, 85 << 7 | 76)
+    assert tt.probe(12345) == (7, LOWER, -99873, 85 << 7 | 76)
+    assert tt.probe(54321) is None
+    assert (tt.hits, tt.misses) == (1, 1)
+
+
+def test_memory_cap_and_depth_preferred_replacement():
+    tt = TranspositionTable(1)
+    assert tt.size_bytes <= 1024 * 1024
+    buckets = tt.mask + 1
+    deep, shallow, newer = 1, 1 + buckets, 1 + 2 * buckets  # same bucket
+    tt.store(deep, 9, EXACT, 10, None)
+    tt.store(shallow, 2, UPPER, 20, None)
+    tt.store(newer, 3, UPPER, 30, None)
+    assert tt.probe(deep) == (9, EXACT, 10, None)
+    assert tt.probe(shallow) is None
+    assert tt.probe(newer) == (3, UPPER, 30, None)
+    tt.new_search()
+    tt.store(shallow, 1, EXACT, 40, None)
+    assert tt.probe(shallow) == (1, EXACT, 40, None)
+
+
+def test_table_is_reused_across_searches():
+    tt = TranspositionTable(4)
+    board = board_of(GameState.new_game())
+    first = search(board, SearchLimits(max_depth=3, time_ms=None), tt)
+    second = search(board, SearchLimits(max_depth=3, time_ms=None), tt)
+    assert second.nodes < first.nodes
+    assert second.tt_hits > 0
@@ -0,0 +1,299 @@
+"""Play engine-vs-engine matches in worker processes and rate the engines.
+
+Every engine after the first plays a gauntlet against the first (the
+baseline). Games come in pairs from the same randomized opening with the
+colours swapped. Each finished game is appended to a JSONL file, and the
+Elo estimate and SPRT verdict of every pairing are printed as results
+come in.
+
+Run from the backend directory:
+
+    python -m tools.arena --engine base:depth=3 --engine wide:depth=3,chariot=100 \\
+        --games 200 --workers 4 --output arena.jsonl [--sprt 0,10]
+
+An engine spec is NAME:key=value,... with keys depth, time_ms, nodes and
+the material value of any piece type (general, advisor, ..., soldier).
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.board import Board, board_class, TYPE_CODES
+from app.book import format_iccs
+from app.evaluation import DEFAULT_MATERIAL, make_weights
+from app.history import REPETITION_LIMIT, adjudicate, move_flags
+from app.logging_config import configure_logging
+from app.models import GameState, PieceType
+from app.movegen import generator_for
+from app.search import SearchLimits, search
+from app.tt import TranspositionTable
+
+# Game results from red's point of view, as in PGN
+RED_WINS, BLACK_WINS, DRAWN = "1-0", "0-1", "1/2-1/2"
+
+
+@dataclass
+class EngineConfig:
+    """One contestant: search limits plus material values overriding the defaults"""
+    name: str
+    max_depth: int = 4
+    time_ms: Optional[int] = 1000
+    nodes: Optional[int] = None
+    material: Dict[int, int] = field(default_factory=dict)  # type code -> value
+
+    def limits(self, clock_ms: Optional[float] = None) -> SearchLimits:
+        """Search budget for one move, capped by what is left on the game clock"""
+        time_ms = self.time_ms
+        if clock_ms is not None:
+            # At least 1ms: a time_ms of 0 would mean no time limit at all
+            time_ms = max(1, int(clock_ms) if time_ms is None else min(time_ms, int(clock_ms)))
+        return SearchLimits(max_depth=self.max_depth, time_ms=time_ms, nodes=self.nodes)
+
+    def material_values(self) -> List[int]:
+        return [self.material.get(code, value) for code, value in enumerate(DEFAULT_MATERIAL)]
+
+
+def parse_engine(spec: str) -> EngineConfig:
+    """EngineConfig from NAME:key=value,... (see the module docstring)"""
+    name, _, options = spec.partition(":")
+    if not name:
+        raise ValueError(f"Engine spec {spec!r} needs a name")
+    engine = EngineConfig(name)
+    for option in filter(None, options.split(",")):
+        key, sep, value = option.partition("=")
+        key = key.strip().lower()
+        if not sep:
+            raise ValueError(f"Engine option {option!r} must look like key=value")
+        if key == "depth":
+            engine.max_depth = int(value)
+        elif key in ("time_ms", "nodes"):
+            setattr(engine, key, int(value) if value.lower() != "none" else None)
+        elif key in {t.value for t in PieceType}:
+            engine.material[TYPE_CODES[PieceType(key)]] = int(value)
+        else:
+            raise ValueError(f"Unknown engine option {key!r}")
+    return engine
+
+
+def random_opening(board: Board, plies: int, rng: random.Random) -> List[int]:
+    """Play `plies` random legal moves on the board, to vary otherwise identical games"""
+    moves = []
+    for _ in range(plies):
+        legal = generator_for(board).legal_moves(board, board.turn)
+        if not legal:
+            break
+        move = rng.choice(legal)
+        board.do_move(move)
+        moves.append(move)
+    return moves
+
+
+def play_game(red: EngineConfig, black: EngineConfig, opening_plies: int = 2, seed: int = 0,
+              max_plies: int = 300, clock_ms: Optional[float] = None) -> Dict:
+    """Play one game between two engines and return its record.
+
+    Works on a Board directly: no API models are built after the start
+    position. The game ends on mate or stalemate (a loss in Xiangqi), a
+    repeated position (adjudicated as in app.history), `max_plies`, or a
+    side overrunning its clock.
+    """
+    board = board_class().from_state(GameState.new_game())
+    moves = random_opening(board, opening_plies, random.Random(seed))
+    engines = (red, black)
+    weights = tuple(make_weights(engine.material_values()) for engine in engines)
+    tables = (TranspositionTable(), TranspositionTable())
+    clocks = [clock_ms, clock_ms]
+    seen: Dict[int, List[int]] = {board.hash: [len(moves)]}
+    flags: List[int] = [0] * len(moves)
+    result = reason = None
+    nodes = [0, 0]
+    while result is None:
+        side = board.turn
+        generator = generator_for(board)
+        if not generator.legal_moves(board, side):
+            result, reason = (BLACK_WINS if side == 0 else RED_WINS), "mate"
+            break
+        if len(moves) >= max_plies:
+            result, reason = DRAWN, "move_limit"
+            break
+        engine = engines[side]
+        start = time.perf_counter()
+        searched = search(board, engine.limits(clocks[side]), tables[side], weights=weights[side])
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        nodes[side] += searched.nodes
+        if clocks[side] is not None:
+            clocks[side] -= elapsed_ms
+            if clocks[side] < 0:
+                result, reason = (BLACK_WINS if side == 0 else RED_WINS), "time"
+                break
+        board.do_move(searched.move)
+        moves.append(searched.move)
+        flags.append(move_flags(board, searched.move))
+        seen.setdefault(board.hash, []).append(len(moves))
+        if len(seen[board.hash]) >= REPETITION_LIMIT:
+            loser = adjudicate(flags[seen[board.hash][0]:], board.turn)
+            result = DRAWN if loser is None else (BLACK_WINS if loser == 0 else RED_WINS)
+            reason = "repetition"
+    return {
+        "red": red.name, "black": black.name, "result": result, "reason": reason,
+        "plies": len(moves), "opening_plies": opening_plies, "seed": seed, "nodes": nodes,
+        "moves": " ".join(format_iccs(move) for move in moves),
+    }
+
+
+def _play(job: Tuple[dict, dict, int, int, int, Optional[float]]) -> Dict:
+    red, black, opening_plies, seed, max_plies, clock_ms = job
+    return play_game(EngineConfig(**red), EngineConfig(**black), opening_plies, seed, max_plies, clock_ms)
+
+
+@dataclass
+class MatchStats:
+    """Wins, draws and losses of a candidate against the baseline"""
+    wins: int = 0
+    draws: int = 0
+    losses: int = 0
+
+    @property
+    def games(self) -> int:
+        return self.wins + self.draws + self.losses
+
+    @property
+    def score(self) -> float:
+        return (self.wins + self.draws / 2) / self.games if self.games else 0.5
+
+    def add(self, record: Dict, candidate: str) -> None:
+        if record["result"] == DRAWN:
+            self.draws += 1
+        elif (record["result"] == RED_WINS) == (record["red"] == candidate):
+            self.wins += 1
+        else:
+            self.losses += 1
+
+    def _variance(self) -> float:
+        """Per-game variance of the score"""
+        n = self.games
+        return (self.wins + self.draws / 4) / n - self.score ** 2
+
+    def elo(self) -> Tuple[float, float]:
+        """Elo difference and its 95% error margin (infinite until both are defined)"""
+        if not self.games or self.score in (0.0, 1.0):
+            return (math.copysign(math.inf, self.score - 0.5) if self.games else 0.0), math.inf
+        deviation = math.sqrt(self._variance() / self.games)
+        low = _score_elo(max(self.score - 1.96 * deviation, 1e-9))
+        high = _score_elo(min(self.score + 1.96 * deviation, 1 - 1e-9))
+        return _score_elo(self.score), (high - low) / 2
+
+    def llr(self, elo0: float, elo1: float) -> float:
+        """Log-likelihood ratio of H1 (elo1) against H0 (elo0), normal approximation"""
+        if self.games < 2:
+            return 0.0
+        variance = self._variance() / self.games
+        if variance <= 0:
+            return 0.0
+        s0, s1 = _elo_score(elo0), _elo_score(elo1)
+        return (s1 - s0) * (2 * self.score - s0 - s1) / (2 * variance)
+
+    def sprt(self, elo0: float, elo1: float, alpha: float = 0.05, beta: float = 0.05) -> str:
+        """Verdict so far: "H1" (gains elo1 or more), "H0" (gains elo0 or less) or "" (undecided)"""
+        llr = self.llr(elo0, elo1)
+        if llr >= math.log((1 - beta) / alpha):
+            return "H1"
+        if llr <= math.log(beta / (1 - alpha)):
+            return "H0"
+        return ""
+
+
+def _elo_score(elo: float) -> float:
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def _score_elo(score: float) -> float:
+    return -400 * math.log10(1 / score - 1)
+
+
+def schedule(engines: List[EngineConfig], games: int, opening_plies: int, seed: int,
+             max_plies: int, clock_ms: Optional[float]) -> Iterator[Tuple]:
+    """Jobs for `games` games per candidate, in colour-swapped pairs sharing an opening"""
+    baseline = asdict(engines[0])
+    for index in range(games):
+        for candidate in engines[1:]:
+            pair = (asdict(candidate), baseline) if index % 2 == 0 else (baseline, asdict(candidate))
+            yield pair + (opening_plies, seed + index // 2, max_plies, clock_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--engine", action="append", required=True, help="NAME:key=value,... (repeat; first is the baseline)")
+    parser.add_argument("--games", type=int, default=100, help="games per candidate")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", default="arena.jsonl", help="JSONL file the game records are appended to")
+    parser.add_argument("--opening-plies", type=int, default=2, help="random moves before the engines take over")
+    parser.add_argument("--max-plies", type=int, default=300, help="adjudicate a draw after this many plies")
+    parser.add_argument("--clock", type=float, default=None, help="seconds per side per game; overrunning loses")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sprt", default=None, help="elo0,elo1: stop once every candidate is decided")
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--beta", type=float, default=0.05)
+    args = parser.parse_args()
+
+    configure_logging()
+    engines = [parse_engine(spec) for spec in args.engine]
+    if len(engines) < 2:
+        parser.error("need at least two --engine specs")
+    if len({engine.name for engine in engines}) != len(engines):
+        parser.error("engine names must be unique")
+    sprt = tuple(float(v) for v in args.sprt.split(",")) if args.sprt else None
+    clock_ms = args.clock * 1000 if args.clock is not None else None
+
+    stats = {engine.name: MatchStats() for engine in engines[1:]}
+    jobs = schedule(engines, args.games, args.opening_plies, args.seed, args.max_plies, clock_ms)
+    pool = ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"))
+    pending, decided = set(), False
+    with open(args.output, "a", encoding="utf-8") as out:
+        while True:
+            # Keep a couple of games queued per worker so an SPRT stop wastes little work
+            for job in jobs:
+                pending.add(pool.submit(_play, job))
+                if len(pending) >= 2 * args.workers:
+                    break
+            if decided or not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            decided = _record(done, out, stats, sprt, args.alpha, args.beta)
+            if decided:
+                break
+    pool.shutdown(wait=True, cancel_futures=True)
+    print(f"Results appended to {args.output}")
+
+
+def _record(done, out, stats: Dict[str, MatchStats], sprt: Optional[Tuple[float, float]],
+            alpha: float, beta: float) -> bool:
+    """Write finished games and print the standings; True once every SPRT is decided"""
+    for future in done:
+        record = future.result()
+        out.write(json.dumps(record) + "\n")
+        out.flush()
+        candidate = record["red"] if record["red"] in stats else record["black"]
+        stats[candidate].add(record, candidate)
+    verdicts = []
+    for name, match in stats.items():
+        elo, margin = match.elo()
+        line = (f"{name}: +{match.wins} ={match.draws} -{match.losses} "
+                f"score {match.score:.3f} elo {elo:+.1f} +/- {margin:.1f}")
+        if sprt is not None:
+            verdict = match.sprt(*sprt, alpha, beta)
+            verdicts.append(verdict)
+            line += f" llr {match.llr(*sprt):+.2f} {verdict or 'running'}"
+        print(line)
+    return sprt is not None and all(verdicts)
+
+
+if __name__ == "__main__":
+    main()
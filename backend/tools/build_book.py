@@ -0,0 +1,32 @@
+"""Compile PGN-like Xiangqi game records into a binary opening book.
+
+Run from the backend directory:
+
+    python -m tools.build_book data/openings.pgn -o opening_book.bin [--plies 20]
+
+Point BOOK_PATH at the output to let the AI play from it.
+"""
+import argparse
+
+from app.book import book_entries, write_book
+from app.logging_config import configure_logging
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("records", nargs="+", help="game record files")
+    parser.add_argument("-o", "--output", default="opening_book.bin")
+    parser.add_argument("--plies", type=int, default=20, help="moves per game to include")
+    args = parser.parse_args()
+
+    configure_logging()
+    entries = []
+    for path in args.records:
+        with open(path, encoding="utf-8") as f:
+            entries.extend(book_entries(f.read(), args.plies))
+    count = write_book(args.output, entries)
+    print(f"{args.output}: {count} entries from {len(entries)} moves")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Solve Xiangqi endgame tables by retrograde analysis.
+
+Run from the backend directory:
+
+    python -m tools.build_tablebase -o tablebases [KR-KAA KNP-K ...]
+
+Endings are written with FEN letters, red before the dash (K general, A
+advisor, B elephant, N horse, R chariot, C cannon, P soldier). The smaller
+endings reached by captures are solved too. Point TABLEBASE_DIR at the
+output to let the AI play these endings from the tables.
+"""
+import argparse
+import time
+
+from app.logging_config import configure_logging
+from app.tablebase import DEFAULT_ENDINGS, build
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("endings", nargs="*", default=list(DEFAULT_ENDINGS), help="endings such as KR-KAA")
+    parser.add_argument("-o", "--output", default="tablebases", help="directory for the .xqtb files")
+    args = parser.parse_args()
+
+    configure_logging()
+    start = time.perf_counter()
+    written = build(args.endings, args.output)
+    print(f"{args.output}: solved {', '.join(written) or 'nothing new'} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
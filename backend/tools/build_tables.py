@@ -0,0 +1,41 @@
+"""Write the precomputed engine tables to a snapshot file.
+
+Run from the backend directory:
+
+    python -m tools.build_tables [-o engine_tables.bin]
+
+The server, engine workers and tools map TABLE_SNAPSHOT (engine_tables.bin
+by default) on startup instead of building the bitboard slide and leg
+tables. Rebuild after changing a table layout; a snapshot missing the
+current tables is ignored and the tables are built as before.
+"""
+import argparse
+import os
+import time
+
+from app import bitboard
+from app.snapshot import Snapshot, write_snapshot
+
+# Modules whose snapshot_tables() go into the file
+MODULES = (bitboard,)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", default="engine_tables.bin", help="snapshot file to write")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    tables = {}
+    for module in MODULES:
+        tables.update(module.snapshot_tables())
+    write_snapshot(args.output, tables)
+    snapshot = Snapshot(args.output)
+    names = snapshot.names()
+    snapshot.close()
+    print(f"{args.output}: {len(names)} tables, {os.path.getsize(args.output) / 1024:.0f} KiB "
+          f"in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()